@@ -15,15 +15,34 @@ import mathutils
 from . import operators
 from . import properties
 from . import interface
+from . import live_sync
+from . import profiling
+from . import statistics_util
+from . import block_registry
+from . import connections_util
+from . import block_picker
+from . import block_grid
 
 
 def register():
     properties.register()
     interface.register()
     operators.register()
+    live_sync.register()
+    statistics_util.register()
+    block_registry.register()
+    connections_util.register()
+    block_grid.register()
 
 
 def unregister():
+    block_picker.unregister()
+    block_grid.unregister()
+    connections_util.unregister()
+    block_registry.unregister()
+    statistics_util.unregister()
+    profiling.unregister()
+    live_sync.unregister()
     interface.unregister()
     operators.unregister()
     properties.unregister()
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""
+A library .blend file of pre-built block meshes for each game version.
+
+Block meshes are baked once into the library, and later linked from it on
+demand, instead of being rebuilt from the jar in every session.
+"""
+import os
+import bpy
+
+from .data_loader import data_loader
+
+# Names of the meshes in each library file, so files are only read once
+library_mesh_names = {}
+
+
+def get_library_path(version=None):
+    """
+    Return the path of the library file for version, or for the loaded jar
+    """
+    if version is None:
+        version = data_loader.get_version()
+    return os.path.join(data_loader.get_library_directory(), f"mcbde_blocks_{version}.blend")
+
+
+def get_library_mesh_names(path):
+    if path not in library_mesh_names:
+        names = set()
+        if os.path.exists(path):
+            with bpy.data.libraries.load(path) as (data_from, _):
+                names = set(data_from.meshes)
+        library_mesh_names[path] = names
+    return library_mesh_names[path]
+
+
+def load_library_mesh(mesh_name):
+    """
+    Link the mesh mesh_name from the library of the loaded game version,
+    and return it, or None if the library does not have it
+    """
+    if not data_loader.is_initialized():
+        return None
+
+    path = get_library_path()
+    if mesh_name not in get_library_mesh_names(path):
+        return None
+
+    with bpy.data.libraries.load(path, link=True) as (_, data_to):
+        data_to.meshes = [mesh_name]
+    return data_to.meshes[0]
+
+
+def write_library(meshes, version=None):
+    """
+    Write the meshes, with their materials and packed textures, to the
+    library file for version, replacing it. Returns the path of the file.
+
+    Textures are only packed while the library is written, so the open file
+    is left as it was.
+    """
+    packed_images = set()
+    for mesh in meshes:
+        for material in mesh.materials:
+            if material is None or not material.node_tree:
+                continue
+            for node in material.node_tree.nodes:
+                if node.type == 'TEX_IMAGE' and node.image and not node.image.packed_file:
+                    node.image.pack()
+                    packed_images.add(node.image)
+        mesh.asset_mark()
+
+    path = get_library_path(version)
+    try:
+        bpy.data.libraries.write(path, set(meshes), fake_user=True, compress=True)
+    finally:
+        # The meshes only need to be assets, and the images packed, in the library
+        for mesh in meshes:
+            mesh.asset_clear()
+        for image in packed_images:
+            image.unpack(method='REMOVE')
+    library_mesh_names.pop(path, None)
+
+    return path
@@ -0,0 +1,209 @@
+"""
+Benchmarks of loading, model resolution, geometry building and command
+generation, run against a synthetic jar with plain Python.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --output new.json --compare results.json
+
+With --compare, every benchmark which got slower than the previous run by
+more than the threshold is listed, and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.data import JarData
+from core.blockstates import build_properties_dict, get_default_properties, get_outer_model_data
+from core.models import get_block_models, prepare_model_textures, is_full_cube, is_opaque_full_cube
+from core.geometry import get_model_geometry
+from core.coordinates import ORIGIN_LOCATION
+from core.export import optimize_passengers, get_commands
+from synthetic_jar import generate_jar
+
+SCENE_SIZES = [10, 1000, 10000, 50000]
+
+
+def time_function(function, repeat):
+    """
+    Return the minimum and median time of repeat calls to function, in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": statistics.median(times), "repeat": repeat}
+
+
+def get_block_state(data, block_type, rng):
+    """
+    Return a random selection of the properties of block_type
+    """
+    block_properties = build_properties_dict(data.get_data("blockstates", block_type))
+    selected = get_default_properties(block_properties)
+    for name, values in block_properties.items():
+        selected[name] = rng.choice(values)
+    return selected
+
+
+def make_scene(data, block_types, size, seed=0):
+    """
+    Return size passengers of random block states, filling a cube of cells
+    """
+    rng = random.Random(seed)
+    side = max(int(round(size ** (1 / 3))), 1)
+    passengers = []
+    for index in range(size):
+        y, remainder = divmod(index, side * side)
+        z, x = divmod(remainder, side)
+        block_type = rng.choice(block_types)
+        passengers.append({
+            "name": f"{block_type}.{index:05d}",
+            "block_type": block_type,
+            "properties": get_block_state(data, block_type, rng),
+            "transformation": [
+                [1.0, 0.0, 0.0, float(x)],
+                [0.0, 1.0, 0.0, float(y) - 1],
+                [0.0, 0.0, 1.0, float(z)],
+                [0.0, 0.0, 0.0, 1.0],
+            ],
+        })
+    return passengers
+
+
+def resolve_all(data, block_types):
+    for block_type in block_types:
+        blockstate = data.get_data("blockstates", block_type)
+        selected = get_default_properties(build_properties_dict(blockstate))
+        get_outer_model_data(blockstate, selected)
+        get_block_models(data, block_type, selected)
+
+
+def build_all_geometry(data, block_types):
+    for block_type in block_types:
+        blockstate = data.get_data("blockstates", block_type)
+        selected = get_default_properties(build_properties_dict(blockstate))
+        for outer_model_data, model_data in get_block_models(data, block_type, selected):
+            if "elements" in model_data:
+                prepare_model_textures(model_data)
+                get_model_geometry(outer_model_data, model_data)
+
+
+def export_scene(data, passengers, compact):
+    optimized, _ = optimize_passengers(
+        passengers,
+        lambda block_type, properties: is_full_cube(data, block_type, properties),
+        lambda block_type, properties: is_opaque_full_cube(data, block_type, properties),
+        remove_duplicates=True,
+        merge_block_types="*",
+        cull_hidden=True,
+    )
+    return get_commands(optimized, ORIGIN_LOCATION, compact=compact)
+
+
+def run_benchmarks(jar_path, repeat, scene_sizes):
+    results = {}
+
+    results["initialize_data"] = time_function(lambda: JarData().initialize_data(jar_path), repeat)
+
+    data = JarData()
+    data.initialize_data(jar_path)
+    block_types = sorted(data.loaded_data["blockstates"])
+
+    results["get_data"] = time_function(
+        lambda: [data.get_data("blockstates", block_type) for block_type in block_types], repeat
+    )
+    results["resolve_block_states"] = time_function(lambda: resolve_all(data, block_types), repeat)
+    results["build_geometry"] = time_function(lambda: build_all_geometry(data, block_types), repeat)
+
+    for size in scene_sizes:
+        passengers = make_scene(data, block_types, size)
+        results[f"export_verbose_{size}"] = time_function(lambda: export_scene(data, passengers, False), repeat)
+        results[f"export_compact_{size}"] = time_function(lambda: export_scene(data, passengers, True), repeat)
+
+    return results
+
+
+def compare_results(previous, current, threshold):
+    """
+    Print the change of every benchmark since previous, and return the names
+    of those which slowed down by more than the threshold ratio
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        if name not in previous.get("results", {}):
+            print(f"{name:30} {result['median'] * 1000:10.2f} ms (new)")
+            continue
+        previous_median = previous["results"][name]["median"]
+        ratio = result["median"] / previous_median if previous_median else 1
+        flag = ""
+        if ratio > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:30} {result['median'] * 1000:10.2f} ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the add-on core against a synthetic jar")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare with the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Slowdown ratio counted as a regression")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SCENE_SIZES, help="Numbers of blocks in the exported scenes")
+    parser.add_argument("--block-states", type=int, default=500)
+    parser.add_argument("--multipart-blocks", type=int, default=100)
+    parser.add_argument("--parent-depth", type=int, default=4)
+    parser.add_argument("--textures", type=int, default=200)
+    args = parser.parse_args()
+
+    jar_config = {
+        "block_states": args.block_states,
+        "multipart_blocks": args.multipart_blocks,
+        "parent_depth": args.parent_depth,
+        "textures": args.textures,
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        jar_path = os.path.join(directory, "synthetic.jar")
+        generate_jar(jar_path, **jar_config)
+        results = run_benchmarks(jar_path, args.repeat, args.sizes)
+
+    current = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "jar": jar_config,
+        "results": results,
+    }
+
+    if args.compare:
+        with open(args.compare) as file:
+            previous = json.load(file)
+        regressions = compare_results(previous, current, args.threshold)
+    else:
+        for name, result in results.items():
+            print(f"{name:30} {result['median'] * 1000:10.2f} ms")
+        regressions = []
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(current, file, indent=2)
+
+    if regressions:
+        print(f"{len(regressions)} benchmarks slowed down by more than x{args.threshold}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
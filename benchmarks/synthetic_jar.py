@@ -0,0 +1,151 @@
+"""
+Generating synthetic Minecraft jars for the benchmarks.
+
+A synthetic jar has the same layout as a real one, with plain cube and
+variant blocks, multipart blocks like fences, chains of parent models and
+solid colour textures, in configurable numbers, so that the add-on can be
+measured without a copy of the game.
+"""
+import argparse
+import json
+import random
+import struct
+import zipfile
+import zlib
+
+FACES = ["down", "up", "north", "south", "west", "east"]
+FACINGS = ["north", "east", "south", "west"]
+SIDES = ["north", "east", "south", "west"]
+
+
+def make_png(width, height, rgba):
+    """
+    Return the PNG data of a solid colour image
+    """
+    raw = b"".join(b"\x00" + bytes(rgba) * width for _ in range(height))
+
+    def chunk(chunk_type, data):
+        body = chunk_type + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xffffffff)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+def get_base_models():
+    """
+    Return the models every block is built from, like block/cube and
+    block/cube_all in the game
+    """
+    return {
+        "block": {},
+        "cube": {
+            "parent": "block/block",
+            "elements": [{
+                "from": [0, 0, 0],
+                "to": [16, 16, 16],
+                "faces": {face: {"texture": "#" + face, "cullface": face} for face in FACES},
+            }],
+        },
+        "cube_all": {
+            "parent": "block/cube",
+            "textures": {"particle": "#all", **{face: "#all" for face in FACES}},
+        },
+        "post": {
+            "textures": {"particle": "#texture"},
+            "elements": [{
+                "from": [6, 0, 6],
+                "to": [10, 16, 10],
+                "faces": {face: {"texture": "#texture"} for face in FACES},
+            }],
+        },
+        "side": {
+            "textures": {"particle": "#texture"},
+            "elements": [{
+                "from": [7, 12, 0],
+                "to": [9, 15, 9],
+                "rotation": {"origin": [8, 8, 8], "axis": "y", "angle": 0},
+                "faces": {face: {"texture": "#texture"} for face in FACES if face != "south"},
+            }],
+        },
+    }
+
+
+def generate_jar(path, block_states=500, multipart_blocks=100, parent_depth=4, textures=200, seed=0):
+    """
+    Write a synthetic jar to path.
+
+    block_states is the number of variant blocks, of which every fourth has a
+    facing property, and multipart_blocks the number of fence like blocks.
+    Each variant block model reaches block/cube_all through parent_depth
+    intermediate models. Blocks pick their texture from a pool of textures
+    solid colour images.
+
+    Returns the names of all generated block types.
+    """
+    rng = random.Random(seed)
+    models = get_base_models()
+    blockstates = {}
+    texture_names = [f"texture_{index}" for index in range(max(textures, 1))]
+
+    for index in range(block_states):
+        name = f"block_{index}"
+
+        # Each block has its own chain of parents ending in block/cube_all
+        parent = "minecraft:block/cube_all"
+        for depth in range(parent_depth):
+            chain_name = f"{name}_parent_{depth}"
+            models[chain_name] = {"parent": parent, "textures": {"particle": "#all"}}
+            parent = f"minecraft:block/{chain_name}"
+        models[name] = {"parent": parent, "textures": {"all": "minecraft:block/" + rng.choice(texture_names)}}
+
+        if index % 4 == 0:
+            blockstates[name] = {"variants": {
+                f"facing={facing}": {"model": f"minecraft:block/{name}", "y": 90 * rotation}
+                for rotation, facing in enumerate(FACINGS)
+            }}
+        else:
+            blockstates[name] = {"variants": {"": {"model": f"minecraft:block/{name}"}}}
+
+    for index in range(multipart_blocks):
+        name = f"multipart_{index}"
+        texture = "minecraft:block/" + rng.choice(texture_names)
+        models[name + "_post"] = {"parent": "minecraft:block/post", "textures": {"texture": texture}}
+        models[name + "_side"] = {"parent": "minecraft:block/side", "textures": {"texture": texture}}
+
+        multipart = [{"apply": {"model": f"minecraft:block/{name}_post"}}]
+        for rotation, side in enumerate(SIDES):
+            multipart.append({
+                "when": {side: "true"},
+                "apply": {"model": f"minecraft:block/{name}_side", "y": 90 * rotation, "uvlock": True},
+            })
+        blockstates[name] = {"multipart": multipart}
+
+    with zipfile.ZipFile(path, "w") as jar:
+        for name, model in models.items():
+            jar.writestr(f"assets/minecraft/models/block/{name}.json", json.dumps(model))
+        for name, blockstate in blockstates.items():
+            jar.writestr(f"assets/minecraft/blockstates/{name}.json", json.dumps(blockstate))
+        for name in texture_names:
+            colour = (rng.randrange(256), rng.randrange(256), rng.randrange(256), 255)
+            jar.writestr(f"assets/minecraft/textures/block/{name}.png", make_png(16, 16, colour))
+
+    return list(blockstates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Minecraft jar")
+    parser.add_argument("path")
+    parser.add_argument("--block-states", type=int, default=500)
+    parser.add_argument("--multipart-blocks", type=int, default=100)
+    parser.add_argument("--parent-depth", type=int, default=4)
+    parser.add_argument("--textures", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    block_types = generate_jar(args.path, args.block_states, args.multipart_blocks, args.parent_depth, args.textures, args.seed)
+    print(f"Wrote {len(block_types)} block types to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import bpy
+from bpy.app.handlers import persistent
+
+from .core.geometry import DIRECTION_OFFSETS
+from .core.grid import GridIndex, get_matrix_cell, get_neighbour_cell
+
+
+def get_object_cell(obj, epsilon=1e-4):
+    """
+    Return the integer (x, y, z) grid cell of obj in Blender coordinates if it
+    is an unrotated, unscaled block on the block grid, otherwise return None.
+    """
+    return get_matrix_cell(obj.matrix_world, epsilon)
+
+
+class BlockGrid(GridIndex):
+    """
+    A spatial index of the block objects in the scene which sit exactly on the
+    block grid, so that neighbours can be found without looking at every object.
+
+    Objects are stored by name, and are checked when they are looked up, so
+    that renamed or deleted objects are never returned.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # The cells whose neighbourhood changed in the last depsgraph update
+        self.changed_cells = set()
+
+
+    def rebuild(self, scene):
+        self.clear()
+        for obj in scene.objects:
+            if obj.type == 'MESH' and obj.mcbde and obj.mcbde.block_type not in [""]:
+                self.update_object(obj)
+
+
+    def update_object(self, obj):
+        """
+        Move obj to the cell it currently occupies.
+
+        Returns the set of cells whose neighbourhood changed, which are
+        the old and new cells of obj.
+        """
+        new_cell = None
+        if obj.mcbde and obj.mcbde.block_type not in [""]:
+            new_cell = get_object_cell(obj)
+
+        return self.move(obj.name, new_cell)
+
+
+    def get_object(self, cell):
+        """
+        Return the block object in cell, or None if there is none.
+        """
+        name = self.get_name(cell)
+        if name is None:
+            return None
+
+        obj = bpy.data.objects.get(name)
+        if obj is None or get_object_cell(obj) != cell:
+            # The object was deleted or moved without us noticing
+            self.remove_cell(cell)
+            return None
+
+        return obj
+
+
+    def get_neighbours(self, cell):
+        """
+        Return a dict from direction to the neighbouring block object in that direction
+        """
+        neighbours = {}
+        for direction in DIRECTION_OFFSETS:
+            obj = self.get_object(get_neighbour_cell(cell, direction))
+            if obj is not None:
+                neighbours[direction] = obj
+        return neighbours
+
+
+    def get_cell(self, obj):
+        return self.get_name_cell(obj.name)
+
+
+block_grid = BlockGrid()
+
+
+@persistent
+def block_grid_depsgraph_handler(scene, depsgraph):
+    """
+    Move the blocks which changed to their new cells, and remember the old and
+    new cells, before the face culling and connection handlers look at them.
+    """
+    block_grid.changed_cells = set()
+
+    # The block grid is only kept up to date while face culling or auto connect is enabled
+    if not scene.mcbde.face_culling and not scene.mcbde.auto_connect:
+        return
+
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Object):
+            obj = update.id.original
+            if obj.type == 'MESH' and obj.mcbde and obj.mcbde.block_type not in [""]:
+                block_grid.changed_cells |= block_grid.update_object(obj)
+
+
+def register():
+    # This has to run before the handlers which read the grid
+    bpy.app.handlers.depsgraph_update_post.insert(0, block_grid_depsgraph_handler)
+
+
+def unregister():
+    bpy.app.handlers.depsgraph_update_post.remove(block_grid_depsgraph_handler)
@@ -0,0 +1,284 @@
+"""
+A visual block picker, showing an icon of the texture of each block type.
+
+The icons are decoded from the jar on a background thread the first time the
+picker is shown, and saved to a cache file per game version, so later
+sessions load them at once. The cache holds plain arrays rather than a pickle,
+so loading it can not run code planted in it. Blender data may only be changed on the main
+thread, so a timer moves the decoded icons into the previews collection.
+
+Block types are searched with a prefix and fuzzy search index.
+"""
+import logging
+import os
+import threading
+import zipfile
+import numpy as np
+import bpy
+import bpy.utils.previews
+
+from . import block_definitions
+from .data_loader import data_loader
+from .core.models import get_block_icon_texture
+from .core.png import decode_png, PngError
+from .core.search import BlockSearchIndex
+
+logger = logging.getLogger(__name__)
+
+# Seconds between moving decoded icons into the previews collection
+ICON_TIMER_INTERVAL = 0.25
+
+# The most blocks shown in the picker at once
+PICKER_MAX_ITEMS = 100
+
+block_search_index = BlockSearchIndex([(identifier, name) for identifier, name, _ in block_definitions.blocks])
+# Block type to its (number, name, description) for the picker items
+block_entries = {identifier: (number, name, description) for number, (identifier, name, description) in enumerate(block_definitions.blocks)}
+
+
+def get_block_names(edit_text=""):
+    """
+    Return the block types matching edit_text, best matches first, for the
+    search of block type properties
+    """
+    return block_search_index.search(edit_text)
+
+
+def get_first_frame(width, height, pixels):
+    """
+    Return the top square of animated textures, which are frames stacked vertically
+    """
+    if height <= width:
+        return width, height, pixels
+    return width, width, pixels[:width * width * 4]
+
+
+def decode_block_icons(minecraft_location, block_types, result, stop_event):
+    """
+    Decode the icon of each block type into result, a dict from block type to
+    (width, height, pixels). Runs on a background thread.
+
+    Returns whether every block type was looked at, which is False if
+    stop_event was set first.
+    """
+    with zipfile.ZipFile(minecraft_location, 'r') as jar:
+        file_names = set(jar.namelist())
+        for block_type in block_types:
+            if stop_event.is_set():
+                return False
+            texture = get_block_icon_texture(data_loader, block_type)
+            file_name = f"{data_loader.textures_path}/{texture}.png"
+            if texture is None or file_name not in file_names:
+                continue
+            try:
+                result[block_type] = get_first_frame(*decode_png(jar.read(file_name)))
+            except (PngError, ValueError) as e:
+                logger.warning("Could not decode the icon of %s: %s", block_type, e)
+    return True
+
+
+def save_icon_cache(path, decoded):
+    """
+    Save the decoded icons to path as one array of pixel rows per block type
+    """
+    arrays = {
+        block_type: np.frombuffer(bytes(pixels), dtype=np.uint8).reshape(height, width * 4)
+        for block_type, (width, height, pixels) in decoded.items()
+    }
+    with open(path, "wb") as cache_file:
+        np.savez(cache_file, **arrays)
+
+
+def load_icon_cache(path):
+    """
+    Return the decoded icons saved by save_icon_cache
+    """
+    with np.load(path, allow_pickle=False) as arrays:
+        decoded = {}
+        for block_type in arrays.files:
+            rows = arrays[block_type]
+            decoded[block_type] = (rows.shape[1] // 4, rows.shape[0], rows.tobytes())
+        return decoded
+
+
+class BlockIcons:
+    """
+    The icons of the block types of one game version, and the background
+    thread decoding them.
+    """
+
+    def __init__(self):
+        self.previews = None
+        self.version = None
+        self.decoded = {}
+        self.thread = None
+        self.stop_event = threading.Event()
+        # Set by the thread once every icon was decoded, so a partial result is never cached
+        self.is_complete = False
+
+
+    def get_cache_path(self):
+        return os.path.join(data_loader.get_preview_directory(), f"icons_{self.version}.npz")
+
+
+    def start(self):
+        """
+        Start loading the icons of the loaded game version, from the cache if
+        there is one, otherwise on a background thread
+        """
+        self.stop()
+        if self.previews is None:
+            self.previews = bpy.utils.previews.new()
+        self.previews.clear()
+        self.version = data_loader.get_version()
+        self.decoded = {}
+
+        cache_path = self.get_cache_path()
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(data_loader.minecraft_location):
+            try:
+                self.decoded = load_icon_cache(cache_path)
+            except (OSError, ValueError) as e:
+                logger.warning("Could not load the block icon cache: %s", e)
+            else:
+                self.add_decoded_icons()
+                return
+
+        self.stop_event = threading.Event()
+        self.is_complete = False
+        block_types = [identifier for identifier, _, _ in block_definitions.blocks]
+        self.thread = threading.Thread(
+            target=self.decode,
+            args=(data_loader.minecraft_location, block_types, self.stop_event),
+            daemon=True,
+        )
+        self.thread.start()
+        if not bpy.app.timers.is_registered(update_block_icons):
+            bpy.app.timers.register(update_block_icons, first_interval=ICON_TIMER_INTERVAL)
+
+
+    def decode(self, minecraft_location, block_types, stop_event):
+        """
+        Decode the icons on the background thread, reporting errors here as
+        they would otherwise end the thread without a trace
+        """
+        try:
+            self.is_complete = decode_block_icons(minecraft_location, block_types, self.decoded, stop_event)
+        except (OSError, zipfile.BadZipFile) as e:
+            logger.error("Could not read the block icons from %s: %s", minecraft_location, e)
+        except Exception:
+            logger.exception("Could not decode the block icons")
+
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+    def add_decoded_icons(self):
+        """
+        Add the icons decoded so far to the previews collection
+        """
+        for block_type, (width, height, pixels) in list(self.decoded.items()):
+            if block_type in self.previews:
+                continue
+            # Preview rows go from the bottom up
+            rows = np.frombuffer(bytes(pixels), dtype=np.uint8).reshape(height, width * 4)
+            preview = self.previews.new(block_type)
+            preview.image_size = (width, height)
+            preview.image_pixels_float = (rows[::-1].ravel() / 255.0).tolist()
+
+
+    def update(self):
+        """
+        Timer moving the decoded icons into the previews collection, and
+        saving the cache once the thread has decoded all of them
+        """
+        self.add_decoded_icons()
+        for window in bpy.context.window_manager.windows:
+            for area in window.screen.areas:
+                if area.type == 'VIEW_3D':
+                    area.tag_redraw()
+
+        if self.thread is not None and self.thread.is_alive():
+            return ICON_TIMER_INTERVAL
+
+        if self.thread is not None:
+            self.thread = None
+            if self.is_complete:
+                self.save_cache()
+        return None
+
+
+    def save_cache(self):
+        try:
+            save_icon_cache(self.get_cache_path(), self.decoded)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not save the block icon cache: %s", e)
+
+
+    def get_icon_id(self, block_type):
+        """
+        Return the icon of block_type, starting to load the icons of the
+        loaded game version if they are not loaded yet. Icons which are not
+        decoded yet are 0.
+        """
+        if self.version != data_loader.get_version():
+            self.start()
+        preview = self.previews.get(block_type)
+        return preview.icon_id if preview is not None else 0
+
+
+    def unregister(self):
+        self.stop()
+        if bpy.app.timers.is_registered(update_block_icons):
+            bpy.app.timers.unregister(update_block_icons)
+        if self.previews is not None:
+            bpy.utils.previews.remove(self.previews)
+            self.previews = None
+        self.version = None
+
+
+block_icons = BlockIcons()
+
+
+def update_block_icons():
+    return block_icons.update()
+
+
+# Blender does not keep the strings of dynamic enum items, so the items of the
+# last search are kept here
+picker_items = {"key": None, "items": []}
+
+
+def get_picker_items(self, context):
+    """
+    Items of the block picker, the block types matching the search of the scene
+    """
+    if not data_loader.is_initialized():
+        return []
+
+    block_names = block_search_index.search(self.block_search, PICKER_MAX_ITEMS)
+    key = (tuple(block_names), tuple(block_icons.get_icon_id(name) for name in block_names))
+    if key != picker_items["key"]:
+        picker_items["key"] = key
+        picker_items["items"] = []
+        for block_type, icon_id in zip(*key):
+            number, name, description = block_entries[block_type]
+            picker_items["items"].append((block_type, name, description, icon_id, number))
+    return picker_items["items"]
+
+
+def update_block_picker(self, context):
+    """
+    Called when a block is picked, changing the selected blocks to it
+    """
+    active = context.active_object
+    if active is None or active.type != 'MESH' or not active.mcbde:
+        return
+    active.mcbde.block_type = self.block_picker
+
+
+def unregister():
+    block_icons.unregister()
@@ -0,0 +1,184 @@
+"""
+An index of the block objects in the file by block type and block state.
+
+Finding every block of a type would otherwise mean reading the block type
+of every object. The registry is updated when block types and variants are
+changed in the panel, from the depsgraph for objects created or changed in
+other ways, and rebuilt after loading a file or undoing.
+"""
+import bpy
+from bpy.app.handlers import persistent
+
+from .core.registry import INSTANCER, RegistryIndex
+
+
+def is_block_object(obj):
+    return obj.type == 'MESH' and obj.mcbde and obj.mcbde.block_type not in [""]
+
+
+def get_state_key(obj):
+    """
+    Return the selected properties of obj in a canonical order, so that equal
+    block states have equal keys
+
+    Example return value:
+    (('facing', 'north'), ('half', 'top'))
+    """
+    return tuple(sorted((property.name, property.value) for property in obj.mcbde.block_properties))
+
+
+def get_registry_key(obj):
+    """
+    Return what obj is indexed under, (block type, state key) for blocks,
+    INSTANCER for instancers and None for other objects
+    """
+    # instancing_util imports properties_util, which imports this module, so it is only imported once needed
+    from .instancing_util import is_instancer
+
+    if is_instancer(obj):
+        return INSTANCER
+    if is_block_object(obj):
+        return (obj.mcbde.block_type, get_state_key(obj))
+    return None
+
+
+def get_current_key(name):
+    """
+    Return the registry key of the object called name, or None if it was deleted
+    """
+    obj = bpy.data.objects.get(name)
+    return get_registry_key(obj) if obj is not None else None
+
+
+class BlockRegistry(RegistryIndex):
+    """
+    Block objects indexed by block type and by (block type, state key), and
+    the instancer objects.
+
+    Like the block grid, objects are stored by name and checked when they are
+    looked up, so that renamed, deleted or changed objects are never returned
+    under a stale key. The objects are kept in the order they were found in,
+    which is the order of the objects in each scene after a rebuild.
+    """
+
+    def clear(self):
+        super().clear()
+        # The number of objects in the file when the registry was last complete
+        self.object_count = -1
+
+
+    def rebuild(self):
+        self.clear()
+        for scene in bpy.data.scenes:
+            for obj in scene.objects:
+                self.update_object(obj)
+        for obj in bpy.data.objects:
+            self.update_object(obj)
+        self.object_count = len(bpy.data.objects)
+
+
+    def ensure_complete(self):
+        """
+        Rebuild the registry if objects were created or deleted without it
+        seeing them, such as by scripts which do not update the depsgraph
+        """
+        if len(bpy.data.objects) != self.object_count:
+            self.rebuild()
+
+
+    def update_object(self, obj):
+        """
+        Index obj under its current block state, or remove it if it is no
+        longer a block or instancer
+        """
+        self.set_key(obj.name, get_registry_key(obj))
+
+
+    def get_scene_objects(self, names, scene):
+        """
+        Return the objects called names, in the scene if one is given
+        """
+        return [
+            bpy.data.objects[name] for name in names
+            if scene is None or scene.objects.get(name) is not None
+        ]
+
+
+    def get_objects(self, scene=None):
+        """
+        Return the block and instancer objects, in the scene if one is given
+        """
+        self.ensure_complete()
+        return self.get_scene_objects(self.get_names(get_current_key), scene)
+
+
+    def get_type_objects(self, block_type, scene=None):
+        """
+        Return the block objects of block_type, in the scene if one is given
+        """
+        self.ensure_complete()
+        return self.get_scene_objects(self.get_type_names(block_type, get_current_key), scene)
+
+
+    def get_state_objects(self, block_type, state_key, scene=None):
+        """
+        Return the block objects with exactly the block state, in the scene if
+        one is given
+        """
+        self.ensure_complete()
+        return self.get_scene_objects(self.get_state_names(block_type, state_key, get_current_key), scene)
+
+
+    def get_state_counts(self, scene=None):
+        """
+        Return a dict from (block type, state key) to the number of block
+        objects with that state, in the scene if one is given
+        """
+        counts = {}
+        for obj in self.get_objects(scene):
+            key = self.objects[obj.name]
+            if key != INSTANCER:
+                counts[key] = counts.get(key, 0) + 1
+        return counts
+
+
+block_registry = BlockRegistry()
+
+
+def update_objects(objects):
+    for obj in objects:
+        block_registry.update_object(obj)
+
+
+@persistent
+def registry_depsgraph_handler(scene, depsgraph):
+    """
+    Index objects which were created, renamed or changed outside of the panel
+    """
+    if not depsgraph.id_type_updated('OBJECT'):
+        return
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Object):
+            block_registry.update_object(update.id.original)
+    # New objects are always in the updates, and deleted ones are dropped when looked up
+    if block_registry.object_count >= 0:
+        block_registry.object_count = len(bpy.data.objects)
+
+
+@persistent
+def registry_rebuild_handler(*args):
+    block_registry.rebuild()
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(registry_depsgraph_handler)
+    bpy.app.handlers.load_post.append(registry_rebuild_handler)
+    bpy.app.handlers.undo_post.append(registry_rebuild_handler)
+    bpy.app.handlers.redo_post.append(registry_rebuild_handler)
+
+
+def unregister():
+    bpy.app.handlers.redo_post.remove(registry_rebuild_handler)
+    bpy.app.handlers.undo_post.remove(registry_rebuild_handler)
+    bpy.app.handlers.load_post.remove(registry_rebuild_handler)
+    bpy.app.handlers.depsgraph_update_post.remove(registry_depsgraph_handler)
@@ -0,0 +1,390 @@
+"""
+Exporting many scenes at once from the command line.
+
+Scene JSON files only need the core package and run with plain Python:
+
+    python cli.py --jar 1.20.1.jar --output out rig1.json rig2.json
+
+.blend files are each exported by a background Blender process, which can
+be started from plain Python or from Blender:
+
+    python cli.py --blender /path/to/blender --jar 1.20.1.jar --output out rig1.blend
+    blender -b --python cli.py -- --jar 1.20.1.jar --output out rig1.blend rig2.blend
+
+The jar is parsed once, and the parsed data is cached on disk per game
+version, so that every worker process loads the cache instead of the jar.
+
+A scene JSON file has a list of passengers, as returned by get_passengers in
+the add-on, with transformations in Minecraft coordinates, and optionally
+the export settings:
+
+    {"passengers": [...], "settings": {"compact": true, "cull_hidden": true}}
+
+With the macros setting, a data pack of function macros for 1.20.2 or newer
+is written instead, see core/macros.py.
+"""
+import argparse
+import concurrent.futures
+import importlib
+import importlib.util
+import json
+import os
+import stat
+import subprocess
+import sys
+import time
+
+ADDON_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ADDON_DIRECTORY)
+
+from core.data import JarData
+from core.datapack import write_datapack
+from core.coordinates import ORIGIN_LOCATION
+from core.commands import add_passenger_tags, check_entity_tag, get_root_tag
+from core.export import optimize_passengers, get_commands, get_root_entities, parse_lod_tiers, assign_view_ranges
+from core.macros import build_macro_functions, MACRO_PACK_FORMAT
+from core.models import is_full_cube, is_opaque_full_cube, get_block_bounds_getter
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+# bpy can also be installed as a module, which has no Blender executable
+IN_BLENDER = bpy is not None and bool(bpy.app.binary_path)
+
+DEFAULT_SETTINGS = {
+    "compact": False,
+    "tolerance": 0.0001,
+    "use_decomposed": True,
+    "entity_tag": "",
+    "chunk_size": None,
+    "remove_duplicates": False,
+    "merge_block_types": None,
+    "cull_hidden": False,
+    "culling_boxes": False,
+    "lod_tiers": None,
+    "macros": False,
+}
+
+# The data of the game version used by this worker process
+worker_data = None
+
+
+def get_default_cache_directory():
+    """
+    Return the directory of the data caches of this user
+    """
+    if os.name == "nt":
+        base_directory = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base_directory = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base_directory, "mcbde")
+
+
+def check_private_path(path):
+    """
+    Raise a RuntimeError unless path is owned by this user and cannot be
+    written by others. The caches are unpickled, which can run any code, so
+    other users must not be able to plant them.
+    """
+    if os.name != "posix":
+        return
+    status = os.stat(path)
+    if status.st_uid != os.getuid() or status.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise RuntimeError(f"{path} must be owned by you and not writable by other users")
+
+
+def get_cache_path(jar_path, cache_directory):
+    data = JarData()
+    data.minecraft_location = jar_path
+    return os.path.join(cache_directory, f"mcbde_data_{data.get_version()}.pickle")
+
+
+def prepare_data_cache(jar_path, cache_directory):
+    """
+    Return the path of the data cache of the jar, parsing the jar and writing
+    the cache if it is missing or older than the jar
+    """
+    os.makedirs(cache_directory, mode=0o700, exist_ok=True)
+    check_private_path(cache_directory)
+
+    cache_path = get_cache_path(jar_path, cache_directory)
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(jar_path):
+        check_private_path(cache_path)
+        return cache_path
+
+    data = JarData()
+    data.initialize_data(jar_path)
+    if not data.is_initialized():
+        raise RuntimeError(f"Could not load {jar_path}")
+    data.write_cache(cache_path)
+    return cache_path
+
+
+def load_worker_data(cache_path):
+    global worker_data
+    worker_data = JarData()
+    worker_data.load_cache(cache_path)
+
+
+def export_scene(data, passengers, settings, output_path, namespace, datapack):
+    """
+    Optimize and export the passengers of a scene with settings, writing the
+    commands to the function file output_path, or to a data pack there.
+    Macro function data packs are always written as data packs.
+
+    Returns the number of passengers, commands and command bytes.
+    """
+    settings = {**DEFAULT_SETTINGS, **settings}
+    check_entity_tag(settings["entity_tag"])
+    if settings["entity_tag"]:
+        # Passengers from scene JSON files are not tagged yet
+        add_passenger_tags(passengers, settings["entity_tag"])
+
+    passengers, _ = optimize_passengers(
+        passengers,
+        lambda block_type, properties: is_full_cube(data, block_type, properties),
+        lambda block_type, properties: is_opaque_full_cube(data, block_type, properties),
+        remove_duplicates=settings["remove_duplicates"],
+        merge_block_types=settings["merge_block_types"],
+        cull_hidden=settings["cull_hidden"],
+    )
+    get_state_bounds = get_block_bounds_getter(data)
+    if settings["lod_tiers"]:
+        passengers, _ = assign_view_ranges(passengers, get_state_bounds, parse_lod_tiers(settings["lod_tiers"]))
+    format_options = {
+        "compact": settings["compact"],
+        "tolerance": settings["tolerance"],
+        "use_decomposed": settings["use_decomposed"],
+    }
+
+    if settings["macros"]:
+        entity_tag = settings["entity_tag"]
+        roots = get_root_entities(
+            passengers,
+            ORIGIN_LOCATION,
+            entity_tag,
+            settings["chunk_size"],
+            get_state_bounds if settings["culling_boxes"] else None,
+        )
+        root_tags = [entity_tag, get_root_tag(entity_tag)] if entity_tag else None
+        functions = build_macro_functions(os.path.basename(output_path), namespace, roots, root_tags, **format_options)
+        write_datapack(output_path, namespace, functions, pack_format=MACRO_PACK_FORMAT)
+        commands = [command for function_commands in functions.values() for command in function_commands]
+        return {
+            "passengers": len(passengers),
+            "commands": len(commands),
+            "bytes": sum(len(command) for command in commands),
+        }
+
+    commands = get_commands(
+        passengers,
+        ORIGIN_LOCATION,
+        settings["entity_tag"],
+        settings["chunk_size"],
+        get_state_bounds if settings["culling_boxes"] else None,
+        **format_options
+    )
+
+    if datapack:
+        write_datapack(output_path, namespace, {os.path.basename(output_path): commands})
+    else:
+        with open(output_path + ".mcfunction", "w") as function_file:
+            # Commands in functions do not start with a slash
+            function_file.write("\n".join(command.removeprefix("/") for command in commands) + "\n")
+
+    return {
+        "passengers": len(passengers),
+        "commands": len(commands),
+        "bytes": sum(len(command) for command in commands),
+    }
+
+
+def get_output_path(input_path, output_directory, scene_name=None):
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    if scene_name:
+        stem += "_" + scene_name
+    return os.path.join(output_directory, stem.lower().replace(" ", "_"))
+
+
+def export_json_file(path, output_directory, namespace, datapack):
+    """
+    Export a scene JSON file with the data of this worker process
+    """
+    with open(path) as scene_file:
+        scene = json.load(scene_file)
+    output_path = get_output_path(path, output_directory)
+    return [export_scene(worker_data, scene["passengers"], scene.get("settings", {}), output_path, namespace, datapack)]
+
+
+def export_blend_file(path, blender, cache_path, output_directory, namespace, datapack):
+    """
+    Export every scene of a .blend file in a background Blender process
+    """
+    command = [
+        blender, "-b", path, "--python", os.path.abspath(__file__), "--",
+        "--worker-cache", cache_path, "--output", output_directory, "--namespace", namespace,
+    ]
+    if datapack:
+        command.append("--datapack")
+
+    completed = subprocess.run(command, capture_output=True, text=True)
+    for line in completed.stdout.splitlines():
+        if line.startswith("MCBDE_RESULT "):
+            return json.loads(line.removeprefix("MCBDE_RESULT "))
+    raise RuntimeError(f"Blender failed to export {path}:\n{completed.stderr or completed.stdout}")
+
+
+def run_input(path, options):
+    start = time.perf_counter()
+    if path.endswith(".blend"):
+        results = export_blend_file(path, options["blender"], options["cache_path"], options["output"], options["namespace"], options["datapack"])
+    else:
+        results = export_json_file(path, options["output"], options["namespace"], options["datapack"])
+    return {"seconds": time.perf_counter() - start, "scenes": results}
+
+
+def load_addon():
+    """
+    Import the add-on inside Blender, registering it unless it is already
+    enabled, and return its operators module
+    """
+    name = os.path.basename(ADDON_DIRECTORY)
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(ADDON_DIRECTORY, "__init__.py"), submodule_search_locations=[ADDON_DIRECTORY])
+        addon = importlib.util.module_from_spec(spec)
+        sys.modules[name] = addon
+        spec.loader.exec_module(addon)
+    if not hasattr(bpy.types.Object, "mcbde"):
+        sys.modules[name].register()
+    return importlib.import_module(name + ".operators")
+
+
+def get_scene_settings(scene_properties):
+    """
+    Return the export settings of a scene in the add-on
+    """
+    return {
+        "compact": scene_properties.compact_output,
+        "tolerance": scene_properties.compact_tolerance,
+        "use_decomposed": scene_properties.use_decomposed_transformation,
+        "entity_tag": scene_properties.entity_tag,
+        "chunk_size": scene_properties.chunk_size if scene_properties.chunked_export else None,
+        "remove_duplicates": scene_properties.remove_duplicates,
+        "merge_block_types": scene_properties.merge_block_types if scene_properties.merge_blocks else None,
+        "cull_hidden": scene_properties.cull_hidden_blocks,
+        "culling_boxes": scene_properties.culling_boxes,
+        "lod_tiers": scene_properties.lod_tier_ranges if scene_properties.lod_tiers else None,
+    }
+
+
+def run_blender_worker(args):
+    """
+    Export every scene of the open .blend file which has blocks, and print
+    the results for the process which started this one
+    """
+    operators = load_addon()
+    load_worker_data(args.worker_cache)
+
+    scenes = [(scene, operators.get_passengers(scene)) for scene in bpy.data.scenes]
+    scenes = [(scene, passengers) for scene, passengers in scenes if passengers]
+
+    results = []
+    for scene, passengers in scenes:
+        scene_name = scene.name if len(scenes) > 1 else None
+        output_path = get_output_path(bpy.data.filepath, args.output, scene_name)
+        results.append(export_scene(worker_data, passengers, get_scene_settings(scene.mcbde), output_path, args.namespace, args.datapack))
+
+    print("MCBDE_RESULT " + json.dumps(results))
+
+
+def print_summary(timings, wall_seconds):
+    for path, timing in timings.items():
+        if "error" in timing:
+            print(f"{path}: failed, {timing['error']}")
+            continue
+        passengers = sum(scene["passengers"] for scene in timing["scenes"])
+        commands = sum(scene["commands"] for scene in timing["scenes"])
+        print(f"{path}: {timing['seconds']:.2f} s, {passengers} entities in {commands} commands")
+
+    total = sum(timing.get("seconds", 0) for timing in timings.values())
+    print(f"Exported {len(timings)} inputs in {wall_seconds:.2f} s ({total:.2f} s of work)")
+
+
+def get_arguments():
+    # Blender passes the arguments for the script after --
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description="Export scene JSON and .blend files to block display commands")
+    parser.add_argument("inputs", nargs="*", help="Scene JSON and .blend files")
+    parser.add_argument("--jar", help="The Minecraft jar of the game version to export for")
+    parser.add_argument("--output", default=".", help="The directory to write the functions or data packs to")
+    parser.add_argument("--datapack", action="store_true", help="Write a data pack per input instead of a function file")
+    parser.add_argument("--namespace", default="mcbde", help="The namespace of the functions in data packs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="The number of worker processes")
+    parser.add_argument("--blender", default=bpy.app.binary_path if IN_BLENDER else "blender", help="The Blender executable used for .blend files")
+    parser.add_argument("--cache", default=get_default_cache_directory(), help="The directory of the parsed data caches, which must only be writable by you")
+    parser.add_argument("--summary", help="Also write the timings to this JSON file")
+    parser.add_argument("--worker-cache", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = get_arguments()
+
+    if args.worker_cache:
+        run_blender_worker(args)
+        return
+
+    if not args.jar or not args.inputs:
+        print("Give the jar with --jar and at least one input")
+        sys.exit(2)
+
+    start = time.perf_counter()
+    try:
+        cache_path = prepare_data_cache(args.jar, args.cache)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+
+    os.makedirs(args.output, exist_ok=True)
+    options = {
+        "blender": args.blender,
+        "cache_path": cache_path,
+        "output": args.output,
+        "namespace": args.namespace,
+        "datapack": args.datapack,
+    }
+
+    # Blender's Python cannot start worker processes of itself, so inside
+    # Blender the inputs run on threads, and .blend files still get their
+    # own Blender processes
+    if IN_BLENDER:
+        load_worker_data(options["cache_path"])
+        executor = concurrent.futures.ThreadPoolExecutor(args.workers)
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(args.workers, initializer=load_worker_data, initargs=(options["cache_path"],))
+
+    timings = {}
+    with executor:
+        futures = {executor.submit(run_input, path, options): path for path in args.inputs}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                timings[futures[future]] = future.result()
+            except Exception as e:
+                timings[futures[future]] = {"error": str(e)}
+
+    wall_seconds = time.perf_counter() - start
+    print_summary(timings, wall_seconds)
+
+    if args.summary:
+        with open(args.summary, "w") as summary_file:
+            json.dump({"seconds": wall_seconds, "inputs": timings}, summary_file, indent=2)
+
+    if any("error" in timing for timing in timings.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Connecting fences, walls, panes and stairs to their neighbours.
+
+The neighbours of each block are found with the block grid, the connection
+properties of all blocks are worked out in one pass, and then the blocks
+which changed are updated, sharing the model lookup of each new state.
+"""
+import bpy
+from bpy.app.handlers import persistent
+
+from .data_loader import data_loader
+from .block_grid import block_grid, get_neighbour_cell
+from .block_registry import block_registry, is_block_object
+from .core.blockstates import get_outer_model_data
+from .core.connections import get_connected_properties, is_connecting
+from .properties_util import get_selected_properties, is_opaque_full_cube, change_block_visuals
+
+is_updating_connections = False
+
+
+def get_block_state(obj):
+    return (obj.mcbde.block_type, get_selected_properties(obj))
+
+
+def get_grid_neighbour_getter(cell):
+    """
+    Return a function from Minecraft direction to the block state of the
+    neighbour of cell in that direction
+    """
+    def get_neighbour(direction):
+        neighbour = block_grid.get_object(get_neighbour_cell(cell, direction))
+        if neighbour is None:
+            return None
+        return get_block_state(neighbour)
+
+    return get_neighbour
+
+
+def get_connection_changes(objects):
+    """
+    Return (obj, properties) for every connecting block in objects whose
+    connection properties do not match its neighbours
+    """
+    changes = []
+    for obj in objects:
+        if not is_block_object(obj) or not is_connecting(obj.mcbde.block_type):
+            continue
+        cell = block_grid.get_cell(obj)
+        if cell is None:
+            continue
+
+        block_type, properties = get_block_state(obj)
+        connected = get_connected_properties(block_type, properties, get_grid_neighbour_getter(cell), is_opaque_full_cube)
+        if connected != properties:
+            changes.append((obj, connected))
+    return changes
+
+
+def apply_connection_changes(changes):
+    """
+    Set the properties of each changed block and rebuild its model, looking
+    up the model of each distinct block state once
+    """
+    outer_model_cache = {}
+    for obj, properties in changes:
+        for block_property in obj.mcbde.block_properties:
+            if block_property.name in properties:
+                block_property["value"] = properties[block_property.name]
+        # The model choice picks from the random models of the previous state
+        if obj.mcbde.model_choice:
+            obj.mcbde["model_choice"] = 0
+
+        state_key = (obj.mcbde.block_type, tuple(properties.items()))
+        if state_key not in outer_model_cache:
+            blockstate = data_loader.get_data("blockstates", obj.mcbde.block_type)
+            outer_model_cache[state_key] = get_outer_model_data(blockstate, properties)
+
+        outer_model_data = outer_model_cache[state_key]
+        if outer_model_data is not None:
+            change_block_visuals(obj, outer_model_data)
+        block_registry.update_object(obj)
+
+
+def get_objects_around(objects):
+    """
+    Return objects and their neighbours, by name
+    """
+    around = {}
+    for obj in objects:
+        around[obj.name] = obj
+        cell = block_grid.get_cell(obj)
+        if cell is None:
+            continue
+        for neighbour in block_grid.get_neighbours(cell).values():
+            around[neighbour.name] = neighbour
+    return around
+
+
+def connect_blocks(objects, scene):
+    """
+    Update the connections of objects and of the blocks next to them.
+
+    Returns the number of blocks which changed.
+    """
+    global is_updating_connections
+
+    # The block grid is only kept up to date while face culling or auto connect is enabled
+    if not scene.mcbde.face_culling and not scene.mcbde.auto_connect:
+        block_grid.rebuild(scene)
+
+    changes = get_connection_changes(get_objects_around(objects).values())
+
+    is_updating_connections = True
+    try:
+        apply_connection_changes(changes)
+    finally:
+        is_updating_connections = False
+
+    return len(changes)
+
+
+def update_auto_connect(self, context):
+    """
+    Called when auto connect is enabled or disabled in the scene.
+    """
+    if self.auto_connect:
+        block_grid.rebuild(context.scene)
+        connect_blocks(list(context.scene.objects), context.scene)
+
+
+@persistent
+def connections_depsgraph_handler(scene, depsgraph):
+    """
+    Connect blocks which were moved, added or changed to their new neighbours
+    """
+    if is_updating_connections or not data_loader.is_initialized() or not scene.mcbde.auto_connect:
+        return
+
+    changed = []
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Object):
+            obj = update.id.original
+            if is_block_object(obj):
+                changed.append(obj)
+
+    if not changed:
+        return
+
+    # Neighbours are found at the old cells too, so that blocks moved away disconnect.
+    # The block grid handler has already moved the blocks and kept their old cells.
+    old_neighbours = []
+    for cell in block_grid.changed_cells:
+        old_neighbours.extend(block_grid.get_neighbours(cell).values())
+
+    connect_blocks(changed + old_neighbours, scene)
+
+
+@persistent
+def connections_load_handler(*args):
+    if bpy.context.scene and bpy.context.scene.mcbde.auto_connect and not bpy.context.scene.mcbde.face_culling:
+        block_grid.rebuild(bpy.context.scene)
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(connections_depsgraph_handler)
+    bpy.app.handlers.load_post.append(connections_load_handler)
+
+
+def unregister():
+    bpy.app.handlers.load_post.remove(connections_load_handler)
+    bpy.app.handlers.depsgraph_update_post.remove(connections_depsgraph_handler)
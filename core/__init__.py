@@ -0,0 +1,9 @@
+"""
+The parts of the add-on which do not depend on Blender: reading the game
+data, resolving block models, reading and writing commands, structure files
+and datapacks, and the optimization passes run before export.
+
+Nothing in this package imports bpy or mathutils, and it only uses relative
+imports, so it can be used from plain Python with the add-on directory on
+sys.path, for example by benchmarks or command line tools.
+"""
@@ -0,0 +1,175 @@
+"""
+Turning baked per-frame passenger transformations into interpolated data merge commands.
+
+The game interpolates block display transformations by linearly interpolating
+the translation and scale and spherically interpolating the rotations, so
+keyframes are reduced using the same interpolation.
+"""
+import math
+
+from .commands import decompose_transformation, compose_transformation
+
+
+def get_entity_selector(tag):
+    return f"@e[type=minecraft:block_display,tag={tag},limit=1]"
+
+
+def get_culling_box_command(entity_tag, width, height):
+    """
+    Return the command which sets the culling box of every passenger tagged
+    entity_tag, with width and height already formatted.
+
+    data merge entity only takes a single target, so it is run as each passenger.
+    """
+    return (
+        f"execute as @e[type=minecraft:block_display,tag={entity_tag}] run "
+        f"data merge entity @s {{width:{width},height:{height}}}"
+    )
+
+
+def lerp(a, b, t):
+    return [x + (y - x) * t for x, y in zip(a, b)]
+
+
+def slerp(q0, q1, t):
+    """
+    Spherically interpolate between the quaternions q0 and q1
+    """
+    dot = sum(a * b for a, b in zip(q0, q1))
+    if dot < 0:
+        # Take the shortest path
+        q1 = [-value for value in q1]
+        dot = -dot
+
+    if dot > 0.9995:
+        q = lerp(q0, q1, t)
+    else:
+        theta = math.acos(dot)
+        sin_theta = math.sin(theta)
+        w0 = math.sin((1 - t) * theta) / sin_theta
+        w1 = math.sin(t * theta) / sin_theta
+        q = [w0 * a + w1 * b for a, b in zip(q0, q1)]
+
+    norm = math.sqrt(sum(value * value for value in q)) or 1
+    return [value / norm for value in q]
+
+
+def interpolate_transformation(m0, m1, t):
+    """
+    Return the transformation t of the way from m0 to m1, the way the game
+    interpolates it
+    """
+    d0 = decompose_transformation(m0)
+    d1 = decompose_transformation(m1)
+
+    if d0 is None or d1 is None:
+        # There is shear, so we fall back to interpolating the matrix entries
+        return [lerp(m0[row], m1[row], t) for row in range(4)]
+
+    return compose_transformation({
+        "translation": lerp(d0["translation"], d1["translation"], t),
+        "left_rotation": slerp(d0["left_rotation"], d1["left_rotation"], t),
+        "scale": lerp(d0["scale"], d1["scale"], t),
+        "right_rotation": slerp(d0["right_rotation"], d1["right_rotation"], t),
+    })
+
+
+def transformation_difference(m0, m1):
+    """
+    Return the largest difference between entries of the two matrices
+    """
+    return max(abs(m0[row][column] - m1[row][column]) for row in range(4) for column in range(4))
+
+
+def reduce_keyframes(transformations, ticks, tolerance):
+    """
+    Return the indices of the transformations which must be kept as keyframes,
+    so that interpolating between them gives every other transformation
+    to within tolerance.
+
+    Each keyframe is extended greedily as far as the interpolation allows.
+    """
+    if not transformations:
+        return []
+
+    keyframes = [0]
+    start = 0
+    while start < len(transformations) - 1:
+        end = start + 1
+        while end + 1 < len(transformations) and segment_fits(transformations, ticks, start, end + 1, tolerance):
+            end += 1
+        keyframes.append(end)
+        start = end
+
+    return keyframes
+
+
+def segment_fits(transformations, ticks, start, end, tolerance):
+    duration = ticks[end] - ticks[start]
+    for i in range(start + 1, end):
+        t = (ticks[i] - ticks[start]) / duration if duration else 1
+        interpolated = interpolate_transformation(transformations[start], transformations[end], t)
+        if transformation_difference(interpolated, transformations[i]) > tolerance:
+            return False
+    return True
+
+
+def build_animation_commands(tracks, ticks, tolerance, format_transformation):
+    """
+    Build the commands which play back an animation.
+
+    tracks is a dict from the tag of each passenger to its list of
+    transformations, one for each tick in ticks.
+
+    Returns the commands which reset every animated passenger to the first frame,
+    and a dict from tick to the data merge commands which start the
+    interpolation to the next keyframe on that tick. Passengers which never move
+    further than tolerance are left out entirely.
+    """
+    reset_commands = []
+    tick_commands = {}
+
+    for tag, transformations in tracks.items():
+        if all(transformation_difference(transformations[0], m) <= tolerance for m in transformations):
+            continue
+
+        selector = get_entity_selector(tag)
+        reset_commands.append(
+            f"data merge entity {selector} "
+            f"{{transformation:{format_transformation(transformations[0])},interpolation_duration:0,start_interpolation:0}}"
+        )
+
+        keyframes = reduce_keyframes(transformations, ticks, tolerance)
+        for start, end in zip(keyframes, keyframes[1:]):
+            if transformation_difference(transformations[start], transformations[end]) <= tolerance:
+                # The passenger holds still, so nothing needs to be sent
+                continue
+            duration = ticks[end] - ticks[start]
+            tick_commands.setdefault(ticks[start], []).append(
+                f"data merge entity {selector} "
+                f"{{transformation:{format_transformation(transformations[end])},interpolation_duration:{duration},start_interpolation:0}}"
+            )
+
+    return reset_commands, tick_commands
+
+
+def build_animation_functions(name, namespace, tracks, ticks, tolerance, format_transformation, setup_commands=()):
+    """
+    Return a dict from function path to commands for an animation data pack.
+
+    Running namespace:name/start runs setup_commands, resets the passengers
+    and schedules one function for every tick on which a passenger starts a
+    new interpolation.
+    """
+    reset_commands, tick_commands = build_animation_commands(tracks, ticks, tolerance, format_transformation)
+
+    # Interpolations are started a tick after the reset, so the reset is not interpolated
+    start_commands = list(setup_commands) + reset_commands
+    functions = {}
+    for tick in sorted(tick_commands):
+        function_path = f"{name}/t{tick}"
+        functions[function_path] = tick_commands[tick]
+        start_commands.append(f"schedule function {namespace}:{function_path} {tick + 1}t append")
+
+    functions[f"{name}/start"] = start_commands
+    return functions
@@ -0,0 +1,207 @@
+"""
+Reading the possible and selected properties of blocks from their
+blockstate files, and finding the models of a block state.
+"""
+import itertools
+
+
+def add_to_dict(d, key, value):
+    """
+    Place value in the list under key in the dict,
+    without repeating key or value in dict.
+
+    If the value is none or false, we insert at the beginning
+    so that it will be the default
+    """
+    if key not in d:
+        d[key] = [value]
+    elif value not in d[key]:
+        d[key].append(value)
+
+
+def process_part(d, part):
+    for key, value in part.items():
+        values = value.split('|')
+        for value in values:
+            add_to_dict(d, key, value)
+            
+
+def build_properties_dict(blockstate):
+    """
+    Build a dict that stores the full set of possible block properties
+    for a given blockstate.
+
+    Example return value:
+    {'facing': ['north', 'east', 'west', 'south']}
+    """
+    possible_properties = {}
+
+    if "variants" in blockstate:
+        for variant in blockstate["variants"]:
+            if variant == "":
+                # In this case, there must be exactly one variant, and it is blank
+                return {}
+            for key, value in [key_value.split("=") for key_value in variant.split(",")]:
+                add_to_dict(possible_properties, key, value)
+    
+    elif "multipart" in blockstate:
+        for part in blockstate["multipart"]:
+            if "when" not in part:
+                # In this case, there are no properties in this part (just a model)
+                continue
+            when = part["when"]
+            if "AND" in when:
+                for w in when["AND"]:
+                    process_part(possible_properties, w)
+            elif "OR" in when:
+                for w in when["OR"]:
+                    process_part(possible_properties, w)
+            else:
+                process_part(possible_properties, when)
+        
+        # Ensure that true and false always both exist even if blockstate does not specify both
+        # Also ensure none exists, if blockstate does not specify true and false
+        # Place false and none at the beginning
+        for property in possible_properties:
+            property_list = possible_properties[property]
+            if "true" in property_list and "false" not in property_list:
+                property_list.append("false")
+            elif "false" in property_list and "true" not in property_list:
+                property_list.append("true")
+            elif "true" not in property_list and "false" not in property_list and "none" not in property_list:
+                property_list.append("none")
+                
+    else:
+        print("Not a valid block model!")
+
+    return possible_properties
+
+
+def get_default_properties(block_properties):
+    """
+    Return the default (first) properties in block_properties as a dict.
+    
+    Example return value:
+    {'facing': 'north'}
+    """
+    selected = {}
+
+    for property in block_properties:
+        if "false" in block_properties[property]:
+            selected[property] = "false"
+            if property == "up" and "north" in block_properties and "tall" in block_properties["north"]:
+                # This is a wall, default to true instead
+                selected[property] = "true"
+            continue
+        if "none" in block_properties[property]:
+            selected[property] = "none"
+            continue
+        selected[property] = block_properties[property][0]
+
+    return selected
+
+def get_block_states(block_properties, max_states):
+    """
+    Return every combination of the properties in block_properties as dicts,
+    in the order the editor uses.
+
+    If there are more than max_states combinations, only the default
+    properties are returned.
+    """
+    state_count = 1
+    for values in block_properties.values():
+        state_count *= len(values)
+    if state_count > max_states:
+        return [get_default_properties(block_properties)]
+
+    names = list(block_properties)
+    return [dict(zip(names, values)) for values in itertools.product(*block_properties.values())]
+
+
+def property_matches(selected_block_properties, when):
+    """
+    Return true if the selected block properties match the condition
+    in when.
+    """
+    for property_name, property_value in when.items():
+        property_values_split = property_value.split('|')
+        if property_name not in selected_block_properties:
+            return False
+        if selected_block_properties[property_name] not in property_values_split:
+            return False
+    return True
+
+
+def get_part_model(part, selected_block_properties):
+    """
+    Return the model in when 
+    """
+    when = part.get("when", None)
+    if when:
+        if "AND" in when:
+            for w in when["AND"]:
+                if not property_matches(selected_block_properties, w):
+                    return None
+            return part["apply"]
+        elif "OR" in when:
+            for w in when["OR"]:
+                if property_matches(selected_block_properties, w):
+                    return(part["apply"])
+        else:
+            if property_matches(selected_block_properties, when):
+                return part["apply"]
+    else:
+        return part["apply"]
+
+
+def get_outer_model_data(blockstate, selected_block_properties):
+    """
+    Return a list of model jsons corresponding to the
+    selected block properties as defined in blockstate.
+
+    This is a list because multipart blocks may have several models.
+    """
+    if "variants" in blockstate:
+        variant_string = ""
+        for property, value in selected_block_properties.items():
+            variant_string = variant_string + property + "=" + value + ","
+        variant_string = variant_string[:-1]
+        for variant in blockstate["variants"]:
+            if variant == variant_string:
+                return [blockstate["variants"][variant]]
+        return []
+    elif "multipart" in blockstate:
+        part_list = []
+        for part in blockstate["multipart"]:
+            part_model = get_part_model(part, selected_block_properties)
+            if part_model: part_list.append(part_model)
+        return part_list
+
+
+def get_model_weights(outer_model_data):
+    """
+    Return the weights of the random models of each part of outer_model_data,
+    which is a single weight for parts without random models.
+
+    Example return value:
+    [[1, 1, 1, 1]] for stone, which has four equally likely models
+    """
+    return [[model.get("weight", 1) for model in part] if isinstance(part, list) else [1] for part in outer_model_data]
+
+
+def choose_models(outer_model_data, model_choice=0):
+    """
+    Return the model of each part of outer_model_data, picking from the
+    random models by model_choice.
+
+    model_choice holds the index of the model of every part with random
+    models as the digits of a mixed radix number, so 0 picks the first
+    model of every part.
+    """
+    models = []
+    for part in outer_model_data:
+        if isinstance(part, list):
+            model_choice, index = divmod(model_choice, len(part))
+            part = part[index]
+        models.append(part)
+    return models
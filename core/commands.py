@@ -0,0 +1,374 @@
+import collections
+import math
+import re
+import zlib
+
+# Strings matching this pattern can be written unquoted in SNBT
+UNQUOTED_STRING_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_.+-]*")
+
+# Characters which are not allowed in entity tags
+INVALID_TAG_CHARACTERS = re.compile(r"[^A-Za-z0-9_.+-]")
+
+# The fraction of a block that a Minecraft model pixel occupies
+GRID_SIZE = 1/16
+
+# Optional float fields of passengers which change how they are rendered
+RENDER_FIELDS = ["width", "height", "view_range"]
+
+# The values the game gives render fields which are not set
+RENDER_FIELD_DEFAULTS = {"width": 0.0, "height": 0.0, "view_range": 1.0}
+
+
+def get_passenger_tag(entity_tag, name):
+    """
+    Return the tag which identifies the passenger made from the object name,
+    such as mcbde.Cube_001 for the object "Cube 001"
+    """
+    return entity_tag + "." + INVALID_TAG_CHARACTERS.sub("_", name)
+
+
+def add_passenger_tags(passengers, entity_tag):
+    """
+    Tag each passenger with entity_tag and with its own tag made from its name.
+
+    Names which only differ in characters that are not allowed in tags, such
+    as "Cube 001" and "Cube_001", would share a tag, so the names which had
+    characters replaced get a hash of the name added to keep them apart.
+    """
+    tags = [get_passenger_tag(entity_tag, passenger["name"]) for passenger in passengers]
+    tag_counts = collections.Counter(tags)
+    for passenger, tag in zip(passengers, tags):
+        if tag_counts[tag] > 1 and INVALID_TAG_CHARACTERS.search(passenger["name"]):
+            tag += f".{zlib.crc32(passenger['name'].encode()):08x}"
+        passenger["tags"] = [entity_tag, tag]
+
+
+def check_entity_tag(entity_tag):
+    """
+    Raise a ValueError if entity_tag cannot be used as an entity tag in commands
+    """
+    if INVALID_TAG_CHARACTERS.search(entity_tag):
+        raise ValueError(f'The entity tag "{entity_tag}" may only contain letters, digits and _ . + -')
+
+
+def get_root_tag(entity_tag):
+    return entity_tag + ".root"
+
+
+def get_property_string(properties):
+    """
+    Return the block state properties in the verbose command format
+
+    Example return value:
+    facing:"north",half:"top"
+    """
+    formatted_property_pairs = [f'{name}:"{value}"' for name, value in properties.items()]
+    return ','.join(formatted_property_pairs)
+
+
+def format_verbose_transformation(minecraft_matrix):
+    """
+    Return the transformation matrix as a list of 16 floats rounded to 4 decimals
+    """
+    return (
+        f"[{round(minecraft_matrix[0][0], 4)}f, {round(minecraft_matrix[0][1], 4)}f, {round(minecraft_matrix[0][2], 4)}f, {round(minecraft_matrix[0][3], 4)}f, "
+        f"{round(minecraft_matrix[1][0], 4)}f, {round(minecraft_matrix[1][1], 4)}f, {round(minecraft_matrix[1][2], 4)}f, {round(minecraft_matrix[1][3], 4)}f, "
+        f"{round(minecraft_matrix[2][0], 4)}f, {round(minecraft_matrix[2][1], 4)}f, {round(minecraft_matrix[2][2], 4)}f, {round(minecraft_matrix[2][3], 4)}f, "
+        f"{round(minecraft_matrix[3][0], 4)}f, {round(minecraft_matrix[3][1], 4)}f, {round(minecraft_matrix[3][2], 4)}f, {round(minecraft_matrix[3][3], 4)}f]"
+    )
+
+
+def format_verbose_block_state(block_type, properties):
+    property_string = get_property_string(properties)
+    return f'{{Name: "minecraft:{block_type}", Properties: {{{property_string}}}}}'
+
+
+def format_verbose_tags(tags):
+    return "[" + ", ".join(f'"{tag}"' for tag in tags) + "]"
+
+
+def format_verbose_passenger(passenger, include_id=True):
+    """
+    Return the string for a single passenger in the original, verbose, command format
+    """
+    id_string = 'id: "minecraft:block_display", ' if include_id else ""
+    tags_string = ""
+    if passenger.get("tags"):
+        tags_string = f'Tags: {format_verbose_tags(passenger["tags"])}, '
+
+    block_state_string = format_verbose_block_state(passenger["block_type"], passenger["properties"])
+    transformation_string = format_verbose_transformation(passenger["transformation"])
+
+    render_string = "".join(f", {name}: {format_render_field(passenger[name])}" for name in RENDER_FIELDS if name in passenger)
+
+    return f'{{{id_string}{tags_string}block_state: {block_state_string},' \
+        + "transformation: " + transformation_string + render_string + '}'
+
+
+def format_number(value, tolerance):
+    """
+    Return the shortest decimal string which is within tolerance of value.
+
+    Values on the 1/16 grid of Minecraft model pixels are preferred when
+    they are within tolerance, since these are usually the exact values.
+    Leading zeros are dropped as SNBT does not require them.
+
+    Example return values:
+    0.50002 -> .5
+    -1.0 -> -1
+    """
+    candidates = []
+
+    grid_value = round(value / GRID_SIZE) * GRID_SIZE
+    if abs(grid_value - value) <= tolerance:
+        candidates.append(grid_value)
+
+    for digits in range(0, 8):
+        rounded_value = round(value, digits)
+        if abs(rounded_value - value) <= tolerance:
+            candidates.append(rounded_value)
+            break
+
+    if not candidates:
+        # Nothing within the tolerance, so we fall back to the shortest exact representation
+        candidates.append(value)
+
+    return min((strip_number(candidate) for candidate in candidates), key=len)
+
+
+def strip_number(value):
+    """
+    Return the shortest string representation of the float value
+    """
+    if value == 0:
+        # This also removes negative zero
+        return "0"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+
+    number_string = repr(value)
+    if number_string.startswith("0."):
+        number_string = number_string[1:]
+    elif number_string.startswith("-0."):
+        number_string = "-" + number_string[2:]
+    return number_string
+
+
+def format_float_list(values, tolerance):
+    return "[" + ",".join(format_number(value, tolerance) + "f" for value in values) + "]"
+
+
+def format_string(value):
+    """
+    Return value as an SNBT string, only quoting it if necessary.
+
+    Note that true and false must remain quoted, otherwise they are read as bytes.
+    """
+    if UNQUOTED_STRING_PATTERN.fullmatch(value) and value not in ["true", "false"]:
+        return value
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def rotation_to_quaternion(r):
+    """
+    Convert the orthonormal 3x3 rotation matrix r to a quaternion in the
+    Minecraft order [x, y, z, w]
+    """
+    trace = r[0][0] + r[1][1] + r[2][2]
+    if trace > 0:
+        s = math.sqrt(trace + 1) * 2
+        w = s / 4
+        x = (r[2][1] - r[1][2]) / s
+        y = (r[0][2] - r[2][0]) / s
+        z = (r[1][0] - r[0][1]) / s
+    elif r[0][0] > r[1][1] and r[0][0] > r[2][2]:
+        s = math.sqrt(1 + r[0][0] - r[1][1] - r[2][2]) * 2
+        w = (r[2][1] - r[1][2]) / s
+        x = s / 4
+        y = (r[0][1] + r[1][0]) / s
+        z = (r[0][2] + r[2][0]) / s
+    elif r[1][1] > r[2][2]:
+        s = math.sqrt(1 + r[1][1] - r[0][0] - r[2][2]) * 2
+        w = (r[0][2] - r[2][0]) / s
+        x = (r[0][1] + r[1][0]) / s
+        y = s / 4
+        z = (r[1][2] + r[2][1]) / s
+    else:
+        s = math.sqrt(1 + r[2][2] - r[0][0] - r[1][1]) * 2
+        w = (r[1][0] - r[0][1]) / s
+        x = (r[0][2] + r[2][0]) / s
+        y = (r[1][2] + r[2][1]) / s
+        z = s / 4
+
+    # Keeping w positive makes identity rotations come out as [0, 0, 0, 1]
+    if w < 0:
+        return [-x, -y, -z, -w]
+    return [x, y, z, w]
+
+
+def decompose_transformation(matrix, epsilon=1e-6):
+    """
+    Decompose the affine matrix into the Minecraft translation, left_rotation,
+    scale and right_rotation form.
+
+    This is only possible here if the matrix has no shear, in which case the
+    right rotation is always the identity. If the matrix cannot be decomposed,
+    None is returned.
+    """
+    columns = [[matrix[row][column] for row in range(3)] for column in range(3)]
+    scale = [math.sqrt(sum(value * value for value in column)) for column in columns]
+
+    if min(scale) < epsilon:
+        return None
+
+    axes = [[value / s for value in column] for column, s in zip(columns, scale)]
+
+    # The axes must be orthogonal, otherwise there is shear
+    for i, j in [(0, 1), (0, 2), (1, 2)]:
+        if abs(sum(a * b for a, b in zip(axes[i], axes[j]))) > epsilon:
+            return None
+
+    # A mirrored matrix is represented with a negative scale
+    determinant = (
+        axes[0][0] * (axes[1][1] * axes[2][2] - axes[1][2] * axes[2][1])
+        - axes[1][0] * (axes[0][1] * axes[2][2] - axes[0][2] * axes[2][1])
+        + axes[2][0] * (axes[0][1] * axes[1][2] - axes[0][2] * axes[1][1])
+    )
+    if determinant < 0:
+        scale[0] = -scale[0]
+        axes[0] = [-value for value in axes[0]]
+
+    rotation = [[axes[column][row] for column in range(3)] for row in range(3)]
+
+    return {
+        "translation": [matrix[0][3], matrix[1][3], matrix[2][3]],
+        "left_rotation": rotation_to_quaternion(rotation),
+        "scale": scale,
+        "right_rotation": [0, 0, 0, 1],
+    }
+
+
+def quaternion_to_rotation(q):
+    """
+    Convert the quaternion q in the Minecraft order [x, y, z, w] to a 3x3 rotation matrix
+    """
+    x, y, z, w = q
+    norm = math.sqrt(x * x + y * y + z * z + w * w) or 1
+    x, y, z, w = x / norm, y / norm, z / norm, w / norm
+    return [
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ]
+
+
+def compose_transformation(decomposed):
+    """
+    Return the 4x4 matrix for a transformation in the Minecraft translation,
+    left_rotation, scale and right_rotation form. This is the inverse of
+    decompose_transformation.
+    """
+    left = quaternion_to_rotation(decomposed.get("left_rotation", [0, 0, 0, 1]))
+    right = quaternion_to_rotation(decomposed.get("right_rotation", [0, 0, 0, 1]))
+    scale = decomposed.get("scale", [1, 1, 1])
+    translation = decomposed.get("translation", [0, 0, 0])
+
+    scaled_right = [[scale[row] * right[row][column] for column in range(3)] for row in range(3)]
+    linear = [[sum(left[row][k] * scaled_right[k][column] for k in range(3)) for column in range(3)] for row in range(3)]
+
+    return [linear[row] + [translation[row]] for row in range(3)] + [[0, 0, 0, 1]]
+
+
+def format_compact_transformation(matrix, tolerance, use_decomposed=True):
+    """
+    Return the shortest transformation string for matrix, choosing between the
+    16 float matrix form and the decomposed form.
+    """
+    matrix_string = format_float_list([matrix[row][column] for row in range(4) for column in range(4)], tolerance)
+
+    if not use_decomposed:
+        return matrix_string
+
+    decomposed = decompose_transformation(matrix)
+    if decomposed is None:
+        return matrix_string
+
+    decomposed_string = "{" + ",".join(
+        f"{key}:{format_float_list(values, tolerance)}" for key, values in decomposed.items()
+    ) + "}"
+
+    return min(matrix_string, decomposed_string, key=len)
+
+
+def format_compact_block_state(block_type, properties):
+    block_state_string = "Name:" + format_string(block_type)
+    if properties:
+        property_string = ",".join(f"{name}:{format_string(value)}" for name, value in properties.items())
+        block_state_string += ",Properties:{" + property_string + "}"
+    return "{" + block_state_string + "}"
+
+
+def format_compact_tags(tags):
+    return "[" + ",".join(format_string(tag) for tag in tags) + "]"
+
+
+def format_compact_passenger(passenger, tolerance, use_decomposed=True, include_id=True):
+    """
+    Return the string for a single passenger in the compact command format.
+
+    Redundant data is left out. The minecraft namespace is implied, and empty
+    Properties are omitted.
+    """
+    id_string = 'id:"block_display",' if include_id else ""
+    tags_string = ""
+    if passenger.get("tags"):
+        tags_string = f'Tags:{format_compact_tags(passenger["tags"])},'
+
+    block_state_string = format_compact_block_state(passenger["block_type"], passenger["properties"])
+    transformation_string = format_compact_transformation(passenger["transformation"], tolerance, use_decomposed)
+
+    render_string = "".join(f",{name}:{format_render_field(passenger[name], True, tolerance)}" for name in RENDER_FIELDS if name in passenger)
+
+    return f'{{{id_string}{tags_string}block_state:{block_state_string},transformation:{transformation_string}{render_string}}}'
+
+
+def format_transformation(matrix, compact=False, tolerance=0.0001, use_decomposed=True):
+    if compact:
+        return format_compact_transformation(matrix, tolerance, use_decomposed)
+    return format_verbose_transformation(matrix)
+
+
+def format_block_state(block_type, properties, compact=False):
+    if compact:
+        return format_compact_block_state(block_type, properties)
+    return format_verbose_block_state(block_type, properties)
+
+
+def format_render_field(value, compact=False, tolerance=0.0001):
+    if compact:
+        return f"{format_number(value, tolerance)}f"
+    return f"{round(value, 4)}f"
+
+
+def format_passenger(passenger, compact=False, tolerance=0.0001, use_decomposed=True, include_id=True):
+    if compact:
+        return format_compact_passenger(passenger, tolerance, use_decomposed, include_id)
+    return format_verbose_passenger(passenger, include_id)
+
+
+def format_command(passengers, origin_location, compact=False, tolerance=0.0001, use_decomposed=True, root_tags=None):
+    """
+    Return the summon command for the root block display with all passengers.
+
+    origin_location is in Minecraft coordinates, relative to the command block.
+    """
+    if compact:
+        origin_text = " ".join("~" + format_number(value, tolerance) for value in origin_location)
+        tags_string = f"Tags:{format_compact_tags(root_tags)}," if root_tags else ""
+        passenger_strings = [format_compact_passenger(passenger, tolerance, use_decomposed) for passenger in passengers]
+        return "/summon block_display " + origin_text + " {" + tags_string + "Passengers:[" + ",".join(passenger_strings) + "]}"
+
+    origin_text = f"~{round(origin_location[0], 4)} ~{round(origin_location[1], 4)} ~{round(origin_location[2], 4)}"
+    tags_string = f"Tags: {format_verbose_tags(root_tags)}, " if root_tags else ""
+    passenger_strings = [format_verbose_passenger(passenger) for passenger in passengers]
+    return "/summon block_display " + origin_text + " {" + tags_string + "Passengers: [" + ",".join(passenger_strings) + "]}"
@@ -0,0 +1,223 @@
+"""
+Working out the connection properties of fences, walls, panes and stairs
+from their neighbours, like the game does when they are placed.
+
+Neighbours are given as (block_type, properties) pairs, looked up by
+Minecraft direction, so that any spatial index can be used.
+"""
+
+HORIZONTAL_DIRECTIONS = ["north", "east", "south", "west"]
+
+OPPOSITE_DIRECTIONS = {
+    "north": "south",
+    "east": "west",
+    "south": "north",
+    "west": "east",
+    "up": "down",
+    "down": "up",
+}
+
+# The direction to the left of each horizontal direction, looking down from above
+COUNTER_CLOCKWISE = {
+    "north": "west",
+    "west": "south",
+    "south": "east",
+    "east": "north",
+}
+
+
+def get_axis(direction):
+    return "z" if direction in ["north", "south"] else "x"
+
+
+def get_connection_kind(block_type):
+    """
+    Return which connecting block block_type is, or None if it does not
+    connect to its neighbours
+    """
+    if block_type.endswith("_fence_gate"):
+        return "fence_gate"
+    if block_type.endswith("_fence"):
+        return "fence"
+    if block_type.endswith("_pane") or block_type == "iron_bars":
+        return "pane"
+    if block_type.endswith("_wall"):
+        return "wall"
+    if block_type.endswith("_stairs"):
+        return "stairs"
+    return None
+
+
+def is_connecting(block_type):
+    return get_connection_kind(block_type) is not None
+
+
+def connects_to(block_type, direction, neighbour, is_opaque_full_cube):
+    """
+    Return whether the fence, pane or wall block_type connects to the
+    neighbour in direction
+    """
+    if neighbour is None:
+        return False
+
+    neighbour_type, neighbour_properties = neighbour
+    kind = get_connection_kind(block_type)
+    neighbour_kind = get_connection_kind(neighbour_type)
+
+    # Fence gates connect on the sides of their hinges
+    if neighbour_kind == "fence_gate" and kind in ["fence", "wall"]:
+        return get_axis(neighbour_properties.get("facing", "north")) != get_axis(direction)
+
+    if kind == "fence" and neighbour_kind == "fence":
+        # Nether brick fences only connect to each other
+        return (block_type == "nether_brick_fence") == (neighbour_type == "nether_brick_fence")
+    if kind in ["pane", "wall"] and neighbour_kind in ["pane", "wall"]:
+        return True
+
+    return is_opaque_full_cube(neighbour_type, neighbour_properties)
+
+
+def get_wall_side(block_type, direction, get_neighbour, is_opaque_full_cube):
+    """
+    Return the none, low or tall value of the side of a wall in direction.
+
+    Sides are tall when the block above covers them.
+    """
+    if not connects_to(block_type, direction, get_neighbour(direction), is_opaque_full_cube):
+        return "none"
+
+    above = get_neighbour("up")
+    if above is not None:
+        above_type, above_properties = above
+        if is_opaque_full_cube(above_type, above_properties):
+            return "tall"
+        if get_connection_kind(above_type) == "wall" and above_properties.get(direction, "none") != "none":
+            return "tall"
+    return "low"
+
+
+def is_wall_post_override(block_type):
+    """
+    Return whether block_type is in the wall_post_override tag, the blocks
+    which always stand on a wall post, like torches, signs and banners
+    """
+    if block_type in ["torch", "soul_torch", "redstone_torch", "tripwire"]:
+        return True
+    if block_type.endswith("_hanging_sign"):
+        return False
+    return block_type.endswith(("_sign", "_banner", "_pressure_plate"))
+
+
+def covers_wall_post(above, is_opaque_full_cube):
+    """
+    Return whether the bottom of the block above a wall covers the top of its post.
+
+    Without the collision shapes, this is worked out for full cubes and the
+    blocks whose bottom is known to cover the middle of the block.
+    """
+    above_type, above_properties = above
+    if is_opaque_full_cube(above_type, above_properties):
+        return True
+
+    kind = get_connection_kind(above_type)
+    if kind in ["fence", "pane", "wall"]:
+        return True
+    if kind == "stairs":
+        return above_properties.get("half") == "bottom"
+    if above_type.endswith("_slab"):
+        return above_properties.get("type") in ["bottom", "double"]
+    return False
+
+
+def should_raise_wall_post(sides, above, is_opaque_full_cube):
+    """
+    Return whether a wall with the given none, low or tall sides has a post,
+    like WallBlock.shouldRaisePost in the game
+    """
+    if above is not None and get_connection_kind(above[0]) == "wall" and above[1].get("up") == "true":
+        return True
+
+    north, east, south, west = (sides.get(direction, "none") for direction in HORIZONTAL_DIRECTIONS)
+
+    # Isolated walls, the ends of walls, corners and T junctions always have a post
+    is_isolated = north == east == south == west == "none"
+    if is_isolated or (north == "none") != (south == "none") or (east == "none") != (west == "none"):
+        return True
+
+    # Straight walls and crossings only have a post if something on top needs one
+    if (north == "tall" and south == "tall") or (east == "tall" and west == "tall"):
+        return False
+    return above is not None and (is_wall_post_override(above[0]) or covers_wall_post(above, is_opaque_full_cube))
+
+
+def is_stairs_like(neighbour, properties):
+    """
+    Return whether neighbour is a stairs block with the same half as properties
+    """
+    return (
+        neighbour is not None
+        and get_connection_kind(neighbour[0]) == "stairs"
+        and neighbour[1].get("half") == properties.get("half")
+    )
+
+
+def can_take_shape(properties, direction, get_neighbour):
+    """
+    Return whether the neighbour in direction allows the stairs to bend,
+    which it does unless it is stairs facing the same way
+    """
+    neighbour = get_neighbour(direction)
+    return not is_stairs_like(neighbour, properties) or neighbour[1].get("facing") != properties.get("facing")
+
+
+def get_stairs_shape(properties, get_neighbour):
+    """
+    Return the shape of stairs, which bend towards stairs at right angles in
+    front of or behind them
+    """
+    facing = properties.get("facing", "north")
+
+    front = get_neighbour(facing)
+    if is_stairs_like(front, properties):
+        front_facing = front[1].get("facing", "north")
+        if get_axis(front_facing) != get_axis(facing) and can_take_shape(properties, OPPOSITE_DIRECTIONS[front_facing], get_neighbour):
+            return "outer_left" if front_facing == COUNTER_CLOCKWISE[facing] else "outer_right"
+
+    back = get_neighbour(OPPOSITE_DIRECTIONS[facing])
+    if is_stairs_like(back, properties):
+        back_facing = back[1].get("facing", "north")
+        if get_axis(back_facing) != get_axis(facing) and can_take_shape(properties, back_facing, get_neighbour):
+            return "inner_left" if back_facing == COUNTER_CLOCKWISE[facing] else "inner_right"
+
+    return "straight"
+
+
+def get_connected_properties(block_type, properties, get_neighbour, is_opaque_full_cube):
+    """
+    Return a copy of properties with the connection properties of block_type
+    set from its neighbours. Other blocks are returned unchanged.
+
+    get_neighbour(direction) returns the (block_type, properties) of the
+    neighbour in a Minecraft direction, or None for air.
+    """
+    kind = get_connection_kind(block_type)
+    connected = dict(properties)
+
+    if kind in ["fence", "pane"]:
+        for direction in HORIZONTAL_DIRECTIONS:
+            if direction in connected:
+                connected[direction] = "true" if connects_to(block_type, direction, get_neighbour(direction), is_opaque_full_cube) else "false"
+
+    elif kind == "wall":
+        for direction in HORIZONTAL_DIRECTIONS:
+            if direction in connected:
+                connected[direction] = get_wall_side(block_type, direction, get_neighbour, is_opaque_full_cube)
+
+        if "up" in connected:
+            sides = {direction: connected.get(direction, "none") for direction in HORIZONTAL_DIRECTIONS}
+            connected["up"] = "true" if should_raise_wall_post(sides, get_neighbour("up"), is_opaque_full_cube) else "false"
+
+    elif kind == "stairs" and "shape" in connected:
+        connected["shape"] = get_stairs_shape(connected, get_neighbour)
+
+    return connected
@@ -0,0 +1,44 @@
+"""
+Converting transformations between Blender and Minecraft coordinates.
+
+Blender (x, y, z) is Minecraft (x, z, -y), and a block at the Blender
+origin fills [0, 1] x [-1, 0] x [0, 1], so Minecraft translations are one
+block lower.
+
+Matrices are anything which can be indexed as matrix[row][column], such as
+lists of lists or mathutils matrices, and are returned as lists of lists.
+"""
+
+# The position of the root entity relative to the command block, in Minecraft coordinates
+ORIGIN_LOCATION = (-0.5, 0.5, -0.5)
+
+
+def convert_coordinates(blender_matrix):
+    """
+    Convert Blender coordinates to Minecraft coordinates
+    """
+    b = blender_matrix
+    return [
+        [ b[0][0],  b[0][2], -b[0][1],  b[0][3]],
+        [ b[2][0],  b[2][2], -b[2][1],  b[2][3] - 1],
+        [-b[1][0], -b[1][2],  b[1][1], -b[1][3]],
+        [0.0, 0.0, 0.0, 1.0],
+    ]
+
+
+def revert_coordinates(minecraft_matrix):
+    """
+    Convert Minecraft coordinates to Blender coordinates.
+    This is the inverse of convert_coordinates.
+    """
+    m = minecraft_matrix
+    return [
+        [ m[0][0], -m[0][2],  m[0][1],  m[0][3]],
+        [-m[2][0],  m[2][2], -m[2][1], -m[2][3]],
+        [ m[1][0], -m[1][2],  m[1][1],  m[1][3] + 1],
+        [0.0, 0.0, 0.0, 1.0],
+    ]
+
+
+def add_vectors(a, b):
+    return tuple(x + y for x, y in zip(a, b))
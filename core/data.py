@@ -0,0 +1,115 @@
+"""
+Reading block states, block models and textures from a Minecraft jar.
+"""
+import copy
+import json
+import os
+import pickle
+import zipfile
+
+
+class JarData:
+    """
+    The block states and block models of a Minecraft jar, parsed from JSON.
+    """
+    loaded_data = None
+    block_states_path = "assets/minecraft/blockstates"
+    block_models_path = "assets/minecraft/models/block"
+    textures_path = "assets/minecraft/textures"
+
+
+    def __init__(self):
+        self.minecraft_location = ""
+        self.loaded_data = {
+            "blockstates": {},
+            "block_models": {},
+            "item_models": {},
+        }
+        self.initialized = False
+
+
+    def load_json_directory(self, jar, path, data_dict):
+        all_files = jar.namelist()
+        target_json_files = [file for file in all_files if file.startswith(path)]
+        for file_name in target_json_files:
+            json_content = jar.read(file_name)
+            try:
+                json_content_string = json_content.decode('utf-8')
+                json_data = json.loads(json_content_string)
+                identifier = os.path.splitext(os.path.basename(file_name))[0]
+                data_dict[identifier] = json_data
+            except UnicodeDecodeError:
+                print(f"Unable to decode {file_name} as UTF-8. It may be binary data.")
+            except json.JSONDecodeError:
+                print(f"Unable to parse {file_name} as JSON.")
+
+
+    def initialize_data(self, minecraft_location):
+        self.minecraft_location = minecraft_location
+        try:
+            with zipfile.ZipFile(minecraft_location, 'r') as jar:
+                self.load_json_directory(jar, self.block_states_path, self.loaded_data["blockstates"])
+                self.load_json_directory(jar, self.block_models_path, self.loaded_data["block_models"])
+                self.initialized = True
+        except Exception as e:
+            print("Error when loading data:", e)
+
+
+    def get_data(self, data_dict, identifier):
+        if data_dict in self.loaded_data:
+            return copy.deepcopy(self.loaded_data[data_dict].get(identifier))
+        else:
+            print(f"Error: {data_dict} not found in loaded data.")
+            return None
+
+
+    def get_version(self):
+        """
+        Return the game version of the loaded jar, taken from its file name,
+        such as 1.20.1 for 1.20.1.jar
+        """
+        return os.path.splitext(os.path.basename(self.minecraft_location))[0]
+
+
+    def read_texture(self, name):
+        """
+        Return the PNG data of the texture name, such as block/stone, or None
+        """
+        split_name = name.split('/')
+        target_directory = split_name[0]
+        target_basename = split_name[1]
+        directory_path = self.textures_path + "/" + target_directory
+
+        image_data = None
+        with zipfile.ZipFile(self.minecraft_location, 'r') as jar:
+            all_files = jar.namelist()
+            target_image_files = [file for file in all_files if file.startswith(directory_path)]
+
+            for file_name in target_image_files:
+                basename = os.path.splitext(os.path.basename(file_name))[0]
+                if basename == target_basename:
+                    image_data = jar.read(file_name)
+
+        return image_data
+
+
+    def write_cache(self, path):
+        """
+        Save the parsed data to path, so that other processes can load it
+        without parsing the jar again
+        """
+        with open(path, "wb") as cache_file:
+            pickle.dump((self.minecraft_location, self.loaded_data), cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+    def load_cache(self, path):
+        """
+        Load data saved with write_cache instead of parsing the jar
+        """
+        with open(path, "rb") as cache_file:
+            self.minecraft_location, self.loaded_data = pickle.load(cache_file)
+        self.initialized = True
+
+
+    def is_initialized(self):
+        return self.initialized
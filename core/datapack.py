@@ -0,0 +1,34 @@
+import json
+import os
+
+# The data pack format of Minecraft 1.20.1, which is the oldest version with all used features
+DEFAULT_PACK_FORMAT = 15
+
+
+def write_datapack(directory, namespace, functions, pack_format=DEFAULT_PACK_FORMAT, description="Generated by MCBDE"):
+    """
+    Write a data pack to directory containing the functions.
+
+    functions is a dict from function path, such as "animation/start", to a
+    list of commands. The functions can then be run in game as namespace:path.
+
+    Returns the list of files written.
+    """
+    written_files = []
+
+    pack_mcmeta_path = os.path.join(directory, "pack.mcmeta")
+    os.makedirs(directory, exist_ok=True)
+    with open(pack_mcmeta_path, "w") as pack_mcmeta_file:
+        json.dump({"pack": {"pack_format": pack_format, "description": description}}, pack_mcmeta_file, indent=4)
+    written_files.append(pack_mcmeta_path)
+
+    functions_directory = os.path.join(directory, "data", namespace, "functions")
+    for function_path, commands in functions.items():
+        file_path = os.path.join(functions_directory, *function_path.split("/")) + ".mcfunction"
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as function_file:
+            # Commands in functions do not start with a slash
+            function_file.write("\n".join(command.removeprefix("/") for command in commands) + "\n")
+        written_files.append(file_path)
+
+    return written_files
@@ -0,0 +1,104 @@
+"""
+Building the commands which bring a previously summoned entity up to date
+with the scene, without summoning it again.
+
+Exported states are dicts from the tag of each passenger to its block_state
+and transformation strings, and the render fields it was given, as they were
+written in the command.
+"""
+from .animation import get_entity_selector
+from .commands import (
+    RENDER_FIELDS, RENDER_FIELD_DEFAULTS,
+    format_block_state, format_transformation, format_render_field, format_passenger, format_command, get_root_tag,
+)
+
+
+def get_export_state(passengers, compact=False, tolerance=0.0001, use_decomposed=True):
+    """
+    Return the exported state of the tagged passengers.
+
+    Since the strings are compared, changes smaller than the formatting
+    precision are not seen as changes.
+    """
+    export_state = {}
+    for passenger in passengers:
+        state = {
+            "block_state": format_block_state(passenger["block_type"], passenger["properties"], compact),
+            "transformation": format_transformation(passenger["transformation"], compact, tolerance, use_decomposed),
+        }
+        for name in RENDER_FIELDS:
+            if name in passenger:
+                state[name] = format_render_field(passenger[name], compact, tolerance)
+        export_state[passenger["tags"][1]] = state
+    return export_state
+
+
+def get_changed_fields(previous, current, compact=False, tolerance=0.0001):
+    """
+    Return the "name:value" strings of the fields of the passenger which
+    changed between its previous and current exported state. Render fields
+    which are no longer set go back to their default.
+    """
+    changes = [f"{key}:{current[key]}" for key in ["block_state", "transformation"] if current[key] != previous[key]]
+    for name in RENDER_FIELDS:
+        value = current.get(name)
+        if value is None and name in previous:
+            value = format_render_field(RENDER_FIELD_DEFAULTS[name], compact, tolerance)
+        if value is not None and value != previous.get(name):
+            changes.append(f"{name}:{value}")
+    return changes
+
+
+def build_delta_commands(previous_state, passengers, entity_tag, compact=False, tolerance=0.0001, use_decomposed=True):
+    """
+    Return the commands which change the entity summoned with previous_state
+    to match passengers, and the new exported state.
+
+    Removed passengers are killed, changed passengers are updated with data merge,
+    and added passengers are summoned at the root entity and made to ride it.
+    Passengers should have the same culling boxes and view ranges as in the
+    full command, so that the entity renders the same as a new one.
+    """
+    current_state = get_export_state(passengers, compact, tolerance, use_decomposed)
+    root_selector = get_entity_selector(get_root_tag(entity_tag))
+
+    commands = []
+
+    for tag in previous_state:
+        if tag not in current_state:
+            commands.append(f"kill @e[type=minecraft:block_display,tag={tag}]")
+
+    for passenger in passengers:
+        tag = passenger["tags"][1]
+        current = current_state[tag]
+        previous = previous_state.get(tag)
+
+        if previous is None:
+            passenger_nbt = format_passenger(passenger, compact, tolerance, use_decomposed, include_id=False)
+            commands.append(f"execute at {root_selector} run summon block_display ~ ~ ~ {passenger_nbt}")
+            commands.append(f"ride {get_entity_selector(tag)} mount {root_selector}")
+            continue
+
+        changes = get_changed_fields(previous, current, compact, tolerance)
+        if changes:
+            commands.append(f"data merge entity {get_entity_selector(tag)} {{{','.join(changes)}}}")
+
+    return commands, current_state
+
+
+def build_resummon_commands(passengers, origin_location, entity_tag, compact=False, tolerance=0.0001, use_decomposed=True):
+    """
+    Return the commands which replace every entity tagged with entity_tag by
+    a new root entity with passengers, and the new exported state.
+
+    The root is summoned without passengers, and each passenger is added
+    with its own commands as in build_delta_commands, so that no command
+    grows with the number of passengers.
+    """
+    root_tags = [entity_tag, get_root_tag(entity_tag)]
+    commands = [
+        f"kill @e[type=minecraft:block_display,tag={entity_tag}]",
+        format_command([], origin_location, compact, tolerance, use_decomposed, root_tags).removeprefix("/"),
+    ]
+    passenger_commands, export_state = build_delta_commands({}, passengers, entity_tag, compact, tolerance, use_decomposed)
+    return commands + passenger_commands, export_state
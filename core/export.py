@@ -0,0 +1,409 @@
+"""
+Passes which optimize the list of passengers before it is turned into a command.
+
+Passengers are dicts with the keys name, block_type, properties and
+transformation, where transformation is a 4x4 matrix in Minecraft coordinates.
+"""
+import fnmatch
+import itertools
+import math
+
+from .commands import format_command, get_root_tag
+from .coordinates import add_vectors
+from .grid import get_matrix_cell
+
+NEIGHBOUR_OFFSETS = [(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1)]
+
+
+def get_state_key(passenger):
+    """
+    Return a hashable key which is the same for passengers with the same block state
+    """
+    return (passenger["block_type"], tuple(passenger["properties"].items()))
+
+
+def get_grid_cell(passenger, epsilon=1e-4):
+    """
+    Return the integer (x, y, z) position of the passenger if it is an
+    unrotated, unscaled block on the block grid, otherwise return None.
+    """
+    return get_matrix_cell(passenger["transformation"], epsilon)
+
+
+def merge_boxes(cells):
+    """
+    Greedily merge the set of integer grid cells into axis aligned boxes.
+
+    Each box is grown from its smallest remaining cell, first along x, then
+    along z, then along y.
+
+    Returns a list of (start, size) tuples.
+    """
+    remaining = set(cells)
+    boxes = []
+
+    for start in sorted(cells, key=lambda cell: (cell[1], cell[2], cell[0])):
+        if start not in remaining:
+            continue
+        x, y, z = start
+
+        size_x = 1
+        while (x + size_x, y, z) in remaining:
+            size_x += 1
+
+        size_z = 1
+        while all((x + i, y, z + size_z) in remaining for i in range(size_x)):
+            size_z += 1
+
+        size_y = 1
+        while all((x + i, y + size_y, z + k) in remaining for i in range(size_x) for k in range(size_z)):
+            size_y += 1
+
+        for i in range(size_x):
+            for j in range(size_y):
+                for k in range(size_z):
+                    remaining.discard((x + i, y + j, z + k))
+
+        boxes.append((start, (size_x, size_y, size_z)))
+
+    return boxes
+
+
+def merge_full_blocks(passengers, is_mergeable_state):
+    """
+    Merge adjacent passengers with the same block state into single scaled passengers.
+
+    Only unrotated, unscaled passengers on the block grid are merged, and only
+    if is_mergeable_state(block_type, properties) is true for their block state.
+    This is called once per distinct block state.
+
+    Returns the new list of passengers and the number of passengers saved.
+    """
+    merged_passengers = []
+    groups = {}
+
+    for passenger in passengers:
+        cell = get_grid_cell(passenger)
+        if cell is None:
+            merged_passengers.append(passenger)
+            continue
+        groups.setdefault(get_state_key(passenger), []).append((cell, passenger))
+
+    for members in groups.values():
+        first = members[0][1]
+        if not is_mergeable_state(first["block_type"], first["properties"]):
+            merged_passengers.extend(passenger for _, passenger in members)
+            continue
+
+        # Duplicate passengers in the same cell are merged as well
+        passengers_by_cell = {}
+        for cell, passenger in members:
+            passengers_by_cell.setdefault(cell, passenger)
+
+        for (x, y, z), (size_x, size_y, size_z) in merge_boxes(passengers_by_cell):
+            passenger = dict(passengers_by_cell[(x, y, z)])
+            passenger["transformation"] = [
+                [size_x, 0, 0, x],
+                [0, size_y, 0, y],
+                [0, 0, size_z, z],
+                [0, 0, 0, 1],
+            ]
+            merged_passengers.append(passenger)
+
+    return merged_passengers, len(passengers) - len(merged_passengers)
+
+
+def remove_duplicate_passengers(passengers, digits=4):
+    """
+    Remove passengers which have the same block state and transformation as an
+    earlier passenger, since they render exactly on top of each other.
+
+    Returns the new list of passengers and the number of passengers removed.
+    """
+    seen = set()
+    unique_passengers = []
+
+    for passenger in passengers:
+        matrix = passenger["transformation"]
+        key = (get_state_key(passenger), tuple(round(matrix[row][column], digits) + 0 for row in range(4) for column in range(4)))
+        if key in seen:
+            continue
+        seen.add(key)
+        unique_passengers.append(passenger)
+
+    return unique_passengers, len(passengers) - len(unique_passengers)
+
+
+def is_enclosed(cell, occupied_cells):
+    """
+    Return true if all six neighbours of the integer grid cell are in occupied_cells
+    """
+    x, y, z = cell
+    return all((x + dx, y + dy, z + dz) in occupied_cells for dx, dy, dz in NEIGHBOUR_OFFSETS)
+
+
+def cull_hidden_blocks(passengers, is_opaque_state, occluding_passengers=None):
+    """
+    Remove unrotated, unscaled passengers on the block grid whose six
+    neighbours are all opaque full cubes, since they can never be seen.
+
+    occluding_passengers are used to build the spatial hash of opaque cells, and
+    default to passengers. This allows culling after merging, using the blocks as
+    they were before they were merged. is_opaque_state(block_type, properties) is
+    called once per distinct block state.
+
+    Returns the new list of passengers and the number of passengers removed.
+    """
+    if occluding_passengers is None:
+        occluding_passengers = passengers
+
+    opaque_states = {}
+    occupied_cells = set()
+
+    for passenger in occluding_passengers:
+        cell = get_grid_cell(passenger)
+        if cell is None:
+            continue
+        state_key = get_state_key(passenger)
+        if state_key not in opaque_states:
+            opaque_states[state_key] = is_opaque_state(passenger["block_type"], passenger["properties"])
+        if opaque_states[state_key]:
+            occupied_cells.add(cell)
+
+    visible_passengers = []
+    for passenger in passengers:
+        cell = get_grid_cell(passenger)
+        if cell is not None and is_enclosed(cell, occupied_cells):
+            continue
+        visible_passengers.append(passenger)
+
+    return visible_passengers, len(passengers) - len(visible_passengers)
+
+
+def translate_passenger(passenger, offset):
+    """
+    Return a copy of passenger moved by offset, in Minecraft coordinates
+    """
+    matrix = passenger["transformation"]
+    translated = dict(passenger)
+    translated["transformation"] = [
+        [matrix[row][column] + (offset[row] if column == 3 and row < 3 else 0) for column in range(4)]
+        for row in range(4)
+    ]
+    return translated
+
+
+def partition_into_chunks(passengers, chunk_size):
+    """
+    Split the passengers into cubic spatial chunks of chunk_size blocks, by
+    the translation of each passenger.
+
+    Returns a list of (chunk_offset, chunk_passengers) pairs sorted by chunk,
+    where the passengers have been moved to be relative to chunk_offset.
+    """
+    chunks = {}
+    for passenger in passengers:
+        matrix = passenger["transformation"]
+        chunk = tuple(int(math.floor(matrix[row][3] / chunk_size)) for row in range(3))
+        chunks.setdefault(chunk, []).append(passenger)
+
+    partitioned = []
+    for chunk in sorted(chunks):
+        chunk_offset = [index * chunk_size for index in chunk]
+        negative_offset = [-value for value in chunk_offset]
+        partitioned.append((chunk_offset, [translate_passenger(passenger, negative_offset) for passenger in chunks[chunk]]))
+
+    return partitioned
+
+
+def get_mergeable_state_checker(block_type_patterns, is_full_cube):
+    """
+    Return a function which decides whether blocks of a given block state may be
+    merged into a single scaled block display.
+
+    Merged blocks stretch their texture, so this is only allowed for full
+    cubes whose type matches one of the comma separated block_type_patterns.
+    """
+    patterns = [pattern.strip() for pattern in block_type_patterns.split(",") if pattern.strip()]
+
+    def is_mergeable_state(block_type, properties):
+        if not any(fnmatch.fnmatchcase(block_type, pattern) for pattern in patterns):
+            return False
+        return is_full_cube(block_type, properties)
+
+    return is_mergeable_state
+
+
+def optimize_passengers(passengers, is_full_cube, is_opaque_full_cube, remove_duplicates=False, merge_block_types=None, cull_hidden=False):
+    """
+    Run the enabled optimization passes over the passengers. Blocks are only
+    merged if merge_block_types is given.
+
+    is_full_cube and is_opaque_full_cube take a block type and its properties.
+
+    Returns the optimized passengers, and a dict from the name of each pass
+    which ran to the number of entities it saved.
+    """
+    original_passengers = passengers
+    saved = {}
+
+    if remove_duplicates:
+        passengers, saved["duplicates"] = remove_duplicate_passengers(passengers)
+
+    if merge_block_types is not None:
+        is_mergeable_state = get_mergeable_state_checker(merge_block_types, is_full_cube)
+        passengers, saved["merged"] = merge_full_blocks(passengers, is_mergeable_state)
+
+    if cull_hidden:
+        # Merged blocks still occlude the cells they were merged from
+        passengers, saved["culled"] = cull_hidden_blocks(passengers, is_opaque_full_cube, original_passengers)
+
+    return passengers, saved
+
+
+def get_passengers_bounds(passengers, get_state_bounds):
+    """
+    Return the (minimum, maximum) corners of the box around the models of all
+    passengers, relative to the root entity, or None if they have no models.
+
+    get_state_bounds takes a block type and its properties, and returns the
+    (minimum, maximum) corners of its models in block coordinates, or None.
+    """
+    minimum = [math.inf] * 3
+    maximum = [-math.inf] * 3
+    for passenger in passengers:
+        bounds = get_state_bounds(passenger["block_type"], passenger["properties"])
+        if bounds is None:
+            continue
+        matrix = passenger["transformation"]
+        for corner in itertools.product(*zip(*bounds)):
+            for row in range(3):
+                value = sum(matrix[row][column] * corner[column] for column in range(3)) + matrix[row][3]
+                minimum[row] = min(minimum[row], value)
+                maximum[row] = max(maximum[row], value)
+
+    if minimum[0] == math.inf:
+        return None
+    return minimum, maximum
+
+
+def get_centred_culling_box(bounds):
+    """
+    Return the (width, height) of the smallest culling box centred on the
+    root entity which covers the (minimum, maximum) bounds above the root
+    """
+    minimum, maximum = bounds
+    width = 2 * max(abs(minimum[0]), abs(maximum[0]), abs(minimum[2]), abs(maximum[2]))
+    height = max(maximum[1], 0)
+    return width, height
+
+
+def add_culling_boxes(passengers, origin_location, get_state_bounds, move_origin=True):
+    """
+    Give the passengers of a root entity at origin_location the width and
+    height of a culling box around all of their models.
+
+    The culling box of a display entity is centred on it horizontally, and
+    goes up from it by height. If move_origin is set, the root entity is
+    moved to the bottom centre of the models, and the passengers are moved
+    the other way, so that the box is as tight as it can be. Otherwise the
+    box is centred on the root entity, and cannot cover models below it.
+
+    Returns the new origin_location and copies of the passengers.
+    """
+    bounds = get_passengers_bounds(passengers, get_state_bounds)
+    if bounds is None:
+        return origin_location, passengers
+    minimum, maximum = bounds
+
+    if move_origin:
+        offset = ((minimum[0] + maximum[0]) / 2, minimum[1], (minimum[2] + maximum[2]) / 2)
+        origin_location = add_vectors(origin_location, offset)
+        passengers = [translate_passenger(passenger, [-value for value in offset]) for passenger in passengers]
+        width = max(maximum[0] - minimum[0], maximum[2] - minimum[2])
+        height = maximum[1] - minimum[1]
+    else:
+        width, height = get_centred_culling_box(bounds)
+
+    return origin_location, [dict(passenger, width=width, height=height) for passenger in passengers]
+
+
+def parse_lod_tiers(text):
+    """
+    Return the level of detail tiers in text as (size, view_range) pairs
+    sorted by size, such as [(0.25, 0.25), (0.6, 0.5)] for "0.25:0.25, 0.6:0.5".
+    Raises ValueError if text is not in this form.
+    """
+    tiers = []
+    for tier in text.split(","):
+        if tier.strip():
+            size, view_range = tier.split(":")
+            tiers.append((float(size), float(view_range)))
+    return sorted(tiers)
+
+
+def assign_view_ranges(passengers, get_state_bounds, tiers):
+    """
+    Give small passengers a shorter view range, so that players far away
+    render fewer entities.
+
+    A passenger belongs to the first of the (size, view_range) tiers whose
+    size is larger than the longest side of the box around its model.
+    Display entities cannot be hidden when players are close, so the tiers
+    add detail as players come closer, instead of replacing each other.
+
+    Returns copies of the passengers, and the number of passengers in each tier.
+    """
+    tier_counts = [0] * len(tiers)
+    ranged_passengers = []
+    for passenger in passengers:
+        bounds = get_passengers_bounds([passenger], get_state_bounds)
+        if bounds is not None:
+            size = max(maximum - minimum for minimum, maximum in zip(*bounds))
+            for index, (tier_size, view_range) in enumerate(tiers):
+                if size < tier_size:
+                    passenger = dict(passenger, view_range=view_range)
+                    tier_counts[index] += 1
+                    break
+        ranged_passengers.append(passenger)
+    return ranged_passengers, tier_counts
+
+
+def get_root_entities(passengers, origin_location, entity_tag="", chunk_size=None, get_state_bounds=None):
+    """
+    Return the root entities to summon the passengers on, as a list of
+    (origin_location, passengers) pairs.
+
+    This is a single root, unless chunk_size is given, in which case there
+    is one root per spatial chunk.
+    If get_state_bounds is given, the passengers of each root get a
+    culling box around all of them, see add_culling_boxes. The root entity
+    is only moved to fit the box without an entity_tag, since delta updates
+    and animations expect it to stay where it is.
+    """
+    if not chunk_size:
+        chunks = [((0, 0, 0), passengers)]
+    else:
+        chunks = partition_into_chunks(passengers, chunk_size)
+
+    roots = []
+    for chunk_offset, chunk_passengers in chunks:
+        chunk_origin = add_vectors(origin_location, chunk_offset)
+        if get_state_bounds is not None:
+            chunk_origin, chunk_passengers = add_culling_boxes(chunk_passengers, chunk_origin, get_state_bounds, move_origin=not entity_tag)
+        roots.append((chunk_origin, chunk_passengers))
+    return roots
+
+
+def get_commands(passengers, origin_location, entity_tag="", chunk_size=None, get_state_bounds=None, **format_options):
+    """
+    Return the list of summon commands for the passengers, one for each root
+    entity from get_root_entities.
+
+    format_options are passed on to format_command.
+    """
+    if entity_tag:
+        format_options["root_tags"] = [entity_tag, get_root_tag(entity_tag)]
+
+    roots = get_root_entities(passengers, origin_location, entity_tag, chunk_size, get_state_bounds)
+    return [format_command(root_passengers, root_origin, **format_options) for root_origin, root_passengers in roots]
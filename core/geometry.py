@@ -0,0 +1,216 @@
+"""
+Building the geometry of block models, without Blender.
+
+The geometry of each model element is returned as its eight corner
+vertices in Blender coordinates, already rotated, and the faces between
+them, so that the add-on only has to copy it into a mesh.
+
+Matrices are 3x3 lists of lists.
+"""
+import math
+
+# Offsets in Blender coordinates to the neighbouring cell in each Minecraft direction
+DIRECTION_OFFSETS = {
+    "down":  (0, 0, -1),
+    "up":    (0, 0, 1),
+    "north": (0, 1, 0),
+    "south": (0, -1, 0),
+    "west":  (-1, 0, 0),
+    "east":  (1, 0, 0),
+}
+
+# The corners of each face of an element, as indices into its vertices
+FACE_VERTICES = {
+    "down":  (0, 2, 6, 4),
+    "up":    (5, 7, 3, 1),
+    "west":  (0, 4, 5, 1),
+    "east":  (6, 2, 3, 7),
+    "south": (4, 6, 7, 5),
+    "north": (2, 0, 1, 3),
+}
+
+# Variant rotations are around the centre of the block
+BLOCK_CENTRE = (0.5, -0.5, 0.5)
+
+IDENTITY = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+
+
+def get_rotation_matrix(angle, axis):
+    """
+    Return the matrix of a rotation by angle radians around the Blender axis X, Y or Z
+    """
+    c = math.cos(angle)
+    s = math.sin(angle)
+    if axis == 'X':
+        return [[1.0, 0.0, 0.0], [0.0, c, -s], [0.0, s, c]]
+    if axis == 'Y':
+        return [[c, 0.0, s], [0.0, 1.0, 0.0], [-s, 0.0, c]]
+    return [[c, -s, 0.0], [s, c, 0.0], [0.0, 0.0, 1.0]]
+
+
+def multiply_matrices(a, b):
+    return [[sum(a[row][k] * b[k][column] for k in range(3)) for column in range(3)] for row in range(3)]
+
+
+def rotate_vector(matrix, vector, centre):
+    """
+    Rotate vector by matrix around centre
+    """
+    offset = [vector[i] - centre[i] for i in range(3)]
+    return tuple(sum(matrix[row][k] * offset[k] for k in range(3)) + centre[row] for row in range(3))
+
+
+def convert_vector_coordinates(minecraft_vector):
+    """
+    Convert a position in a Minecraft model, in sixteenths of a block,
+    to Blender coordinates
+    """
+    return (minecraft_vector[0]/16, -minecraft_vector[2]/16, minecraft_vector[1]/16)
+
+
+def get_model_rotation(outer_model_data):
+    """
+    Return the variant rotation of outer_model_data as a matrix.
+
+    Note that the order the rotation is applied is relevant,
+    and that there are no rotations in the Minecraft z direction
+    """
+    model_rotation = IDENTITY
+    for key in reversed(list(outer_model_data)):
+        if key == 'x':
+            part_rotation_matrix = get_rotation_matrix(-math.radians(outer_model_data[key]), 'X')
+        elif key == 'y':
+            part_rotation_matrix = get_rotation_matrix(-math.radians(outer_model_data[key]), 'Z')
+        else:
+            continue
+        model_rotation = multiply_matrices(model_rotation, part_rotation_matrix)
+    return model_rotation
+
+
+def get_element_rotation(rotation_dict):
+    """
+    Return the rotation of a single element as a matrix and the centre it rotates around
+    """
+    angle = math.radians(rotation_dict["angle"])
+    if rotation_dict["axis"] == 'x':
+        matrix = get_rotation_matrix(angle, 'X')
+    elif rotation_dict["axis"] == 'z':
+        matrix = get_rotation_matrix(-angle, 'Y')
+    else:
+        matrix = get_rotation_matrix(angle, 'Z')
+    return matrix, convert_vector_coordinates(rotation_dict["origin"])
+
+
+def generate_default_uvs(from_vector, to_vector):
+    """
+    Return the uvs of each face of an element which does not give them,
+    from its corners in Blender coordinates.
+
+    uv format is [x1, y1, x2, y2]
+    """
+    f = (from_vector[0]*16, -from_vector[1]*16, from_vector[2]*16)
+    t = (to_vector[0]*16, -to_vector[1]*16, to_vector[2]*16)
+
+    return {
+        "down": [f[0], 16-t[1], t[0], 16-f[1]],
+        "up": [f[0], f[1], t[0], t[1]],
+        "west": [f[1], 16-t[2], t[1], 16-f[2]],
+        "east": [16-t[1], 16-t[2], 16-f[1], 16-f[2]],
+        "south": [f[0], 16-t[2], t[0], 16-f[2]],
+        "north": [16-t[0], 16-t[2], 16-f[0], 16-f[2]],
+    }
+
+
+def get_rotated_direction(direction, model_rotation):
+    """
+    Return the Minecraft direction that direction points in after model_rotation
+    """
+    rotated = rotate_vector(model_rotation, DIRECTION_OFFSETS[direction], (0, 0, 0))
+    rotated_offset = tuple(int(round(value)) for value in rotated)
+    for rotated_direction, offset in DIRECTION_OFFSETS.items():
+        if offset == rotated_offset:
+            return rotated_direction
+    return direction
+
+
+def get_element_geometry(element, model_rotation, culled_faces=frozenset()):
+    """
+    Return the vertices and faces of a model element.
+
+    vertices are the eight corners of the element in Blender coordinates,
+    after the element and variant rotations. faces are (vertex_indices,
+    texture, uv) tuples in the order of FACE_VERTICES, with the uv in the
+    Minecraft [x1, y1, x2, y2] format.
+
+    Faces with a cullface pointing in one of the culled_faces directions
+    (after the variant rotation) are left out.
+    """
+    f = convert_vector_coordinates(element["from"])
+    t = convert_vector_coordinates(element["to"])
+
+    # This constructs a rectangular prism from f to t
+    vertices = [
+        f,
+        (f[0], f[1], t[2]),
+        (t[0], f[1], f[2]),
+        (t[0], f[1], t[2]),
+        (f[0], t[1], f[2]),
+        (f[0], t[1], t[2]),
+        (t[0], t[1], f[2]),
+        t,
+    ]
+
+    default_uvs = generate_default_uvs(f, t)
+
+    faces = []
+    for face_name, face_vertices in FACE_VERTICES.items():
+        if face_name not in element["faces"]:
+            continue
+        face_data = element["faces"][face_name]
+        if "cullface" in face_data and get_rotated_direction(face_data["cullface"], model_rotation) in culled_faces:
+            continue
+        faces.append((face_vertices, face_data["texture"], face_data.get("uv", default_uvs[face_name])))
+
+    # Element rotation, rotation may be defined for a single element
+    if "rotation" in element:
+        rotation_matrix, centre = get_element_rotation(element["rotation"])
+        vertices = [rotate_vector(rotation_matrix, vertex, centre) for vertex in vertices]
+
+    # Variant rotation, rotation defined for the whole block, and applied to all elements
+    vertices = [rotate_vector(model_rotation, vertex, BLOCK_CENTRE) for vertex in vertices]
+
+    return vertices, faces
+
+
+def get_model_geometry(outer_model_data, model_data, culled_faces=frozenset()):
+    """
+    Return the (vertices, faces) of each element of model_data, rotated by
+    the variant in outer_model_data.
+
+    model_data must already be resolved with its parents, and have had its
+    texture variables replaced, see prepare_model_textures.
+    """
+    model_rotation = get_model_rotation(outer_model_data)
+    return [get_element_geometry(element, model_rotation, culled_faces) for element in model_data.get("elements", [])]
+
+
+def get_model_bounds(block_models):
+    """
+    Return the (minimum, maximum) corners of the box around the elements of
+    block_models, the (outer_model_data, model_data) pairs of a block state,
+    in Minecraft block coordinates where a full block goes from 0 to 1.
+    Returns None if there are no elements.
+    """
+    vertices = []
+    for outer_model_data, model_data in block_models:
+        for element_vertices, _ in get_model_geometry(outer_model_data, model_data):
+            vertices.extend(element_vertices)
+
+    if not vertices:
+        return None
+
+    # Blender (x, y, z) is Minecraft (x, z, -y)
+    minecraft_vertices = [(x, z, -y) for x, y, z in vertices]
+    minimum = tuple(min(vertex[axis] for vertex in minecraft_vertices) for axis in range(3))
+    maximum = tuple(max(vertex[axis] for vertex in minecraft_vertices) for axis in range(3))
+    return minimum, maximum
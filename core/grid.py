@@ -0,0 +1,112 @@
+"""
+Indexing blocks by their cell on the integer block grid, without Blender.
+
+Blocks are stored by name, so that the add-on can look the objects up
+again and the same index can be tested with plain names.
+"""
+from .geometry import DIRECTION_OFFSETS
+
+
+def get_matrix_cell(matrix, epsilon=1e-4):
+    """
+    Return the integer (x, y, z) grid cell of a 4x4 matrix if it is an
+    unrotated, unscaled block on the block grid, otherwise return None.
+    """
+    for row in range(3):
+        for column in range(3):
+            expected = 1 if row == column else 0
+            if abs(matrix[row][column] - expected) > epsilon:
+                return None
+
+    cell = []
+    for row in range(3):
+        value = matrix[row][3]
+        if abs(value - round(value)) > epsilon:
+            return None
+        cell.append(int(round(value)))
+
+    return tuple(cell)
+
+
+def get_neighbour_cell(cell, direction):
+    offset = DIRECTION_OFFSETS[direction]
+    return (cell[0] + offset[0], cell[1] + offset[1], cell[2] + offset[2])
+
+
+def get_culled_directions(cell, is_opaque_cell):
+    """
+    Return the set of directions in which the neighbour of cell is opaque,
+    as decided by is_opaque_cell(neighbour_cell).
+    """
+    return frozenset(
+        direction for direction in DIRECTION_OFFSETS
+        if is_opaque_cell(get_neighbour_cell(cell, direction))
+    )
+
+
+class GridIndex:
+    """
+    A map between block names and the grid cells they occupy, in both
+    directions. Only one block is kept per cell, the last one moved there.
+    """
+
+    def __init__(self):
+        self.cells = {}
+        self.name_cells = {}
+
+
+    def clear(self):
+        self.cells = {}
+        self.name_cells = {}
+
+
+    def move(self, name, cell):
+        """
+        Move the block called name to cell, or out of the grid if cell is None.
+
+        Returns the set of cells whose neighbourhood changed, which are
+        the old and new cells of the block.
+        """
+        changed_cells = set()
+
+        old_cell = self.name_cells.pop(name, None)
+        if old_cell is not None:
+            changed_cells.add(old_cell)
+            if self.cells.get(old_cell) == name:
+                del self.cells[old_cell]
+
+        if cell is not None:
+            changed_cells.add(cell)
+            self.name_cells[name] = cell
+            self.cells[cell] = name
+
+        return changed_cells
+
+
+    def remove_cell(self, cell):
+        """
+        Forget the block in cell, if there is one
+        """
+        name = self.cells.pop(cell, None)
+        if name is not None and self.name_cells.get(name) == cell:
+            del self.name_cells[name]
+
+
+    def get_name(self, cell):
+        return self.cells.get(cell)
+
+
+    def get_name_cell(self, name):
+        return self.name_cells.get(name)
+
+
+    def get_neighbour_names(self, cell):
+        """
+        Return a dict from direction to the name of the neighbouring block in that direction
+        """
+        neighbours = {}
+        for direction in DIRECTION_OFFSETS:
+            name = self.cells.get(get_neighbour_cell(cell, direction))
+            if name is not None:
+                neighbours[direction] = name
+        return neighbours
@@ -0,0 +1,131 @@
+"""
+Exporting a scene as function macros, which need Minecraft 1.20.2 or newer.
+
+Every passenger of the usual summon command repeats its id, block state and
+render fields. Here each distinct block state gets one macro function which
+summons it and mounts it on the executing root entity, and the passengers
+only call it with their transformation:
+
+    function mcbde:build/block_0 {t:"[1,0,0,0,0,1,0,0,0,0,1,0,0,0,0,1]"}
+
+so scenes made of a few kinds of blocks take far less text.
+"""
+from .commands import (
+    RENDER_FIELDS, format_block_state, format_transformation, format_number, format_string,
+    format_compact_tags, format_verbose_tags,
+)
+
+# The data pack format of Minecraft 1.20.2, the first version with function macros
+MACRO_PACK_FORMAT = 18
+
+# Tags of the entities which are being built, so that the functions can find them
+BUILD_ROOT_TAG = "mcbde.build_root"
+NEW_PASSENGER_TAG = "mcbde.new"
+
+
+def format_argument(value):
+    """
+    Return value as an SNBT string for a macro argument, using single quotes
+    when that avoids escaping
+    """
+    if '"' in value and "'" not in value:
+        return "'" + value + "'"
+    return format_string(value)
+
+
+def format_tags(tags, compact):
+    if compact:
+        return format_compact_tags(tags)
+    return format_verbose_tags(tags)
+
+
+def format_render_fields(passenger, compact, tolerance):
+    if compact:
+        return "".join(f",{name}:{format_number(passenger[name], tolerance)}f" for name in RENDER_FIELDS if name in passenger)
+    return "".join(f", {name}: {round(passenger[name], 4)}f" for name in RENDER_FIELDS if name in passenger)
+
+
+def get_template_key(passenger):
+    """
+    Return what a passenger shares with the others using the same template
+    """
+    return (
+        passenger["block_type"],
+        tuple(passenger["properties"].items()),
+        tuple((name, passenger[name]) for name in RENDER_FIELDS if name in passenger),
+        bool(passenger.get("tags")),
+    )
+
+
+def format_template(passenger, compact, tolerance):
+    """
+    Return the commands of the macro function which summons a passenger like
+    this one, with the transformation t and the tags g as arguments, and
+    mounts it on the executing entity
+    """
+    new_tags = format_tags([NEW_PASSENGER_TAG], compact)
+    if passenger.get("tags"):
+        # The passenger tags are spliced into the list after the new tag
+        new_tags = new_tags[:-1] + ",$(g)]"
+    block_state = format_block_state(passenger["block_type"], passenger["properties"], compact)
+    render_string = format_render_fields(passenger, compact, tolerance)
+
+    if compact:
+        summon = f"$summon block_display ~ ~ ~ {{Tags:{new_tags},block_state:{block_state},transformation:$(t){render_string}}}"
+    else:
+        summon = f"$summon block_display ~ ~ ~ {{Tags: {new_tags}, block_state: {block_state}, transformation: $(t){render_string}}}"
+
+    new_passenger = f"@e[type=block_display,tag={NEW_PASSENGER_TAG},limit=1]"
+    return [
+        summon,
+        f"ride {new_passenger} mount @s",
+        f"tag {new_passenger} remove {NEW_PASSENGER_TAG}",
+    ]
+
+
+def format_root_summon(origin_location, root_tags, compact, tolerance):
+    tags = format_tags([BUILD_ROOT_TAG] + list(root_tags or []), compact)
+    if compact:
+        origin_text = " ".join("~" + format_number(value, tolerance) for value in origin_location)
+        return f"summon block_display {origin_text} {{Tags:{tags}}}"
+    origin_text = " ".join(f"~{round(value, 4)}" for value in origin_location)
+    return f"summon block_display {origin_text} {{Tags: {tags}}}"
+
+
+def build_macro_functions(name, namespace, roots, root_tags=None, compact=False, tolerance=0.0001, use_decomposed=True):
+    """
+    Return the functions which summon the scene, as a dict from function
+    path to commands for write_datapack.
+
+    roots is the list of (origin_location, passengers) pairs of the root
+    entities, see get_root_entities. Running namespace:name summons them.
+    name/root_<index> mounts the passengers of a root, and name/block_<index>
+    is the template of a block state.
+    """
+    functions = {name: []}
+    template_names = {}
+    root_selector = f"@e[type=block_display,tag={BUILD_ROOT_TAG},limit=1]"
+
+    for root_index, (origin_location, passengers) in enumerate(roots):
+        root_function = f"{name}/root_{root_index}"
+        functions[name] += [
+            format_root_summon(origin_location, root_tags, compact, tolerance),
+            f"execute as {root_selector} at @s run function {namespace}:{root_function}",
+            f"tag {root_selector} remove {BUILD_ROOT_TAG}",
+        ]
+
+        calls = []
+        for passenger in passengers:
+            key = get_template_key(passenger)
+            if key not in template_names:
+                template_names[key] = f"{name}/block_{len(template_names)}"
+                functions[template_names[key]] = format_template(passenger, compact, tolerance)
+
+            transformation = format_transformation(passenger["transformation"], compact, tolerance, use_decomposed)
+            arguments = f"t:{format_argument(transformation)}"
+            if passenger.get("tags"):
+                arguments += f",g:{format_argument(format_tags(passenger['tags'], compact)[1:-1])}"
+            calls.append(f"function {namespace}:{template_names[key]} {{{arguments}}}")
+        functions[root_function] = calls
+
+    return functions
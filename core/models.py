@@ -0,0 +1,195 @@
+"""
+Resolving block models from their parents, and questions about the shape of
+block states.
+
+Functions which need the game data take it as their first argument, which
+may be any object with a get_data(data_dict, identifier) method, such as
+JarData or the add-on's data_loader.
+"""
+from .blockstates import get_outer_model_data, choose_models, build_properties_dict, get_default_properties
+from .geometry import get_model_bounds
+
+# Full cube blocks which can be seen through, matched against the block type
+TRANSPARENT_BLOCK_KEYWORDS = ["glass", "leaves"]
+TRANSPARENT_BLOCKS = [
+    "ice",
+    "frosted_ice",
+    "slime_block",
+    "honey_block",
+    "spawner",
+    "barrier",
+    "light",
+    "structure_void",
+    "mangrove_roots",
+]
+
+
+def replace_textures(d, textures):
+    """
+    Replace all instances of a # variable in d (#east for example) with the corresponding texture in textures
+    """
+    if isinstance(d, dict):
+        for key, value in d.items():
+            d[key] = replace_textures(value, textures)
+    elif isinstance(d, list):
+        for i, item in enumerate(d):
+            d[i] = replace_textures(item, textures)
+    elif isinstance(d, str) and d.startswith("#") and d[1:] in textures:
+        return textures[d[1:]].replace("minecraft:", "")
+    elif isinstance(d, str) and d.startswith("#") and d[1:] == "texture": # I have no idea why this case exists
+        return textures["particle"].replace("minecraft:", "")
+    return d
+
+
+def prepare_model_textures(model_data):
+    """
+    Replace the texture variables in the elements of a resolved model, and
+    remove the minecraft: namespace from its texture names.
+    """
+    replace_textures(model_data["elements"], model_data["textures"])
+
+    # Some textures have "minecraft:" in them, others do not, we make this
+    # consistent
+    for texture_name in model_data["textures"]:
+        model_data["textures"][texture_name] = model_data["textures"][texture_name].replace("minecraft:", "")
+
+
+def resolve_model(data, model_data):
+    """
+    Combine model_data with all of its parents from data, so that the returned
+    model data contains all of the elements and textures of the model.
+    """
+    # While this model data has a valid parent, we combine it with its parent to get all data
+    # We do not need gui data from block/block
+    while "parent" in model_data.keys() and model_data["parent"] != "block/block":
+        parent_name = model_data["parent"].split("/")[-1]
+        parent_data = data.get_data("block_models", parent_name)
+        del model_data["parent"]
+
+        for key in parent_data.keys():
+            # Special case for textures where we gather texture data into one dict
+            if key == "textures" and "textures" in model_data:
+                tmp_textures = parent_data["textures"]
+
+                for texture_name in tmp_textures:
+                    texture_value = tmp_textures[texture_name]
+
+                    # If this texture is a reference to another texture, we go find that other texture
+                    if '#' in texture_value:
+                        tmp_textures[texture_name] = model_data["textures"].get(texture_value.strip('#'))
+                    else:
+                        tmp_textures[texture_name] = texture_value
+
+                for texture_name in model_data["textures"]:
+                    if texture_name not in tmp_textures:
+                        tmp_textures[texture_name] = model_data["textures"][texture_name]
+
+                model_data[key] = tmp_textures
+
+            # Otherwise, we just put the parent non-display data into the model data
+            elif key != "display":
+                model_data[key] = parent_data[key]
+
+    return model_data
+
+
+def get_block_models(data, block_type, selected_block_properties, model_choice=0):
+    """
+    Return a list of (outer_model_data, model_data) pairs for the block state,
+    where model_data has already been resolved with all of its parents.
+
+    Random models are picked by model_choice, see choose_models.
+    """
+    blockstate = data.get_data("blockstates", block_type)
+    if blockstate is None:
+        return []
+
+    block_models = []
+    for model in choose_models(get_outer_model_data(blockstate, selected_block_properties) or [], model_choice):
+        model_name = model["model"].split('/')[-1]
+        model_data = data.get_data("block_models", model_name)
+        block_models.append((model, resolve_model(data, model_data)))
+
+    return block_models
+
+
+def is_full_cube(data, block_type, selected_block_properties):
+    """
+    Return true if the block state is rendered as a single, unrotated,
+    full sized cube with all six faces.
+    """
+    block_models = get_block_models(data, block_type, selected_block_properties)
+    if len(block_models) != 1:
+        return False
+
+    elements = block_models[0][1].get("elements", [])
+    if len(elements) != 1:
+        return False
+
+    element = elements[0]
+    return element["from"] == [0, 0, 0] \
+        and element["to"] == [16, 16, 16] \
+        and "rotation" not in element \
+        and len(element.get("faces", {})) == 6
+
+
+def is_opaque_full_cube(data, block_type, selected_block_properties):
+    """
+    Return true if the block state is a full cube which cannot be seen through,
+    so that it hides anything behind its faces.
+    """
+    if block_type in TRANSPARENT_BLOCKS or any(keyword in block_type for keyword in TRANSPARENT_BLOCK_KEYWORDS):
+        return False
+    return is_full_cube(data, block_type, selected_block_properties)
+
+
+def get_block_bounds(data, block_type, selected_block_properties):
+    """
+    Return the (minimum, maximum) corners of the models of the block state in
+    Minecraft block coordinates, or None if it has no elements.
+    """
+    return get_model_bounds(get_block_models(data, block_type, selected_block_properties))
+
+
+def get_block_bounds_getter(data):
+    """
+    Return a function of a block type and its properties which returns
+    get_block_bounds, cached for each block state of the loaded jar
+    """
+    cache = {}
+
+    def get_state_bounds(block_type, selected_block_properties):
+        state_key = (data.minecraft_location, block_type, tuple(selected_block_properties.items()))
+        if state_key not in cache:
+            cache[state_key] = get_block_bounds(data, block_type, selected_block_properties)
+        return cache[state_key]
+
+    return get_state_bounds
+
+
+def get_block_icon_texture(data, block_type):
+    """
+    Return the texture which represents block_type in the block picker, such
+    as block/oak_planks, or None if it has none.
+
+    This is the particle texture of the default state if it has one,
+    otherwise the first texture of its models.
+    """
+    blockstate = data.get_data("blockstates", block_type)
+    if blockstate is None:
+        return None
+
+    textures = []
+    for _, model_data in get_block_models(data, block_type, get_default_properties(build_properties_dict(blockstate))):
+        model_textures = model_data.get("textures", {})
+        names = ["particle"] + [name for name in model_textures if name != "particle"]
+        for name in names:
+            texture = model_textures.get(name)
+            # Follow references to other texture variables
+            while isinstance(texture, str) and texture.startswith("#"):
+                texture = model_textures.get(texture[1:])
+            if texture:
+                textures.append(texture.replace("minecraft:", ""))
+                break
+
+    return textures[0] if textures else None
@@ -0,0 +1,205 @@
+"""
+A reader for binary NBT files, such as structure files and schematics.
+
+Files are decompressed as they are read, a chunk at a time, and arrays and
+lists of numbers are unpacked in one call, so large structures load quickly.
+"""
+import gzip
+import struct
+import zlib
+
+TAG_END = 0
+TAG_BYTE = 1
+TAG_SHORT = 2
+TAG_INT = 3
+TAG_LONG = 4
+TAG_FLOAT = 5
+TAG_DOUBLE = 6
+TAG_BYTE_ARRAY = 7
+TAG_STRING = 8
+TAG_LIST = 9
+TAG_COMPOUND = 10
+TAG_INT_ARRAY = 11
+TAG_LONG_ARRAY = 12
+
+# The struct format of each numeric tag
+NUMBER_FORMATS = {
+    TAG_BYTE: "b",
+    TAG_SHORT: "h",
+    TAG_INT: "i",
+    TAG_LONG: "q",
+    TAG_FLOAT: "f",
+    TAG_DOUBLE: "d",
+}
+
+# The element tag of each array tag
+ARRAY_TAGS = {
+    TAG_BYTE_ARRAY: TAG_BYTE,
+    TAG_INT_ARRAY: TAG_INT,
+    TAG_LONG_ARRAY: TAG_LONG,
+}
+
+GZIP_MAGIC = b"\x1f\x8b"
+READ_CHUNK_SIZE = 1 << 20
+
+BYTE_STRUCT = struct.Struct(">b")
+UNSIGNED_SHORT_STRUCT = struct.Struct(">H")
+INT_STRUCT = struct.Struct(">i")
+COMPOUND_ENTRY_STRUCT = struct.Struct(">bH")
+NUMBER_STRUCTS = {tag_type: struct.Struct(">" + number_format) for tag_type, number_format in NUMBER_FORMATS.items()}
+
+
+class NbtError(Exception):
+    pass
+
+
+class NbtReader:
+    """
+    Reads NBT tags from a binary stream.
+
+    The stream is read in large chunks which are unpacked in place, since
+    structures contain hundreds of thousands of tiny tags.
+
+    Compounds are returned as dicts, lists as lists, and byte arrays as
+    bytes, since they are usually unpacked further.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = b""
+        self.position = 0
+        # Compound keys repeat constantly, so each is only decoded once
+        self.names = {}
+
+
+    def ensure(self, length):
+        """
+        Make sure that the next length bytes are in the buffer
+        """
+        if self.position + length <= len(self.buffer):
+            return
+        remaining = self.buffer[self.position:]
+        data = self.stream.read(max(READ_CHUNK_SIZE, length - len(remaining)))
+        self.buffer = remaining + data
+        self.position = 0
+        if len(self.buffer) < length:
+            raise NbtError("Unexpected end of NBT data")
+
+
+    def unpack(self, unpacker):
+        self.ensure(unpacker.size)
+        value = unpacker.unpack_from(self.buffer, self.position)[0]
+        self.position += unpacker.size
+        return value
+
+
+    def read(self, length):
+        self.ensure(length)
+        data = self.buffer[self.position:self.position + length]
+        self.position += length
+        return data
+
+
+    def read_numbers(self, tag_type, count):
+        unpacker = struct.Struct(f">{count}{NUMBER_FORMATS[tag_type]}")
+        self.ensure(unpacker.size)
+        values = list(unpacker.unpack_from(self.buffer, self.position))
+        self.position += unpacker.size
+        return values
+
+
+    def read_string(self):
+        length = self.unpack(UNSIGNED_SHORT_STRUCT)
+        return self.read(length).decode("utf-8", errors="replace")
+
+
+    def read_length(self):
+        length = self.unpack(INT_STRUCT)
+        if length < 0:
+            raise NbtError("Negative NBT length")
+        return length
+
+
+    def read_payload(self, tag_type):
+        if tag_type in NUMBER_STRUCTS:
+            return self.unpack(NUMBER_STRUCTS[tag_type])
+
+        if tag_type == TAG_STRING:
+            return self.read_string()
+
+        if tag_type == TAG_BYTE_ARRAY:
+            return self.read(self.read_length())
+
+        if tag_type in ARRAY_TAGS:
+            return self.read_numbers(ARRAY_TAGS[tag_type], self.read_length())
+
+        if tag_type == TAG_LIST:
+            element_type = self.unpack(BYTE_STRUCT)
+            length = self.read_length()
+            if element_type in NUMBER_FORMATS:
+                return self.read_numbers(element_type, length)
+            return [self.read_payload(element_type) for _ in range(length)]
+
+        if tag_type == TAG_COMPOUND:
+            compound = {}
+            while True:
+                # The tag type and name length are read together, since this is the hottest loop
+                self.ensure(1)
+                if self.buffer[self.position] == TAG_END:
+                    self.position += 1
+                    return compound
+                self.ensure(3)
+                child_type, name_length = COMPOUND_ENTRY_STRUCT.unpack_from(self.buffer, self.position)
+                self.position += 3
+                name = self.read(name_length)
+                if name not in self.names:
+                    self.names[name] = name.decode("utf-8", errors="replace")
+                compound[self.names[name]] = self.read_payload(child_type)
+
+        raise NbtError(f"Unknown NBT tag type {tag_type}")
+
+
+    def read_root(self):
+        """
+        Return the name and value of the root tag
+        """
+        tag_type = self.unpack(BYTE_STRUCT)
+        if tag_type != TAG_COMPOUND:
+            raise NbtError("The root NBT tag is not a compound")
+        name = self.read_string()
+        return name, self.read_payload(tag_type)
+
+
+def read_nbt_file(path):
+    """
+    Return the name and value of the root tag of the NBT file at path,
+    which may be gzip compressed or uncompressed
+    """
+    with open(path, "rb") as f:
+        is_compressed = f.read(2) == GZIP_MAGIC
+        f.seek(0)
+        if not is_compressed:
+            return NbtReader(f).read_root()
+        try:
+            return NbtReader(gzip.GzipFile(fileobj=f)).read_root()
+        except (EOFError, zlib.error) as e:
+            raise NbtError(f"Corrupt compressed NBT data: {e}") from e
+
+
+def read_varints(data):
+    """
+    Return the list of unsigned variable length integers packed in data,
+    as used for the block data of schematics
+    """
+    values = []
+    value = 0
+    shift = 0
+    for byte in data:
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = 0
+            shift = 0
+    return values
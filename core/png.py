@@ -0,0 +1,162 @@
+"""
+Decoding the PNG textures of a jar without Blender, so that it can be done
+on a background thread.
+
+Only non interlaced images are supported, which all game textures are.
+"""
+import struct
+import zlib
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# The number of samples per pixel of each colour type
+CHANNELS = {
+    0: 1,  # Greyscale
+    2: 3,  # RGB
+    3: 1,  # Palette index
+    4: 2,  # Greyscale and alpha
+    6: 4,  # RGBA
+}
+
+
+class PngError(Exception):
+    pass
+
+
+def read_chunks(data):
+    """
+    Yield the (type, data) of every chunk of the PNG data
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        raise PngError("Not a PNG file")
+
+    offset = len(PNG_SIGNATURE)
+    while offset + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[offset:offset + 8])
+        yield chunk_type, data[offset + 8:offset + 8 + length]
+        # Skip the length, type, data and CRC
+        offset += 12 + length
+
+
+def paeth(a, b, c):
+    p = a + b - c
+    pa = abs(p - a)
+    pb = abs(p - b)
+    pc = abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    if pb <= pc:
+        return b
+    return c
+
+
+def unfilter_rows(raw, height, row_length, pixel_bytes):
+    """
+    Return the rows of the image with the PNG filters undone
+    """
+    rows = []
+    previous = bytearray(row_length)
+    offset = 0
+    for _ in range(height):
+        filter_type = raw[offset]
+        row = bytearray(raw[offset + 1:offset + 1 + row_length])
+        offset += 1 + row_length
+
+        if filter_type == 1:
+            for i in range(pixel_bytes, row_length):
+                row[i] = (row[i] + row[i - pixel_bytes]) & 0xff
+        elif filter_type == 2:
+            for i in range(row_length):
+                row[i] = (row[i] + previous[i]) & 0xff
+        elif filter_type == 3:
+            for i in range(row_length):
+                left = row[i - pixel_bytes] if i >= pixel_bytes else 0
+                row[i] = (row[i] + ((left + previous[i]) >> 1)) & 0xff
+        elif filter_type == 4:
+            for i in range(row_length):
+                left = row[i - pixel_bytes] if i >= pixel_bytes else 0
+                up_left = previous[i - pixel_bytes] if i >= pixel_bytes else 0
+                row[i] = (row[i] + paeth(left, previous[i], up_left)) & 0xff
+        elif filter_type != 0:
+            raise PngError(f"Unknown filter type {filter_type}")
+
+        rows.append(row)
+        previous = row
+    return rows
+
+
+def get_samples(row, width, channels, bit_depth):
+    """
+    Return the samples of a row, scaled to 8 bits unless they are palette indices
+    """
+    if bit_depth == 8:
+        return row[:width * channels]
+    if bit_depth == 16:
+        # Keep the most significant byte
+        return row[0:width * channels * 2:2]
+
+    per_byte = 8 // bit_depth
+    mask = (1 << bit_depth) - 1
+    samples = bytearray()
+    for i in range(width * channels):
+        byte = row[i // per_byte]
+        shift = 8 - bit_depth * (i % per_byte + 1)
+        samples.append((byte >> shift) & mask)
+    return samples
+
+
+def decode_png(data):
+    """
+    Return (width, height, pixels) of the PNG data, where pixels is a
+    bytearray of 8 bit RGBA values, row by row from the top.
+    """
+    header = None
+    palette = b""
+    transparency = b""
+    compressed = bytearray()
+    for chunk_type, chunk_data in read_chunks(data):
+        if chunk_type == b"IHDR":
+            header = struct.unpack(">IIBBBBB", chunk_data)
+        elif chunk_type == b"PLTE":
+            palette = chunk_data
+        elif chunk_type == b"tRNS":
+            transparency = chunk_data
+        elif chunk_type == b"IDAT":
+            compressed += chunk_data
+        elif chunk_type == b"IEND":
+            break
+
+    if header is None:
+        raise PngError("Missing IHDR chunk")
+    width, height, bit_depth, colour_type, _, _, interlace = header
+    if interlace:
+        raise PngError("Interlaced images are not supported")
+    if colour_type not in CHANNELS:
+        raise PngError(f"Unknown colour type {colour_type}")
+
+    channels = CHANNELS[colour_type]
+    row_length = (width * channels * bit_depth + 7) // 8
+    pixel_bytes = max(channels * bit_depth // 8, 1)
+    rows = unfilter_rows(zlib.decompress(bytes(compressed)), height, row_length, pixel_bytes)
+
+    pixels = bytearray()
+    for row in rows:
+        samples = get_samples(row, width, channels, bit_depth)
+        if colour_type == 6:
+            pixels += samples
+        elif colour_type == 2:
+            for i in range(0, len(samples), 3):
+                pixels += samples[i:i + 3] + b"\xff"
+        elif colour_type == 3:
+            for index in samples:
+                alpha = transparency[index] if index < len(transparency) else 255
+                pixels += palette[index * 3:index * 3 + 3] + bytes([alpha])
+        else:
+            if bit_depth < 8:
+                samples = bytearray(value * 255 // ((1 << bit_depth) - 1) for value in samples)
+            for i in range(0, len(samples), channels):
+                grey = samples[i]
+                alpha = samples[i + 1] if channels == 2 else 255
+                pixels += bytes([grey, grey, grey, alpha])
+
+    return width, height, pixels
@@ -0,0 +1,66 @@
+"""
+Drawing random models for blocks whose block state has several weighted
+models, reproducibly from a seed and the names of the blocks.
+
+The choices are the mixed radix numbers of choose_models in blockstates.
+numpy is only imported once models are drawn, so modules importing this one
+load without it.
+"""
+import zlib
+
+from .blockstates import get_model_weights
+
+
+MASK_32 = 0xffffffff
+
+
+def mix_hashes(hashes):
+    """
+    Return the 32 bit hashes with their bits mixed by the MurmurHash3
+    finalizer, since CRC32 of similar names differ in few bits
+    """
+    import numpy as np
+
+    mask = np.uint64(MASK_32)
+    hashes = hashes ^ (hashes >> np.uint64(16))
+    hashes = (hashes * np.uint64(0x85ebca6b)) & mask
+    hashes = hashes ^ (hashes >> np.uint64(13))
+    hashes = (hashes * np.uint64(0xc2b2ae35)) & mask
+    return hashes ^ (hashes >> np.uint64(16))
+
+
+def get_random_values(names, seed, part_count):
+    """
+    Return an array of a uniform value in [0, 1) for every name and part,
+    which only depends on the seed, name and part
+    """
+    import numpy as np
+
+    name_hashes = np.array([zlib.crc32(name.encode()) for name in names], dtype=np.uint64)
+    values = np.empty((len(names), part_count), dtype=np.float64)
+    for part in range(part_count):
+        salt = np.uint64(zlib.crc32(f"{seed}:{part}".encode()))
+        values[:, part] = mix_hashes(mix_hashes(name_hashes ^ salt)) / 2**32
+    return values
+
+
+def sample_model_choices(outer_model_data, names, seed):
+    """
+    Return the model choice of each name, drawn from the weights of the
+    random models of outer_model_data, see choose_models
+    """
+    import numpy as np
+
+    part_weights = [weights for weights in get_model_weights(outer_model_data) if len(weights) > 1]
+    choices = np.zeros(len(names), dtype=np.int64)
+    if not part_weights:
+        return choices
+
+    values = get_random_values(names, seed, len(part_weights))
+    radix = 1
+    for part, weights in enumerate(part_weights):
+        cumulative = np.cumsum(weights, dtype=np.float64)
+        indices = np.searchsorted(cumulative / cumulative[-1], values[:, part], side='right')
+        choices += np.minimum(indices, len(weights) - 1) * radix
+        radix *= len(weights)
+    return choices
@@ -0,0 +1,102 @@
+"""
+Indexing blocks by block type and block state, without Blender.
+
+Blocks are stored by name with their registry key, (block type, state key)
+for blocks and INSTANCER for instancers, so that the add-on can look the
+objects up again and the same index can be tested with plain names.
+"""
+
+# The registry key of instancer objects
+INSTANCER = "instancer"
+
+
+class RegistryIndex:
+    """
+    Names indexed by block type and by (block type, state key), and the
+    names of instancers.
+
+    The index is checked when it is looked up, with a function returning the
+    current key of a name, or None if it is no longer a block or instancer,
+    so that names whose key changed without the index seeing it are moved
+    to their new key instead of being returned under the old one.
+    The names are kept in the order they were indexed in.
+    """
+
+    def __init__(self):
+        self.clear()
+
+
+    def clear(self):
+        # Name to its registry key, in the order names were indexed
+        self.objects = {}
+        self.types = {}
+        self.states = {}
+
+
+    def unindex(self, name):
+        key = self.objects.get(name)
+        if key is not None and key != INSTANCER:
+            self.types[key[0]].discard(name)
+            self.states[key].discard(name)
+
+
+    def set_key(self, name, key):
+        """
+        Index name under key, or remove it if key is None
+        """
+        if self.objects.get(name) == key:
+            return
+
+        self.unindex(name)
+        if key is None:
+            self.objects.pop(name, None)
+            return
+
+        # Assigning to an existing name keeps its place in the order
+        self.objects[name] = key
+        if key != INSTANCER:
+            self.types.setdefault(key[0], set()).add(name)
+            self.states.setdefault(key, set()).add(name)
+
+
+    def get_valid_names(self, names, get_current_key, matches):
+        """
+        Return the names whose current key matches, moving the names whose
+        key changed to their current key
+        """
+        valid = []
+        for name in names:
+            key = get_current_key(name)
+            self.set_key(name, key)
+            if key is not None and matches(key):
+                valid.append(name)
+        return valid
+
+
+    def get_names(self, get_current_key):
+        """
+        Return the names of the blocks and instancers
+        """
+        return self.get_valid_names(list(self.objects), get_current_key, lambda key: True)
+
+
+    def get_type_names(self, block_type, get_current_key):
+        """
+        Return the names of the blocks of block_type
+        """
+        return self.get_valid_names(
+            list(self.types.get(block_type, ())),
+            get_current_key,
+            lambda key: key != INSTANCER and key[0] == block_type
+        )
+
+
+    def get_state_names(self, block_type, state_key, get_current_key):
+        """
+        Return the names of the blocks with exactly the block state
+        """
+        return self.get_valid_names(
+            list(self.states.get((block_type, state_key), ())),
+            get_current_key,
+            lambda key: key == (block_type, state_key)
+        )
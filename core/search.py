@@ -0,0 +1,97 @@
+"""
+Searching the block types by name as the user types.
+
+The index is built once, so that each search only looks up the words
+starting with what was typed, and only falls back to scanning every block
+for substring and fuzzy matches.
+"""
+import re
+
+# Match kinds, in the order results are ranked
+EXACT = 0
+PREFIX = 1
+WORD_PREFIX = 2
+SUBSTRING = 3
+FUZZY = 4
+
+# The number of searches remembered before the results cache is emptied
+RESULTS_CACHE_SIZE = 256
+
+
+def get_words(text):
+    return text.lower().replace("_", " ").split()
+
+
+class BlockSearchIndex:
+    """
+    An index of block identifiers, such as oak_planks, and their display
+    names, by the prefixes of their words.
+    """
+
+    def __init__(self, blocks):
+        """
+        blocks is a list of (identifier, name) pairs
+        """
+        self.identifiers = [identifier for identifier, _ in blocks]
+        # Text searched for substring and fuzzy matches, identifier and name together
+        self.keys = [identifier + " " + name.lower() for identifier, name in blocks]
+        # Word prefix to the set of indices of blocks with a word starting with it
+        self.word_prefixes = {}
+        for index, (identifier, name) in enumerate(blocks):
+            for word in set(get_words(identifier) + get_words(name)):
+                for length in range(1, len(word) + 1):
+                    self.word_prefixes.setdefault(word[:length], set()).add(index)
+        self.results_cache = {}
+
+
+    def get_match_kinds(self, text):
+        """
+        Return a dict from block index to the best kind of match for text
+        """
+        terms = get_words(text)
+        query = "_".join(terms)
+        matches = {}
+
+        # Every term must start a word of the block
+        candidates = set.intersection(*(self.word_prefixes.get(term, set()) for term in terms))
+        for index in candidates:
+            identifier = self.identifiers[index]
+            if identifier == query:
+                matches[index] = EXACT
+            elif identifier.startswith(query):
+                matches[index] = PREFIX
+            else:
+                matches[index] = WORD_PREFIX
+
+        text = text.strip().lower()
+        fuzzy_pattern = re.compile(".*?".join(re.escape(character) for character in query))
+        for index, key in enumerate(self.keys):
+            if index in matches:
+                continue
+            if text in key or query in key:
+                matches[index] = SUBSTRING
+            elif fuzzy_pattern.search(self.identifiers[index]):
+                matches[index] = FUZZY
+
+        return matches
+
+
+    def search(self, text, limit=None):
+        """
+        Return the identifiers of the blocks matching text, best matches first.
+
+        Blocks match when the words of text start words of their identifier
+        or name, when text appears in them, or when the letters of text
+        appear in order in the identifier. Every block matches empty text.
+        """
+        if not get_words(text):
+            return self.identifiers[:limit]
+
+        cache_key = text.strip().lower()
+        if cache_key not in self.results_cache:
+            if len(self.results_cache) >= RESULTS_CACHE_SIZE:
+                self.results_cache.clear()
+            matches = self.get_match_kinds(text)
+            ranked = sorted(matches, key=lambda index: (matches[index], len(self.identifiers[index]), self.identifiers[index]))
+            self.results_cache[cache_key] = [self.identifiers[index] for index in ranked]
+        return self.results_cache[cache_key][:limit]
@@ -0,0 +1,182 @@
+"""
+A parser for stringified NBT (SNBT), as used in Minecraft commands.
+
+The parser keeps its own stack instead of recursing, and scans with compiled
+regular expressions, so it runs in linear time even on commands that are
+megabytes long and nested deeply.
+"""
+import re
+
+WHITESPACE_PATTERN = re.compile(r"\s*")
+UNQUOTED_PATTERN = re.compile(r"[A-Za-z0-9_.+-]+")
+DOUBLE_QUOTED_PATTERN = re.compile(r'"((?:[^"\\]|\\.)*)"', re.DOTALL)
+SINGLE_QUOTED_PATTERN = re.compile(r"'((?:[^'\\]|\\.)*)'", re.DOTALL)
+ESCAPE_PATTERN = re.compile(r"\\(.)", re.DOTALL)
+TYPED_ARRAY_PATTERN = re.compile(r"\[\s*[BILbil]\s*;")
+
+FLOAT_PATTERN = r"[-+]?(?:[0-9]+(?:[.][0-9]*)?|[.][0-9]+)(?:[eE][-+]?[0-9]+)?[fFdD]"
+FLOAT_LIST_PATTERN = re.compile(rf"\[\s*(?:{FLOAT_PATTERN}\s*,\s*)*{FLOAT_PATTERN}\s*\]")
+NUMBER_PATTERN = re.compile(r"([-+]?(?:[0-9]+[.]?|[0-9]*[.][0-9]+)(?:[eE][-+]?[0-9]+)?)([bBsSlLfFdD]?)")
+
+SUMMON_PATTERN = re.compile(r"summon\s+(?:minecraft:)?block_display\s+(\S+)\s+(\S+)\s+(\S+)\s*")
+
+
+class SnbtError(Exception):
+    pass
+
+
+def skip_whitespace(text, position):
+    return WHITESPACE_PATTERN.match(text, position).end()
+
+
+def read_string(text, position):
+    """
+    Read a quoted or unquoted string starting at position.
+
+    Returns the string and the position after it.
+    """
+    for pattern in [DOUBLE_QUOTED_PATTERN, SINGLE_QUOTED_PATTERN, UNQUOTED_PATTERN]:
+        match = pattern.match(text, position)
+        if match:
+            if pattern is UNQUOTED_PATTERN:
+                return match.group(0), match.end()
+            return ESCAPE_PATTERN.sub(r"\1", match.group(1)), match.end()
+    raise SnbtError(f"Expected a string at position {position}")
+
+
+def read_scalar(text, position):
+    """
+    Read a number or string starting at position.
+
+    Numbers with a float or double suffix or a decimal point are returned as
+    floats, other numbers as ints, and anything else as a string. true and
+    false are kept as strings, since block state properties use them.
+    """
+    if text[position] in "\"'":
+        return read_string(text, position)
+
+    match = UNQUOTED_PATTERN.match(text, position)
+    if not match:
+        raise SnbtError(f"Expected a value at position {position}")
+    token, end = match.group(0), match.end()
+
+    number_match = NUMBER_PATTERN.fullmatch(token)
+    if number_match:
+        number, suffix = number_match.groups()
+        if suffix in ("f", "F", "d", "D") or (not suffix and ("." in number or "e" in number.lower())):
+            return float(number), end
+        return int(number), end
+    return token, end
+
+
+def read_key(text, position):
+    """
+    Read a compound key and the following colon.
+
+    Returns the key and the position after the colon.
+    """
+    position = skip_whitespace(text, position)
+    key, position = read_string(text, position)
+    position = skip_whitespace(text, position)
+    if position >= len(text) or text[position] != ":":
+        raise SnbtError(f"Expected ':' at position {position}")
+    return key, position + 1
+
+
+def parse_snbt(text, position=0):
+    """
+    Parse the SNBT value starting at position.
+
+    Compounds are returned as dicts, and lists and arrays as lists.
+
+    Returns the value and the position after it.
+    """
+    # Each entry is a [container, key] pair, where key is the key the next value is stored under
+    stack = []
+
+    try:
+        while True:
+            position = skip_whitespace(text, position)
+            character = text[position]
+
+            if character == "{":
+                position = skip_whitespace(text, position + 1)
+                if text[position] == "}":
+                    value = {}
+                    position += 1
+                else:
+                    key, position = read_key(text, position)
+                    stack.append([{}, key])
+                    continue
+            elif character == "[" and (float_list_match := FLOAT_LIST_PATTERN.match(text, position)):
+                # Lists of floats, such as transformations, are by far the most common, so they are read in one go
+                value = [float(number.strip().rstrip("fFdD")) for number in float_list_match.group(0)[1:-1].split(",")]
+                position = float_list_match.end()
+            elif character == "[":
+                typed_array_match = TYPED_ARRAY_PATTERN.match(text, position)
+                position = typed_array_match.end() if typed_array_match else position + 1
+                position = skip_whitespace(text, position)
+                if text[position] == "]":
+                    value = []
+                    position += 1
+                else:
+                    stack.append([[], None])
+                    continue
+            else:
+                value, position = read_scalar(text, position)
+
+            # Store the finished value in its container, and finish any containers which close after it
+            while True:
+                if not stack:
+                    return value, position
+
+                container, key = stack[-1]
+                if isinstance(container, dict):
+                    container[key] = value
+                else:
+                    container.append(value)
+
+                position = skip_whitespace(text, position)
+                character = text[position]
+
+                if character == ",":
+                    if isinstance(container, dict):
+                        key, position = read_key(text, position + 1)
+                        stack[-1][1] = key
+                    else:
+                        position += 1
+                    break
+                elif character in "}]":
+                    value = stack.pop()[0]
+                    position += 1
+                else:
+                    raise SnbtError(f"Expected ',' or a closing bracket at position {position}")
+    except IndexError:
+        raise SnbtError("Unexpected end of SNBT")
+
+
+def parse_summon_commands(text):
+    """
+    Find every block display summon command in text, such as the lines of a
+    function or a single copied command.
+
+    Returns a list of ((x, y, z), nbt) pairs, where the coordinates are the
+    strings from the command, such as "~-0.5".
+    """
+    summons = []
+    position = 0
+
+    while True:
+        match = SUMMON_PATTERN.search(text, position)
+        if not match:
+            break
+        position = match.end()
+
+        coordinates = match.groups()
+        if position < len(text) and text[position] == "{":
+            nbt, position = parse_snbt(text, position)
+        else:
+            nbt = {}
+        summons.append((coordinates, nbt))
+
+    return summons
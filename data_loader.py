@@ -1,28 +1,13 @@
-import copy
-import json
 import os
-import zipfile
 import bpy
-import io
-import tempfile
 
+from .core.data import JarData
 
-class DataLoader:
-    loaded_data = None
-    block_states_path = "assets/minecraft/blockstates"
-    block_models_path = "assets/minecraft/models/block"
-    textures_path = "assets/minecraft/textures"
-
-
-    def __init__(self):
-        self.minecraft_location = ""
-        self.loaded_data = {
-            "blockstates": {},
-            "block_models": {},
-            "item_models": {},
-        }
-        self.initialized = False
 
+class DataLoader(JarData):
+    """
+    The game data used by the add-on, which also loads textures as Blender images.
+    """
 
     def get_addon_directory(self):
         addon_directory = bpy.utils.user_resource('SCRIPTS')
@@ -32,59 +17,27 @@ class DataLoader:
         return addon_directory
 
 
-    def load_json_directory(self, jar, path, data_dict):
-        all_files = jar.namelist()
-        target_json_files = [file for file in all_files if file.startswith(path)]
-        for file_name in target_json_files:
-            json_content = jar.read(file_name)
-            try:
-                json_content_string = json_content.decode('utf-8')
-                json_data = json.loads(json_content_string)
-                identifier = os.path.splitext(os.path.basename(file_name))[0]
-                data_dict[identifier] = json_data
-            except UnicodeDecodeError:
-                print(f"Unable to decode {file_name} as UTF-8. It may be binary data.")
-            except json.JSONDecodeError:
-                print(f"Unable to parse {file_name} as JSON.")
-
-
-    def initialize_data(self, minecraft_location):
-        self.minecraft_location = minecraft_location
-        try:
-            with zipfile.ZipFile(minecraft_location, 'r') as jar:
-                self.load_json_directory(jar, self.block_states_path, self.loaded_data["blockstates"])
-                self.load_json_directory(jar, self.block_models_path, self.loaded_data["block_models"])
-                self.initialized = True
-        except Exception as e:
-            print("Error when loading data:", e)
+    def get_library_directory(self):
+        library_directory = bpy.utils.user_resource('SCRIPTS')
+        library_directory = os.path.join(library_directory, "addons", "Minecraft-Block-Display-Exporter", "libraries")
+        if not os.path.exists(library_directory):
+            os.makedirs(library_directory)
+        return library_directory
+
 
+    def get_preview_directory(self):
+        preview_directory = bpy.utils.user_resource('SCRIPTS')
+        preview_directory = os.path.join(preview_directory, "addons", "Minecraft-Block-Display-Exporter", "previews")
+        if not os.path.exists(preview_directory):
+            os.makedirs(preview_directory)
+        return preview_directory
 
-    def get_data(self, data_dict, identifier):
-        if data_dict in self.loaded_data:
-            return copy.deepcopy(self.loaded_data[data_dict].get(identifier))
-        else:
-            print(f"Error: {data_dict} not found in loaded data.")
-            return None
-        
 
     def load_image(self, name):
         if name in [i.name for i in bpy.data.images]:
             return bpy.data.images[name]
         try:
-            with zipfile.ZipFile(self.minecraft_location, 'r') as jar:
-                all_files = jar.namelist()
-
-                split_name = name.split('/')
-                target_directory = split_name[0]
-                target_basename = split_name[1]
-                directory_path = self.textures_path + "/" + target_directory
-
-                target_image_files = [file for file in all_files if file.startswith(directory_path)]
-
-                for file_name in target_image_files:
-                    basename = os.path.splitext(os.path.basename(file_name))[0]
-                    if basename == target_basename:
-                        image_data = jar.read(file_name)
+            image_data = self.read_texture(name)
         except Exception as e:
             print(f"Error occured when loading image {name} from {self.minecraft_location}:", e)
             return
@@ -100,8 +53,5 @@ class DataLoader:
 
         return image
 
-        
-    def is_initialized(self):
-        return self.initialized
-        
-data_loader = DataLoader()
\ No newline at end of file
+
+data_loader = DataLoader()
@@ -0,0 +1,364 @@
+"""
+Recreating block objects in Blender from existing commands, structure files and schematics.
+"""
+import math
+import bpy
+from mathutils import Vector, Matrix
+
+from .data_loader import data_loader
+from .core.coordinates import ORIGIN_LOCATION
+from .core import coordinates as core_coordinates
+from .core.commands import compose_transformation
+from .core.snbt import parse_summon_commands
+from .core.nbt import read_nbt_file, read_varints, NbtError
+from .core.export import is_enclosed
+from .core.blockstates import build_properties_dict, get_default_properties, get_outer_model_data
+from .properties_util import (
+    update_block_properties,
+    change_block_visuals,
+    refresh_face_culling_around,
+    is_opaque_full_cube,
+)
+
+# Block types in structures which are not shown
+EMPTY_BLOCK_TYPES = ["air", "cave_air", "void_air", "structure_void"]
+
+
+def revert_coordinates(minecraft_matrix):
+    """
+    Convert Minecraft coordinates to a Blender Matrix
+    """
+    return Matrix(core_coordinates.revert_coordinates(minecraft_matrix))
+
+
+def get_rotation_quaternion(rotation):
+    """
+    Return a rotation given either as a quaternion or as an axis and angle
+    as an [x, y, z, w] quaternion
+    """
+    if isinstance(rotation, dict):
+        angle = float(rotation.get("angle", 0))
+        axis = [float(value) for value in rotation.get("axis", [0, 0, 1])]
+        norm = math.sqrt(sum(value * value for value in axis)) or 1
+        s = math.sin(angle / 2) / norm
+        return [axis[0] * s, axis[1] * s, axis[2] * s, math.cos(angle / 2)]
+    return [float(value) for value in rotation]
+
+
+def get_display_transformation(nbt):
+    """
+    Return the transformation of a block display as a 4x4 Matrix in Minecraft
+    coordinates, from either the 16 float or the decomposed form
+    """
+    transformation = nbt.get("transformation")
+
+    if isinstance(transformation, list) and len(transformation) == 16:
+        return Matrix([transformation[row * 4:row * 4 + 4] for row in range(4)])
+
+    if isinstance(transformation, dict):
+        decomposed = {key: [float(value) for value in transformation[key]] for key in ("translation", "scale") if key in transformation}
+        for key in ("left_rotation", "right_rotation"):
+            if key in transformation:
+                decomposed[key] = get_rotation_quaternion(transformation[key])
+        return Matrix(compose_transformation(decomposed))
+
+    return Matrix.Identity(4)
+
+
+def get_block_type(name):
+    """
+    Return the block type for a block state name, such as stone for minecraft:stone
+    """
+    return name.removeprefix("minecraft:")
+
+
+def get_summon_position(coordinates):
+    """
+    Return the position of a summon command, and whether it is relative.
+    Local coordinates (^) are treated as relative coordinates.
+    """
+    position = []
+    is_relative = True
+    for coordinate in coordinates:
+        if coordinate[0] in "~^":
+            position.append(float(coordinate[1:] or 0))
+        else:
+            position.append(float(coordinate))
+            is_relative = False
+    return Vector(position), is_relative
+
+
+def collect_block_displays(nbt, offset_matrix, blocks):
+    """
+    Add the block display nbt and all of its passengers to blocks, as
+    (block_type, properties, minecraft_matrix) tuples
+    """
+    stack = [nbt]
+    while stack:
+        entity = stack.pop()
+        if not isinstance(entity, dict):
+            continue
+
+        block_state = entity.get("block_state")
+        entity_id = entity.get("id", "block_display")
+        if isinstance(block_state, dict) and "Name" in block_state and get_block_type(entity_id) == "block_display":
+            properties = {name: str(value) for name, value in block_state.get("Properties", {}).items()}
+            blocks.append((get_block_type(block_state["Name"]), properties, offset_matrix @ get_display_transformation(entity)))
+
+        # Passengers are pushed in reverse, so they are collected in their original order
+        stack.extend(reversed(entity.get("Passengers", [])))
+
+
+def read_block_displays(text):
+    """
+    Return every block display summoned by the commands in text as
+    (block_type, properties, blender_matrix) tuples.
+
+    Relative commands are placed the way they would be from a command block
+    at the Blender origin. Absolute commands are placed relative to the first
+    absolute command, which is placed like a generated command.
+    """
+    origin_location = Vector(ORIGIN_LOCATION)
+    first_absolute_position = None
+
+    minecraft_blocks = []
+    for coordinates, nbt in parse_summon_commands(text):
+        position, is_relative = get_summon_position(coordinates)
+        if is_relative:
+            offset = position - origin_location
+        else:
+            if first_absolute_position is None:
+                first_absolute_position = position
+            offset = position - first_absolute_position
+
+        collect_block_displays(nbt, Matrix.Translation(offset), minecraft_blocks)
+
+    return [(block_type, properties, revert_coordinates(matrix)) for block_type, properties, matrix in minecraft_blocks]
+
+
+def get_block_state_data(block_type, properties):
+    """
+    Return the available properties, the selected properties and the outer
+    model data of a block state, or None if it is not in the loaded data.
+
+    Properties which are not given keep their default, and the selected
+    properties are in the order the editor uses.
+    """
+    blockstate = data_loader.get_data("blockstates", block_type)
+    if blockstate is None:
+        return None
+
+    block_properties = build_properties_dict(blockstate)
+    selected_block_properties = get_default_properties(block_properties)
+    for name, value in properties.items():
+        if name in selected_block_properties:
+            selected_block_properties[name] = value
+
+    outer_model_data = get_outer_model_data(blockstate, selected_block_properties)
+    if not outer_model_data:
+        return None
+
+    return block_properties, selected_block_properties, outer_model_data
+
+
+def create_block_object(name, block_type, block_state_data, collection, mesh=None, use_library=True, model_choice=0):
+    """
+    Create a block object linked to collection, with the block state from
+    get_block_state_data and the random models picked by model_choice.
+
+    If mesh is given it is shared, otherwise the mesh of the block state is
+    built, without any culled faces, or linked from the asset library if
+    use_library is set.
+    """
+    block_properties, selected_block_properties, outer_model_data = block_state_data
+
+    obj = bpy.data.objects.new(name, mesh or bpy.data.meshes.new(name))
+    collection.objects.link(obj)
+    obj.mcbde["block_type"] = block_type
+    obj.mcbde["model_choice"] = model_choice
+    update_block_properties(obj, selected_block_properties, block_properties)
+
+    if mesh is None:
+        placeholder_mesh = obj.data
+        change_block_visuals(obj, outer_model_data, culled_faces=frozenset(), use_library=use_library)
+        if placeholder_mesh != obj.data and placeholder_mesh.users == 0:
+            bpy.data.meshes.remove(placeholder_mesh)
+
+    return obj
+
+
+def create_block_objects(blocks, collection):
+    """
+    Create an object for each (block_type, properties, blender_matrix) in blocks,
+    linked to collection. Blocks may also have a fourth item, their model_choice.
+
+    The mesh of each block state and model choice is built once and shared by
+    all blocks of that state. Blocks of types which are not in the loaded data
+    are skipped.
+
+    Returns the created objects and the number of skipped blocks.
+    """
+    blocks_by_state = {}
+    for block_type, properties, matrix, *model_choice in blocks:
+        state_key = (block_type, tuple(sorted(properties.items())), model_choice[0] if model_choice else 0)
+        blocks_by_state.setdefault(state_key, []).append(matrix)
+
+    objects = []
+    skipped = 0
+    for (block_type, properties, model_choice), matrices in blocks_by_state.items():
+        block_state_data = get_block_state_data(block_type, dict(properties))
+        if block_state_data is None:
+            skipped += len(matrices)
+            continue
+
+        mesh = None
+        for matrix in matrices:
+            obj = create_block_object(block_type, block_type, block_state_data, collection, mesh, model_choice=model_choice)
+            obj.matrix_world = matrix
+            mesh = obj.data
+            objects.append(obj)
+
+    if bpy.context.scene.mcbde.face_culling:
+        refresh_face_culling_around(objects)
+
+    return objects, skipped
+
+
+def import_commands(text, collection):
+    """
+    Create objects for every block display summoned by the commands in text.
+
+    Returns the created objects and the number of skipped blocks.
+    """
+    return create_block_objects(read_block_displays(text), collection)
+
+
+def parse_block_state_string(block_state):
+    """
+    Return the block type and properties of a block state string.
+
+    Example:
+    minecraft:oak_log[axis=y] gives ('oak_log', {'axis': 'y'})
+    """
+    name, _, property_string = block_state.partition("[")
+    properties = {}
+    for key_value in property_string.rstrip("]").split(","):
+        if "=" in key_value:
+            key, value = key_value.split("=", 1)
+            properties[key.strip()] = value.strip()
+    return get_block_type(name), properties
+
+
+def get_structure_tag(compound, name, tag_type):
+    """
+    Return the tag called name of the compound, raising an NbtError if it is
+    missing or of another type
+    """
+    value = compound.get(name) if isinstance(compound, dict) else None
+    if not isinstance(value, tag_type):
+        raise NbtError(f"The structure has no valid {name} tag")
+    return value
+
+
+def read_structure_cells(root):
+    """
+    Return the blocks of a structure file or schematic as a list of
+    (block_type, properties, (x, y, z)) tuples, in Minecraft coordinates.
+
+    Raises an NbtError if the structure is not laid out as expected.
+    """
+    if "Schematic" in root:
+        # Sponge schematics from version 3 nest everything in a Schematic compound
+        root = get_structure_tag(root, "Schematic", dict)
+
+    if "blocks" in root:
+        # Vanilla structure file, with a palette of block states and a list of positioned palette indices
+        if "palettes" in root:
+            palettes = get_structure_tag(root, "palettes", list)
+            if not palettes or not isinstance(palettes[0], list):
+                raise NbtError("The structure has no valid palettes tag")
+            palette = palettes[0]
+        else:
+            palette = get_structure_tag(root, "palette", list)
+        states = []
+        for entry in palette:
+            block_type = get_block_type(get_structure_tag(entry, "Name", str))
+            properties = get_structure_tag(entry, "Properties", dict) if "Properties" in entry else {}
+            states.append((block_type, {name: str(value) for name, value in properties.items()}))
+
+        cells = []
+        for block in get_structure_tag(root, "blocks", list):
+            index = get_structure_tag(block, "state", int)
+            position = get_structure_tag(block, "pos", list)
+            if not 0 <= index < len(states):
+                raise NbtError(f"Palette index {index} is out of range")
+            if len(position) != 3 or not all(isinstance(value, int) for value in position):
+                raise NbtError("The structure has no valid pos tag")
+            cells.append(states[index] + (tuple(position),))
+        return cells
+
+    if "Materials" in root or isinstance(root.get("Blocks"), bytes):
+        # MCEdit schematics store numeric block ids from before 1.13 in byte arrays
+        raise NbtError("Legacy .schematic files are not supported, save the structure as a Sponge schematic or structure file")
+
+    if "Width" in root:
+        # Sponge schematic, with a palette from block state strings to indices and varint encoded block data
+        if "Blocks" in root:
+            blocks = get_structure_tag(root, "Blocks", dict)
+            palette, block_data = get_structure_tag(blocks, "Palette", dict), get_structure_tag(blocks, "Data", bytes)
+        else:
+            palette, block_data = get_structure_tag(root, "Palette", dict), get_structure_tag(root, "BlockData", bytes)
+        if not all(isinstance(index, int) for index in palette.values()):
+            raise NbtError("The structure has no valid Palette tag")
+        states = {index: parse_block_state_string(block_state) for block_state, index in palette.items()}
+
+        width, height, length = (get_structure_tag(root, name, int) for name in ["Width", "Height", "Length"])
+        indices = read_varints(block_data)
+        if len(indices) != width * height * length:
+            raise NbtError(f"The structure has {len(indices)} blocks instead of {width} x {height} x {length}")
+
+        cells = []
+        for i, index in enumerate(indices):
+            if index not in states:
+                raise NbtError(f"Palette index {index} is out of range")
+            y, remainder = divmod(i, width * length)
+            z, x = divmod(remainder, width)
+            cells.append(states[index] + ((x, y, z),))
+        return cells
+
+    raise NbtError("Not a structure file or schematic")
+
+
+def read_structure_blocks(path, skip_hidden=True):
+    """
+    Return the blocks of the structure file or schematic at path as
+    (block_type, properties, blender_matrix) tuples.
+
+    If skip_hidden is set, blocks enclosed on all sides by opaque full
+    cubes are left out.
+    """
+    _, root = read_nbt_file(path)
+    cells = [cell for cell in read_structure_cells(root) if cell[0] not in EMPTY_BLOCK_TYPES]
+
+    if skip_hidden:
+        opaque_states = {}
+        occupied_cells = set()
+        for block_type, properties, position in cells:
+            state_key = (block_type, tuple(properties.items()))
+            if state_key not in opaque_states:
+                opaque_states[state_key] = is_opaque_full_cube(block_type, properties)
+            if opaque_states[state_key]:
+                occupied_cells.add(position)
+        cells = [cell for cell in cells if not is_enclosed(cell[2], occupied_cells)]
+
+    # The block at (x, y, z) in Minecraft is at (x, -z, y) in Blender
+    return [(block_type, properties, Matrix.Translation((x, -z, y))) for block_type, properties, (x, y, z) in cells]
+
+
+def import_structure(path, collection, skip_hidden=True):
+    """
+    Create objects for the blocks of the structure file or schematic at path.
+
+    Returns the created objects and the number of skipped blocks.
+    """
+    return create_block_objects(read_structure_blocks(path, skip_hidden), collection)
@@ -0,0 +1,346 @@
+"""
+Storing large builds as the points of a single instancer object, instead of
+one object for each block.
+
+Each point of the instancer is a block. Its state is an index into the list
+of block states and model choices stored on the instancer, and its rotation and scale are
+point attributes. A geometry nodes modifier instances the mesh of each state
+on the points, picking from a collection of prototype objects whose names
+sort in state order.
+"""
+import json
+import numpy as np
+import bpy
+from mathutils import Matrix
+
+from .import_util import get_block_state_data, create_block_object, create_block_objects
+from .properties_util import get_selected_properties
+
+STATE_ATTRIBUTE = "mcbde_state"
+ROTATION_ATTRIBUTE = "mcbde_rotation"
+SCALE_ATTRIBUTE = "mcbde_scale"
+
+# Custom properties of the instancer object
+STATES_PROPERTY = "mcbde_states"
+PROTOTYPES_PROPERTY = "mcbde_prototypes"
+
+NODE_GROUP_NAME = "MCBDE Instances"
+MODIFIER_NAME = "MCBDE Instances"
+DEFAULT_INSTANCER_NAME = "MCBDE Blocks"
+
+# Blender (x, y, z) is Minecraft (x, z, -y)
+BLENDER_TO_MINECRAFT = np.array([[1, 0, 0], [0, 0, 1], [0, -1, 0]], dtype=np.float64)
+
+
+def is_instancer(obj):
+    return obj.type == 'MESH' and STATES_PROPERTY in obj
+
+
+def get_instancer_states(instancer):
+    """
+    Return the list of (block_type, properties, model_choice) of the instancer,
+    indexed by state
+    """
+    # Instancers from before model choices were kept only have the block states
+    return [(state[0], state[1], state[2] if len(state) > 2 else 0) for state in json.loads(instancer[STATES_PROPERTY])]
+
+
+def get_prototype_name(state_index, block_type):
+    # Collection Info sorts the children by name, so the names start with the zero padded index
+    return f"{state_index:05d} {block_type}"
+
+
+def get_instances_node_group():
+    """
+    Return the geometry node group which instances the prototypes on the
+    points, creating it if needed
+    """
+    node_group = bpy.data.node_groups.get(NODE_GROUP_NAME)
+    if node_group is not None:
+        return node_group
+
+    node_group = bpy.data.node_groups.new(NODE_GROUP_NAME, 'GeometryNodeTree')
+    node_group.interface.new_socket("Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
+    node_group.interface.new_socket("Prototypes", in_out='INPUT', socket_type='NodeSocketCollection')
+    node_group.interface.new_socket("Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+
+    nodes = node_group.nodes
+    links = node_group.links
+
+    group_input = nodes.new("NodeGroupInput")
+    group_output = nodes.new("NodeGroupOutput")
+
+    collection_info = nodes.new("GeometryNodeCollectionInfo")
+    collection_info.transform_space = 'ORIGINAL'
+    collection_info.inputs["Separate Children"].default_value = True
+    collection_info.inputs["Reset Children"].default_value = True
+
+    instance_on_points = nodes.new("GeometryNodeInstanceOnPoints")
+    instance_on_points.inputs["Pick Instance"].default_value = True
+
+    named_attributes = {}
+    for name, data_type in [(STATE_ATTRIBUTE, 'INT'), (ROTATION_ATTRIBUTE, 'FLOAT_VECTOR'), (SCALE_ATTRIBUTE, 'FLOAT_VECTOR')]:
+        named_attribute = nodes.new("GeometryNodeInputNamedAttribute")
+        named_attribute.data_type = data_type
+        named_attribute.inputs["Name"].default_value = name
+        named_attributes[name] = named_attribute
+
+    links.new(group_input.outputs["Prototypes"], collection_info.inputs["Collection"])
+    links.new(group_input.outputs["Geometry"], instance_on_points.inputs["Points"])
+    links.new(collection_info.outputs[0], instance_on_points.inputs["Instance"])
+    links.new(named_attributes[STATE_ATTRIBUTE].outputs["Attribute"], instance_on_points.inputs["Instance Index"])
+    links.new(named_attributes[ROTATION_ATTRIBUTE].outputs["Attribute"], instance_on_points.inputs["Rotation"])
+    links.new(named_attributes[SCALE_ATTRIBUTE].outputs["Attribute"], instance_on_points.inputs["Scale"])
+    links.new(instance_on_points.outputs["Instances"], group_output.inputs["Geometry"])
+
+    return node_group
+
+
+def create_instancer(name, collection):
+    """
+    Create an empty instancer object with its prototype collection and
+    geometry nodes modifier, linked to collection
+    """
+    instancer = bpy.data.objects.new(name, bpy.data.meshes.new(name))
+    collection.objects.link(instancer)
+    instancer[STATES_PROPERTY] = "[]"
+
+    # The prototypes are not linked to the scene, so that they are not exported
+    prototypes = bpy.data.collections.new(instancer.name + " Prototypes")
+    instancer[PROTOTYPES_PROPERTY] = prototypes
+
+    node_group = get_instances_node_group()
+    modifier = instancer.modifiers.new(MODIFIER_NAME, 'NODES')
+    modifier.node_group = node_group
+    modifier[node_group.interface.items_tree["Prototypes"].identifier] = prototypes
+
+    return instancer
+
+
+def get_attribute_array(mesh, name, components):
+    attribute = mesh.attributes.get(name)
+    values = np.zeros(len(mesh.vertices) * components, dtype=np.float32 if components > 1 else np.int32)
+    if attribute is not None:
+        attribute.data.foreach_get("vector" if components > 1 else "value", values)
+    return values.reshape(-1, components) if components > 1 else values
+
+
+def get_instance_arrays(instancer):
+    """
+    Return the state indices, locations, rotations and scales of the points of the instancer
+    """
+    mesh = instancer.data
+    locations = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", locations)
+    return (
+        get_attribute_array(mesh, STATE_ATTRIBUTE, 1),
+        locations.reshape(-1, 3),
+        get_attribute_array(mesh, ROTATION_ATTRIBUTE, 3),
+        get_attribute_array(mesh, SCALE_ATTRIBUTE, 3),
+    )
+
+
+def set_instance_arrays(instancer, states, locations, rotations, scales):
+    """
+    Replace the points of the instancer
+    """
+    mesh = instancer.data
+    mesh.clear_geometry()
+    mesh.vertices.add(len(states))
+    mesh.vertices.foreach_set("co", np.asarray(locations, dtype=np.float32).ravel())
+
+    for name, data_type, values in [
+        (STATE_ATTRIBUTE, 'INT', np.asarray(states, dtype=np.int32)),
+        (ROTATION_ATTRIBUTE, 'FLOAT_VECTOR', np.asarray(rotations, dtype=np.float32).ravel()),
+        (SCALE_ATTRIBUTE, 'FLOAT_VECTOR', np.asarray(scales, dtype=np.float32).ravel()),
+    ]:
+        attribute = mesh.attributes.get(name) or mesh.attributes.new(name, data_type, 'POINT')
+        attribute.data.foreach_set("value" if data_type == 'INT' else "vector", values)
+
+    mesh.update()
+
+
+def get_instance_matrices(instancer):
+    """
+    Return the state indices of the points of the instancer, and their world
+    matrices as an (n, 4, 4) array
+    """
+    states, locations, rotations, scales = get_instance_arrays(instancer)
+
+    # Rotations are XYZ Euler angles, applied as Z @ Y @ X
+    cos = np.cos(rotations.astype(np.float64))
+    sin = np.sin(rotations.astype(np.float64))
+    count = len(states)
+    rotation_x = np.zeros((count, 3, 3))
+    rotation_x[:, 0, 0] = 1
+    rotation_x[:, 1, 1], rotation_x[:, 1, 2] = cos[:, 0], -sin[:, 0]
+    rotation_x[:, 2, 1], rotation_x[:, 2, 2] = sin[:, 0], cos[:, 0]
+    rotation_y = np.zeros((count, 3, 3))
+    rotation_y[:, 1, 1] = 1
+    rotation_y[:, 0, 0], rotation_y[:, 0, 2] = cos[:, 1], sin[:, 1]
+    rotation_y[:, 2, 0], rotation_y[:, 2, 2] = -sin[:, 1], cos[:, 1]
+    rotation_z = np.zeros((count, 3, 3))
+    rotation_z[:, 2, 2] = 1
+    rotation_z[:, 0, 0], rotation_z[:, 0, 1] = cos[:, 2], -sin[:, 2]
+    rotation_z[:, 1, 0], rotation_z[:, 1, 1] = sin[:, 2], cos[:, 2]
+
+    matrices = np.zeros((count, 4, 4))
+    matrices[:, :3, :3] = rotation_z @ rotation_y @ rotation_x * scales.astype(np.float64)[:, None, :]
+    matrices[:, :3, 3] = locations
+    matrices[:, 3, 3] = 1
+
+    return states, np.array(instancer.matrix_world, dtype=np.float64) @ matrices
+
+
+def convert_matrices_coordinates(matrices):
+    """
+    Convert an (n, 4, 4) array of Blender matrices to Minecraft coordinates,
+    the same way as convert_coordinates
+    """
+    converted = np.zeros_like(matrices)
+    converted[:, :3, :3] = BLENDER_TO_MINECRAFT @ matrices[:, :3, :3] @ BLENDER_TO_MINECRAFT.T
+    converted[:, :3, 3] = matrices[:, :3, 3] @ BLENDER_TO_MINECRAFT.T
+    converted[:, 1, 3] -= 1
+    converted[:, 3, 3] = 1
+    return converted
+
+
+def get_instance_passengers(instancer):
+    """
+    Return the passengers for the points of the instancer, in the same form as
+    get_passengers in operators
+    """
+    states = get_instancer_states(instancer)
+    state_indices, matrices = get_instance_matrices(instancer)
+    transformations = convert_matrices_coordinates(matrices).tolist()
+
+    passengers = []
+    for index, (state_index, transformation) in enumerate(zip(state_indices.tolist(), transformations)):
+        if not 0 <= state_index < len(states):
+            continue
+        block_type, properties, _ = states[state_index]
+        name = f"{instancer.name}.{index}"
+        passengers.append({
+            "name": name,
+            "block_type": block_type,
+            "properties": dict(properties),
+            "transformation": transformation,
+        })
+    return passengers
+
+
+def add_blocks_to_instancer(instancer, blocks):
+    """
+    Add each (block_type, properties, blender_matrix, model_choice) in blocks
+    as a point of the instancer, creating prototypes for new block states and
+    model choices.
+
+    Shear cannot be represented by a point, so it is lost.
+
+    Returns the indices of the blocks which were added, blocks whose type is
+    not in the loaded data are skipped.
+    """
+    states = get_instancer_states(instancer)
+    state_indices = {
+        (block_type, tuple(properties.items()), model_choice): index
+        for index, (block_type, properties, model_choice) in enumerate(states)
+    }
+    prototypes = instancer[PROTOTYPES_PROPERTY]
+    inverse_matrix = instancer.matrix_world.inverted()
+
+    new_states = []
+    new_locations = []
+    new_rotations = []
+    new_scales = []
+    added = []
+    for block_index, (block_type, properties, matrix, model_choice) in enumerate(blocks):
+        state_key = (block_type, tuple(properties.items()), model_choice)
+        if state_key not in state_indices:
+            block_state_data = get_block_state_data(block_type, properties)
+            if block_state_data is None:
+                continue
+            # The state is stored with all of its properties, in the order the editor uses
+            selected_block_properties = block_state_data[1]
+            full_state_key = (block_type, tuple(selected_block_properties.items()), model_choice)
+            if full_state_key not in state_indices:
+                state_indices[full_state_key] = len(states)
+                states.append((block_type, selected_block_properties, model_choice))
+                create_block_object(
+                    get_prototype_name(len(states) - 1, block_type), block_type, block_state_data, prototypes,
+                    model_choice=model_choice
+                )
+            state_indices[state_key] = state_indices[full_state_key]
+
+        location, rotation, scale = (inverse_matrix @ matrix).decompose()
+        new_states.append(state_indices[state_key])
+        new_locations.append(location)
+        new_rotations.append(rotation.to_euler('XYZ'))
+        new_scales.append(scale)
+        added.append(block_index)
+
+    instancer[STATES_PROPERTY] = json.dumps(states)
+
+    state_array, locations, rotations, scales = get_instance_arrays(instancer)
+    set_instance_arrays(
+        instancer,
+        np.concatenate([state_array, np.array(new_states, dtype=np.int32)]),
+        np.concatenate([locations, np.array(new_locations, dtype=np.float32).reshape(-1, 3)]),
+        np.concatenate([rotations, np.array(new_rotations, dtype=np.float32).reshape(-1, 3)]),
+        np.concatenate([scales, np.array(new_scales, dtype=np.float32).reshape(-1, 3)]),
+    )
+    return added
+
+
+def convert_objects_to_instances(objects, collection, instancer=None):
+    """
+    Move the block objects into an instancer, creating one if instancer is
+    None, and delete the objects which were added to it. Blocks whose type is
+    not in the loaded data are kept as objects.
+
+    Returns the instancer, the number of blocks which were converted and the
+    number of blocks which were skipped.
+    """
+    block_objects = [
+        obj for obj in objects
+        if obj.type == 'MESH' and obj.mcbde.block_type not in [""] and not is_instancer(obj)
+    ]
+    blocks = [
+        (obj.mcbde.block_type, get_selected_properties(obj), obj.matrix_world.copy(), obj.mcbde.model_choice)
+        for obj in block_objects
+    ]
+    if instancer is None:
+        instancer = create_instancer(DEFAULT_INSTANCER_NAME, collection)
+
+    added = add_blocks_to_instancer(instancer, blocks)
+
+    for block_index in added:
+        bpy.data.objects.remove(block_objects[block_index])
+
+    return instancer, len(added), len(blocks) - len(added)
+
+
+def convert_instances_to_objects(instancer, collection):
+    """
+    Replace the instancer with one block object for each of its points.
+
+    Returns the created objects.
+    """
+    states = get_instancer_states(instancer)
+    state_indices, matrices = get_instance_matrices(instancer)
+
+    blocks = []
+    for state_index, matrix in zip(state_indices.tolist(), matrices.tolist()):
+        if 0 <= state_index < len(states):
+            block_type, properties, model_choice = states[state_index]
+            blocks.append((block_type, properties, Matrix(matrix), model_choice))
+
+    objects, _ = create_block_objects(blocks, collection)
+
+    prototypes = instancer.get(PROTOTYPES_PROPERTY)
+    if prototypes is not None:
+        for prototype in list(prototypes.objects):
+            bpy.data.objects.remove(prototype)
+        bpy.data.collections.remove(prototypes)
+    bpy.data.objects.remove(instancer)
+
+    return objects
@@ -1,7 +1,12 @@
 from bpy.types import Panel, Object
 from .data_loader import data_loader
+from .profiling import profiler
+from .statistics_util import get_statistics, get_budget_warnings, get_skipped_optimizations
 import bpy
 
+# The number of slowest stages shown in the panel while profiling
+PANEL_PROFILE_STAGES = 5
+
 class McbdePanel(Panel):
     """
     Panel for the MCBDE addon.
@@ -26,12 +31,21 @@ class McbdePanel(Panel):
         if not data_loader.is_initialized():
             return
 
+        # Asset library section
+        row = layout.row()
+        row.prop(context.scene.mcbde, "library_block_types")
+        row.prop(context.scene.mcbde, "library_max_states")
+        layout.operator("object.bake_library_button")
+
         # Selection section
         layout.label(text="Selected Blocks:")
         col = layout.column()
 
         if active_object and active_object.type == 'MESH' and active_object.mcbde:
             col.prop(active_object.mcbde, "block_type")
+            row = col.row()
+            row.template_icon_view(context.scene.mcbde, "block_picker", show_labels=True, scale_popup=4.0)
+            row.prop(context.scene.mcbde, "block_search", text="", icon='VIEWZOOM')
 
             # Adding the block properties
             if "block_properties" in active_object.mcbde:
@@ -39,16 +53,146 @@ class McbdePanel(Panel):
                     row = layout.row()
                     row.label(text=property.name)
                     row.prop(property, "value")
+
+            if active_object.mcbde.block_type:
+                row = layout.row()
+                row.operator("object.select_block_type_button")
+                row.operator("object.select_block_type_button", text="Select Same State").same_state = True
+                row = layout.row()
+                row.prop(context.scene.mcbde, "replace_block_type")
+                row.operator("object.replace_block_type_button")
         else:
             layout.label(text="Select a mesh object with MCBDE properties.")
 
+        # Viewport section
+        layout.label(text="Viewport:")
+        row = layout.row()
+        row.prop(context.scene.mcbde, "face_culling")
+        if context.scene.mcbde.face_culling:
+            row.operator("object.refresh_face_culling_button", text="", icon='FILE_REFRESH')
+
+        row = layout.row()
+        row.prop(context.scene.mcbde, "auto_connect")
+        row.operator("object.connect_blocks_button")
+
+        row = layout.row()
+        row.prop(context.scene.mcbde, "random_model_seed")
+        row.operator("object.randomize_models_button")
+        row.operator("object.randomize_models_button", text="", icon='LOOP_BACK').reset = True
+        layout.label(text="Random models are only shown in Blender, not in game", icon='INFO')
+
+        row = layout.row()
+        row.operator("object.convert_to_instances_button")
+        row.operator("object.convert_to_objects_button")
+
+        # Statistics section
+        layout.label(text="Statistics:")
+        col = layout.column()
+        col.prop(context.scene.mcbde, "show_statistics")
+        if context.scene.mcbde.show_statistics:
+            statistics = get_statistics(context.scene)
+            col.label(text=f"Entities: {statistics['entities']}")
+            col.label(text=f"Block states: {statistics['block_states']}")
+            col.label(text=f"Quads: {statistics['quads']}")
+            col.label(text=f"Command length: about {statistics['command_length']}")
+            skipped_optimizations = get_skipped_optimizations(context.scene.mcbde)
+            if skipped_optimizations:
+                col.label(text=f"Counted before {', '.join(skipped_optimizations)}", icon='INFO')
+            for warning in get_budget_warnings(statistics, context.scene.mcbde):
+                col.label(text=warning, icon='ERROR')
+            row = col.row()
+            row.prop(context.scene.mcbde, "budget_entities")
+            row.prop(context.scene.mcbde, "budget_quads")
+            col.prop(context.scene.mcbde, "budget_command_length")
+
         # Generation section
         layout.label(text="Generation:")
         col = layout.column()
 
-        col.operator("object.generate_button")
+        row = col.row()
+        row.operator("object.generate_button")
+        if context.scene.mcbde.entity_tag and context.scene.mcbde.export_state:
+            row.operator("object.delta_update_button")
+        col.prop(context.scene.mcbde, "compact_output")
+        if context.scene.mcbde.compact_output:
+            col.prop(context.scene.mcbde, "compact_tolerance")
+            col.prop(context.scene.mcbde, "use_decomposed_transformation")
+        col.prop(context.scene.mcbde, "merge_blocks")
+        if context.scene.mcbde.merge_blocks:
+            col.prop(context.scene.mcbde, "merge_block_types")
+        col.prop(context.scene.mcbde, "cull_hidden_blocks")
+        col.prop(context.scene.mcbde, "remove_duplicates")
+        col.prop(context.scene.mcbde, "culling_boxes")
+        col.prop(context.scene.mcbde, "lod_tiers")
+        if context.scene.mcbde.lod_tiers:
+            col.prop(context.scene.mcbde, "lod_tier_ranges")
+        col.prop(context.scene.mcbde, "chunked_export")
+        if context.scene.mcbde.chunked_export:
+            col.prop(context.scene.mcbde, "chunk_size")
+        col.prop(context.scene.mcbde, "entity_tag")
         layout.prop(context.scene.mcbde, "command")
 
+        # Server section
+        layout.label(text="Server:")
+        col = layout.column()
+        row = col.row()
+        row.prop(context.scene.mcbde, "rcon_host")
+        row.prop(context.scene.mcbde, "rcon_port")
+        col.prop(context.scene.mcbde, "rcon_password")
+        col.prop(context.scene.mcbde, "rcon_position")
+        row = col.row()
+        row.operator("object.sync_button")
+        row.prop(context.scene.mcbde, "live_sync")
+
+        # Import section
+        layout.label(text="Import:")
+        row = layout.row()
+        row.operator("object.import_command_button", text="Import File")
+        row.operator("object.import_command_button", text="Paste Command").from_clipboard = True
+        layout.operator("object.import_structure_button")
+
+        # Voxelize section
+        layout.label(text="Voxelize:")
+        col = layout.column()
+        row = col.row()
+        row.prop(context.scene.mcbde, "voxel_size")
+        row.prop(context.scene.mcbde, "voxel_hollow")
+        col.prop(context.scene.mcbde, "voxel_block_types")
+        col.operator("object.voxelize_button")
+
+        # Data pack section, shared by animations and macro functions
+        layout.label(text="Data Pack:")
+        col = layout.column()
+        col.prop(context.scene.mcbde, "datapack_directory")
+        col.prop(context.scene.mcbde, "datapack_namespace")
+
+        # Animation section
+        layout.label(text="Animation:")
+        col = layout.column()
+        col.prop(context.scene.mcbde, "animation_name")
+        col.prop(context.scene.mcbde, "animation_tolerance")
+        col.operator("object.export_animation_button")
+
+        # Macro section
+        layout.label(text="Macro Functions:")
+        col = layout.column()
+        col.prop(context.scene.mcbde, "macro_function_name")
+        col.operator("object.export_macro_button")
+
+        # Profiling section
+        layout.label(text="Profiling:")
+        col = layout.column()
+        col.prop(context.scene.mcbde, "profiling")
+        if context.scene.mcbde.profiling:
+            row = col.row()
+            row.prop(context.scene.mcbde, "profile_next_operation")
+            row.prop(context.scene.mcbde, "profile_path", text="")
+            for stage, (calls, seconds) in profiler.get_slowest_stages(PANEL_PROFILE_STAGES):
+                col.label(text=f"{stage}: {calls} calls, {seconds * 1000:.1f} ms")
+            row = col.row()
+            row.operator("object.profile_report_button")
+            row.operator("object.reset_profile_button")
+
 
 classes = (
     McbdePanel,
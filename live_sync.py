@@ -0,0 +1,73 @@
+import bpy
+from bpy.app.handlers import persistent
+
+from .operators import sync_scene, collect_sync_results
+from .rcon import stop_senders
+
+# How often the scene is checked for changes while live sync is enabled
+LIVE_SYNC_INTERVAL = 0.2
+
+is_scene_changed = False
+
+
+def report_to_console(report_type, message):
+    print(f"MCBDE live sync {', '.join(report_type)}:", message)
+
+
+@persistent
+def live_sync_depsgraph_handler(scene, depsgraph):
+    """
+    Note that the scene changed, so that the next timer tick sends the changes
+    """
+    global is_scene_changed
+
+    if scene.mcbde.live_sync and (depsgraph.id_type_updated('OBJECT') or depsgraph.id_type_updated('MESH')):
+        is_scene_changed = True
+
+
+def live_sync_timer():
+    """
+    Send the changes to the server if the scene has changed since the last
+    check, and report the results of earlier syncs
+    """
+    global is_scene_changed
+
+    scene = bpy.context.scene
+    if scene is None or not scene.mcbde.live_sync:
+        return None
+
+    if is_scene_changed:
+        # Changes made while the last ones are being sent are kept, and sent together later
+        is_scene_changed = sync_scene(scene, report_to_console) is None
+    else:
+        collect_sync_results(scene, report_to_console)
+
+    return LIVE_SYNC_INTERVAL
+
+
+def update_live_sync(self, context):
+    """
+    Called when live sync is enabled or disabled in the scene.
+    """
+    global is_scene_changed
+
+    if self.live_sync:
+        if not self.entity_tag:
+            self.entity_tag = "mcbde"
+        # The first sync sends everything, later syncs only the changes
+        is_scene_changed = True
+        if not bpy.app.timers.is_registered(live_sync_timer):
+            bpy.app.timers.register(live_sync_timer, first_interval=LIVE_SYNC_INTERVAL)
+    elif bpy.app.timers.is_registered(live_sync_timer):
+        bpy.app.timers.unregister(live_sync_timer)
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(live_sync_depsgraph_handler)
+
+
+def unregister():
+    bpy.app.handlers.depsgraph_update_post.remove(live_sync_depsgraph_handler)
+    if bpy.app.timers.is_registered(live_sync_timer):
+        bpy.app.timers.unregister(live_sync_timer)
+    stop_senders()
@@ -1,28 +1,250 @@
+import fnmatch
+import json
+import os
 import bpy
 from bpy.types import Operator
-from mathutils import Vector, Matrix
+from bpy.props import BoolProperty, StringProperty
+from bpy_extras.io_utils import ImportHelper
 
+from . import block_definitions
 from .data_loader import data_loader
+from .asset_library import get_library_path, write_library
+from .core.commands import format_transformation, format_render_field, add_passenger_tags, check_entity_tag, get_root_tag
+from .core.animation import build_animation_functions, get_culling_box_command
+from .core.datapack import write_datapack
+from .core.macros import build_macro_functions, MACRO_PACK_FORMAT
+from .core.delta import build_delta_commands, build_resummon_commands, get_export_state
+from .rcon import get_sender
+from .profiling import profiler, write_report
+from .import_util import import_commands, import_structure, create_block_objects, create_block_object, get_block_state_data
+from .voxelize_util import get_voxel_blocks
+from .block_registry import block_registry, get_state_key
+from .connections_util import connect_blocks
+from .random_models_util import randomize_models
+from .instancing_util import is_instancer, get_instance_passengers, convert_objects_to_instances, convert_instances_to_objects
+from .core.snbt import SnbtError
+from .core.nbt import NbtError
+from .core import export
+from .core.export import optimize_passengers, parse_lod_tiers, assign_view_ranges
+from .core.coordinates import ORIGIN_LOCATION, convert_coordinates
+from .core.blockstates import build_properties_dict, get_block_states
+from .properties_util import set_block_type, refresh_face_culling_around, get_selected_properties, is_full_cube, is_opaque_full_cube, get_block_bounds, update_face_culling
 
+FUNCTION_TEXT_NAME = "mcbde.mcfunction"
+TICKS_PER_SECOND = 20
 
-def convert_coordinates(blender_matrix):
+
+def select_imported_objects(context, objects):
+    """
+    Make the imported or created objects the selection, with the first one active
+    """
+    for obj in context.selected_objects:
+        obj.select_set(False)
+    for obj in objects:
+        obj.select_set(True)
+    context.view_layer.objects.active = objects[0]
+
+
+def get_passengers(scene):
+    """
+    Return the data for each block (Passenger) in the scene as a list of dicts,
+    with the transformation already converted to Minecraft coordinates.
+
+    If the scene has an entity tag, each passenger is tagged with it and with
+    its own tag, so that it can be found again in game.
+
+    The points of instancer objects are read in bulk and become passengers too.
+    The block objects are found with the block registry.
+    """
+    passengers = []
+    for obj in block_registry.get_objects(scene):
+        if is_instancer(obj):
+            passengers.extend(get_instance_passengers(obj))
+        else:
+            blender_matrix = obj.matrix_world.copy()
+            passengers.append({
+                "name": obj.name,
+                "block_type": obj.mcbde.block_type,
+                "properties": get_selected_properties(obj),
+                "transformation": convert_coordinates(blender_matrix),
+            })
+    if scene.mcbde.entity_tag:
+        add_passenger_tags(passengers, scene.mcbde.entity_tag)
+    return passengers
+
+
+def get_export_passengers(scene, report):
+    """
+    Return the passengers of the scene after the optimization passes enabled
+    in the scene, reporting what each pass did.
+    """
+    scene_properties = scene.mcbde
+
+    passengers, saved = optimize_passengers(
+        get_passengers(scene),
+        is_full_cube,
+        is_opaque_full_cube,
+        remove_duplicates=scene_properties.remove_duplicates,
+        merge_block_types=scene_properties.merge_block_types if scene_properties.merge_blocks else None,
+        cull_hidden=scene_properties.cull_hidden_blocks,
+    )
+
+    if "duplicates" in saved:
+        report({'INFO'}, f"Removed {saved['duplicates']} duplicate entities")
+    if "merged" in saved:
+        report({'INFO'}, f"Merging blocks saved {saved['merged']} entities")
+    if "culled" in saved:
+        report({'INFO'}, f"Culled {saved['culled']} hidden entities")
+
+    if scene_properties.lod_tiers:
+        try:
+            tiers = parse_lod_tiers(scene_properties.lod_tier_ranges)
+        except ValueError:
+            report({'WARNING'}, "Level of detail tiers must look like 0.25:0.25, 0.6:0.5, they were not used")
+        else:
+            passengers, tier_counts = assign_view_ranges(passengers, get_block_bounds, tiers)
+            for (size, view_range), count in zip(tiers, tier_counts):
+                report({'INFO'}, f"{count} entities smaller than {size} have a view range of {view_range}")
+
+    return passengers
+
+
+def report_invalid_entity_tag(scene_properties, report):
+    """
+    Report an entity tag which cannot be used in commands, returning whether it is invalid
+    """
+    try:
+        check_entity_tag(scene_properties.entity_tag)
+    except ValueError as e:
+        report({'ERROR'}, str(e))
+        return True
+    return False
+
+
+def get_format_options(scene_properties):
+    return {
+        "compact": scene_properties.compact_output,
+        "tolerance": scene_properties.compact_tolerance,
+        "use_decomposed": scene_properties.use_decomposed_transformation,
+    }
+
+
+def get_commands(passengers, origin_location, scene_properties, compact):
+    """
+    Return the list of summon commands for the passengers, with the export
+    settings of the scene
+    """
+    format_options = get_format_options(scene_properties)
+    format_options["compact"] = compact
+    chunk_size = scene_properties.chunk_size if scene_properties.chunked_export else None
+    get_state_bounds = get_block_bounds if scene_properties.culling_boxes else None
+    return export.get_commands(passengers, origin_location, scene_properties.entity_tag, chunk_size, get_state_bounds, **format_options)
+
+
+def get_root_passengers(passengers, scene_properties):
+    """
+    Return the passengers as they are summoned on the single root entity of
+    an unchunked export, with the culling boxes of the full command
     """
-    Convert Blender coordinates to Minecraft coordinates
+    get_state_bounds = get_block_bounds if scene_properties.culling_boxes else None
+    [(_, root_passengers)] = export.get_root_entities(passengers, ORIGIN_LOCATION, scene_properties.entity_tag, None, get_state_bounds)
+    return root_passengers
+
+
+def write_function_text(name, commands):
+    """
+    Write the commands to the Blender text name as the lines of a function
+    """
+    text = bpy.data.texts.get(name)
+    if text is None:
+        text = bpy.data.texts.new(name)
+    text.clear()
+    # Commands in functions do not start with a slash
+    text.write("\n".join(command.removeprefix("/") for command in commands) + "\n")
+
+
+def remember_export_state(scene_properties, passengers):
+    """
+    Remember what was exported, so that later changes can be sent as delta updates
+    """
+    if scene_properties.entity_tag and not scene_properties.chunked_export:
+        export_state = get_export_state(get_root_passengers(passengers, scene_properties), **get_format_options(scene_properties))
+        scene_properties.export_state = json.dumps(export_state)
+
+
+def get_sync_commands(scene, synced_state, report):
+    """
+    Return the commands which bring the server up to date with the scene,
+    and the exported state after them.
+
+    These are delta updates from synced_state, the state last delivered to
+    the server. Without it, every entity with the entity tag is killed and
+    the scene is summoned again, one passenger at a time so that no command
+    is too long for RCON, which is also why chunked export is not used here.
+    """
+    scene_properties = scene.mcbde
+    root_passengers = get_root_passengers(get_export_passengers(scene, report), scene_properties)
+    format_options = get_format_options(scene_properties)
+
+    if synced_state is not None:
+        return build_delta_commands(synced_state, root_passengers, scene_properties.entity_tag, **format_options)
+
+    commands, export_state = build_resummon_commands(root_passengers, ORIGIN_LOCATION, scene_properties.entity_tag, **format_options)
+
+    # Commands sent over RCON run at the world spawn unless positioned
+    if scene_properties.rcon_position:
+        commands = [f"execute positioned {scene_properties.rcon_position} run {command}" for command in commands]
+    return commands, export_state
+
+
+def get_scene_sender(scene_properties):
+    return get_sender(scene_properties.rcon_host, scene_properties.rcon_port, scene_properties.rcon_password)
+
+
+def collect_sync_results(scene, report):
+    """
+    Report the results of earlier syncs, and keep the export state of the
+    scene in step with what the server has, for the delta update button.
+
+    Returns whether the sender is ready for the next sync.
     """
-    minecraft_matrix = Matrix((
-        ( blender_matrix[0][0],  blender_matrix[0][2], -blender_matrix[0][1],  blender_matrix[0][3]),
-        ( blender_matrix[2][0],  blender_matrix[2][2], -blender_matrix[2][1],  blender_matrix[2][3] - 1),
-        (-blender_matrix[1][0], -blender_matrix[1][2],  blender_matrix[1][1], -blender_matrix[1][3]),
-        (0, 0, 0, 1)
-    ))
-    return minecraft_matrix
+    scene_properties = scene.mcbde
+    sender = get_scene_sender(scene_properties)
+
+    for key, error in sender.get_results():
+        if error is not None:
+            report({'ERROR'}, error)
+        if key == scene_properties.entity_tag:
+            state = sender.states.get(key)
+            scene_properties.export_state = json.dumps(state) if state is not None else ""
+
+    return not sender.is_busy
+
+
+def sync_scene(scene, report):
+    """
+    Start sending the commands which bring the server up to date with the scene.
+
+    The commands are sent from a background thread. Returns the number of
+    commands, or None if the previous sync is still being sent, in which
+    case the changes should be sent again later.
+    """
+    scene_properties = scene.mcbde
+    if not collect_sync_results(scene, report):
+        return None
+
+    if report_invalid_entity_tag(scene_properties, report):
+        return 0
+    if not scene_properties.entity_tag:
+        report({'ERROR'}, "Set an entity tag to send the scene to a server, so that the blocks sent before can be replaced")
+        return 0
 
+    sender = get_scene_sender(scene_properties)
+    commands, export_state = get_sync_commands(scene, sender.states.get(scene_properties.entity_tag), report)
+    if commands:
+        sender.send(commands, scene_properties.entity_tag, export_state)
+    return len(commands)
 
-def get_property_string(obj):
-    formatted_property_pairs = [f'{property.name}:"{property.value}"' for property in obj.mcbde.block_properties]
-    property_string = ','.join(formatted_property_pairs)
-    return property_string
-        
 
 class GenerateButton(Operator):
     """
@@ -33,38 +255,631 @@ class GenerateButton(Operator):
     bl_description = "Generate command"
 
     def execute(self, context):
-        origin_location = Vector((-0.5, 0.5, -0.5))
-        origin_text = f"~{round(origin_location[0], 4)} ~{round(origin_location[1], 4)} ~{round(origin_location[2], 4)}"
-                
-        command_string = "/summon block_display " + origin_text + " {Passengers: ["
-
-        # Getting the string for each block (Passenger) in the command
-        for obj in bpy.context.scene.objects:
-            if obj.type == 'MESH' and obj.mcbde and obj.mcbde.block_type not in [""]:
-                blender_matrix = obj.matrix_world.copy()
-                minecraft_matrix = convert_coordinates(blender_matrix)
-                transformation_string = (
-                    f"transformation: [{round(minecraft_matrix[0][0], 4)}f, {round(minecraft_matrix[0][1], 4)}f, {round(minecraft_matrix[0][2], 4)}f, {round(minecraft_matrix[0][3], 4)}f, "
-                                     f"{round(minecraft_matrix[1][0], 4)}f, {round(minecraft_matrix[1][1], 4)}f, {round(minecraft_matrix[1][2], 4)}f, {round(minecraft_matrix[1][3], 4)}f, "
-                                     f"{round(minecraft_matrix[2][0], 4)}f, {round(minecraft_matrix[2][1], 4)}f, {round(minecraft_matrix[2][2], 4)}f, {round(minecraft_matrix[2][3], 4)}f, "
-                                     f"{round(minecraft_matrix[3][0], 4)}f, {round(minecraft_matrix[3][1], 4)}f, {round(minecraft_matrix[3][2], 4)}f, {round(minecraft_matrix[3][3], 4)}f]"
-                )
-                block_type = obj.mcbde.block_type
+        scene_properties = context.scene.mcbde
+        origin_location = ORIGIN_LOCATION
+
+        if report_invalid_entity_tag(scene_properties, self.report):
+            return {'CANCELLED'}
+
+        passengers = get_export_passengers(context.scene, self.report)
+
+        commands = get_commands(passengers, origin_location, scene_properties, compact=scene_properties.compact_output)
+        scene_properties.command = "\n".join(commands)
+
+        if len(commands) > 1:
+            # Several commands do not fit in one command block, so they are also written as a function
+            write_function_text(FUNCTION_TEXT_NAME, commands)
+            self.report({'INFO'}, f"Generated {len(commands)} commands, also written to the text {FUNCTION_TEXT_NAME}")
+
+        if scene_properties.compact_output:
+            command_length = sum(len(command) for command in commands)
+            verbose_length = sum(len(command) for command in get_commands(passengers, origin_location, scene_properties, compact=False))
+            saved = verbose_length - command_length
+            self.report({'INFO'}, f"Compact output saved {saved} bytes ({saved / max(verbose_length, 1):.0%})")
+
+        remember_export_state(scene_properties, passengers)
+
+        return {'FINISHED'}
+
+
+class DeltaUpdateButton(Operator):
+    """
+    Operator for generating the commands which update the last generated
+    entity to match the scene, instead of summoning it again.
+    """
+    bl_idname = "object.delta_update_button"
+    bl_label = "Generate Update"
+    bl_description = "Generate commands which only add, remove or change the blocks changed since the last generated command"
+
+    def execute(self, context):
+        scene_properties = context.scene.mcbde
 
-                # Getting the properties string
-                property_string = get_property_string(obj)
+        if not scene_properties.entity_tag:
+            self.report({'ERROR'}, "An entity tag is needed to find the passengers in game")
+            return {'CANCELLED'}
+        if report_invalid_entity_tag(scene_properties, self.report):
+            return {'CANCELLED'}
+        if scene_properties.chunked_export:
+            self.report({'ERROR'}, "Updates cannot be generated with chunked export")
+            return {'CANCELLED'}
+        if not scene_properties.export_state:
+            self.report({'ERROR'}, "Generate the full command first")
+            return {'CANCELLED'}
 
-                block_string = f'{{id: "minecraft:block_display", block_state: {{Name: "minecraft:{block_type}", Properties: {{{property_string}}}}},' \
-                            + transformation_string + '},'
-                command_string = command_string + block_string
+        passengers = get_export_passengers(context.scene, self.report)
+        previous_state = json.loads(scene_properties.export_state)
 
-        # Trim the last comma and close the brackets
-        command_string = command_string[:-1] + ']}'
-        context.scene.mcbde.command = command_string
+        commands, export_state = build_delta_commands(
+            previous_state,
+            get_root_passengers(passengers, scene_properties),
+            scene_properties.entity_tag,
+            **get_format_options(scene_properties)
+        )
 
+        scene_properties.command = "\n".join(commands)
+        write_function_text(FUNCTION_TEXT_NAME, commands)
+        scene_properties.export_state = json.dumps(export_state)
+
+        self.report({'INFO'}, f"Generated {len(commands)} update commands, also written to the text {FUNCTION_TEXT_NAME}")
         return {'FINISHED'}
 
     
+class ExportAnimationButton(Operator):
+    """
+    Operator for baking the scene animation into a data pack which plays it
+    back on an entity summoned with the generated command.
+    """
+    bl_idname = "object.export_animation_button"
+    bl_label = "Export Animation"
+    bl_description = "Bake the timeline into a data pack of interpolated transformation updates"
+
+    def execute(self, context):
+        scene = context.scene
+        scene_properties = scene.mcbde
+
+        if not scene_properties.entity_tag:
+            self.report({'ERROR'}, "An entity tag is needed to find the passengers in game")
+            return {'CANCELLED'}
+        if report_invalid_entity_tag(scene_properties, self.report):
+            return {'CANCELLED'}
+        if scene_properties.chunked_export:
+            self.report({'ERROR'}, "Animations cannot be exported with chunked export")
+            return {'CANCELLED'}
+        if not scene_properties.datapack_directory:
+            self.report({'ERROR'}, "Choose a directory to export the data pack to")
+            return {'CANCELLED'}
+
+        # These passes leave out entities, which then cannot be animated
+        entity_passes = [
+            name for setting, name in [
+                ("merge_blocks", "Merge Blocks"),
+                ("cull_hidden_blocks", "Cull Hidden Blocks"),
+                ("remove_duplicates", "Remove Duplicates"),
+            ]
+            if getattr(scene_properties, setting)
+        ]
+        if entity_passes:
+            self.report({'ERROR'}, f"Animations need every block as its own entity, disable {', '.join(entity_passes)}")
+            return {'CANCELLED'}
+
+        frames_per_tick = scene.render.fps / scene.render.fps_base / TICKS_PER_SECOND
+        original_frame = scene.frame_current
+
+        # Sample every frame, keeping the last frame sampled on each tick
+        samples = {}
+        # The box around the blocks in every sampled frame, for the culling boxes
+        bounds = None
+        for frame in range(scene.frame_start, scene.frame_end + 1, scene.frame_step):
+            scene.frame_set(frame)
+            tick = round((frame - scene.frame_start) / frames_per_tick)
+            passengers = get_passengers(scene)
+            samples[tick] = {passenger["tags"][1]: passenger["transformation"] for passenger in passengers}
+
+            frame_bounds = export.get_passengers_bounds(passengers, get_block_bounds) if scene_properties.culling_boxes else None
+            if frame_bounds is not None:
+                bounds = frame_bounds if bounds is None else (
+                    [min(a, b) for a, b in zip(bounds[0], frame_bounds[0])],
+                    [max(a, b) for a, b in zip(bounds[1], frame_bounds[1])],
+                )
+
+        scene.frame_set(original_frame)
+
+        # The culling boxes of the summon command only cover the first frame
+        setup_commands = []
+        if bounds is not None:
+            width, height = export.get_centred_culling_box(bounds)
+            compact = scene_properties.compact_output
+            tolerance = scene_properties.compact_tolerance
+            setup_commands.append(get_culling_box_command(
+                scene_properties.entity_tag,
+                format_render_field(width, compact, tolerance),
+                format_render_field(height, compact, tolerance)
+            ))
+
+        ticks = sorted(samples)
+        tags = set.intersection(*(set(sample) for sample in samples.values())) if samples else set()
+        tracks = {tag: [samples[tick][tag] for tick in ticks] for tag in sorted(tags)}
+
+        def format_animation_transformation(matrix):
+            return format_transformation(
+                matrix,
+                compact=scene_properties.compact_output,
+                tolerance=scene_properties.compact_tolerance,
+                use_decomposed=scene_properties.use_decomposed_transformation
+            )
+
+        functions = build_animation_functions(
+            scene_properties.animation_name,
+            scene_properties.datapack_namespace,
+            tracks,
+            ticks,
+            scene_properties.animation_tolerance,
+            format_animation_transformation,
+            setup_commands
+        )
+        directory = bpy.path.abspath(scene_properties.datapack_directory)
+        write_datapack(directory, scene_properties.datapack_namespace, functions)
+
+        command_count = sum(len(commands) for commands in functions.values())
+        self.report({'INFO'}, f"Exported {len(ticks)} ticks of {len(tracks)} passengers as {command_count} commands, "
+                              f"run /function {scene_properties.datapack_namespace}:{scene_properties.animation_name}/start to play")
+        return {'FINISHED'}
+
+
+class ExportMacroButton(Operator):
+    """
+    Operator for exporting the scene as a data pack of function macros, with
+    one template function per block state.
+    """
+    bl_idname = "object.export_macro_button"
+    bl_label = "Export Macro Functions"
+    bl_description = "Export a data pack for 1.20.2 or newer which summons the scene by calling one macro function per block state with only the transformation"
+
+    def execute(self, context):
+        scene_properties = context.scene.mcbde
+
+        if not scene_properties.datapack_directory:
+            self.report({'ERROR'}, "Choose a directory to export the data pack to")
+            return {'CANCELLED'}
+        if report_invalid_entity_tag(scene_properties, self.report):
+            return {'CANCELLED'}
+
+        passengers = get_export_passengers(context.scene, self.report)
+        format_options = get_format_options(scene_properties)
+        entity_tag = scene_properties.entity_tag
+
+        roots = export.get_root_entities(
+            passengers,
+            ORIGIN_LOCATION,
+            entity_tag,
+            scene_properties.chunk_size if scene_properties.chunked_export else None,
+            get_block_bounds if scene_properties.culling_boxes else None,
+        )
+        functions = build_macro_functions(
+            scene_properties.macro_function_name,
+            scene_properties.datapack_namespace,
+            roots,
+            [entity_tag, get_root_tag(entity_tag)] if entity_tag else None,
+            **format_options
+        )
+        directory = bpy.path.abspath(scene_properties.datapack_directory)
+        write_datapack(directory, scene_properties.datapack_namespace, functions, pack_format=MACRO_PACK_FORMAT)
+
+        macro_length = sum(len(command) for commands in functions.values() for command in commands)
+        command_length = sum(len(command) for command in get_commands(passengers, ORIGIN_LOCATION, scene_properties, scene_properties.compact_output))
+        saved = command_length - macro_length
+        template_count = len(functions) - len(roots) - 1
+        self.report({'INFO'}, f"Exported {len(passengers)} passengers with {template_count} block templates, "
+                              f"saving {saved} bytes ({saved / max(command_length, 1):.0%}), "
+                              f"run /function {scene_properties.datapack_namespace}:{scene_properties.macro_function_name} to summon")
+        return {'FINISHED'}
+
+
+class SyncButton(Operator):
+    """
+    Operator for sending the scene to a running server over RCON.
+    """
+    bl_idname = "object.sync_button"
+    bl_label = "Send to Server"
+    bl_description = "Send the scene, or only the changes since it was last sent, to the server over RCON"
+
+    def execute(self, context):
+        command_count = sync_scene(context.scene, self.report)
+        if command_count is None:
+            self.report({'WARNING'}, "Still sending the previous changes, try again when they are done")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Sending {command_count} commands to {context.scene.mcbde.rcon_host}:{context.scene.mcbde.rcon_port}")
+        return {'FINISHED'}
+
+
+class RefreshFaceCullingButton(Operator):
+    """
+    Operator for rebuilding the face culling of every block in the scene,
+    for example after blocks have been deleted.
+    """
+    bl_idname = "object.refresh_face_culling_button"
+    bl_label = "Refresh Face Culling"
+    bl_description = "Recompute which faces are hidden by neighbouring blocks"
+
+    def execute(self, context):
+        update_face_culling(context.scene.mcbde, context)
+        return {'FINISHED'}
+
+
+class ConnectBlocksButton(Operator):
+    """
+    Operator for connecting the selected fences, walls, panes and stairs,
+    or all of them in the scene if nothing is selected, to their neighbours.
+    """
+    bl_idname = "object.connect_blocks_button"
+    bl_label = "Connect Blocks"
+    bl_description = "Set the sides of fences, walls and panes and the shape of stairs from their neighbours"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        objects = context.selected_objects or block_registry.get_objects(context.scene)
+        changed = connect_blocks(objects, context.scene)
+        self.report({'INFO'}, f"Connected {changed} blocks")
+        return {'FINISHED'}
+
+
+class RandomizeModelsButton(Operator):
+    """
+    Operator for picking a random model, by the weights of the block state,
+    for the selected blocks, or all of them in the scene if nothing is selected.
+    """
+    bl_idname = "object.randomize_models_button"
+    bl_label = "Randomize Models"
+    bl_description = "Pick one of the weighted random models of blocks like stone, reproducibly from the seed"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    reset: BoolProperty(
+        name="Reset",
+        description="Show the first model of every block again",
+        default=False
+    ) # type: ignore
+
+    def execute(self, context):
+        objects = context.selected_objects or block_registry.get_objects(context.scene)
+        seed = None if self.reset else context.scene.mcbde.random_model_seed
+        randomized = randomize_models(objects, seed)
+        if randomized and seed is not None:
+            self.report({'WARNING'}, f"Picked models for {randomized} blocks with random models, "
+                                     f"these only show in Blender since the game picks the same model for every display")
+        else:
+            self.report({'INFO'}, f"Picked models for {randomized} blocks with random models")
+        return {'FINISHED'}
+
+
+class SelectBlockTypeButton(Operator):
+    """
+    Operator for selecting every block in the scene with the block type of
+    the active block, or with its whole block state.
+    """
+    bl_idname = "object.select_block_type_button"
+    bl_label = "Select All of Type"
+    bl_description = "Select every block in the scene with the type of the active block"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    same_state: BoolProperty(
+        name="Same State",
+        description="Only select blocks which also have the same properties as the active block",
+        default=False
+    ) # type: ignore
+
+    def execute(self, context):
+        active = context.active_object
+        if active is None or not active.mcbde or active.mcbde.block_type in [""]:
+            self.report({'ERROR'}, "Select a block first")
+            return {'CANCELLED'}
+
+        block_type = active.mcbde.block_type
+        if self.same_state:
+            objects = block_registry.get_state_objects(block_type, get_state_key(active), context.scene)
+        else:
+            objects = block_registry.get_type_objects(block_type, context.scene)
+
+        objects = [obj for obj in objects if obj.visible_get()]
+        for obj in context.selected_objects:
+            obj.select_set(False)
+        for obj in objects:
+            obj.select_set(True)
+        context.view_layer.objects.active = active
+
+        self.report({'INFO'}, f"Selected {len(objects)} blocks of {block_type}")
+        return {'FINISHED'}
+
+
+class ReplaceBlockTypeButton(Operator):
+    """
+    Operator for changing every block in the scene with the block type of
+    the active block to the replacement block type.
+    """
+    bl_idname = "object.replace_block_type_button"
+    bl_label = "Replace Type in Scene"
+    bl_description = "Change every block in the scene with the type of the active block to the replacement type"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        scene_properties = context.scene.mcbde
+        active = context.active_object
+        if active is None or not active.mcbde or active.mcbde.block_type in [""]:
+            self.report({'ERROR'}, "Select a block first")
+            return {'CANCELLED'}
+
+        replacement = scene_properties.replace_block_type
+        if data_loader.get_data("blockstates", replacement) is None:
+            self.report({'ERROR'}, f"{replacement} is not a block type")
+            return {'CANCELLED'}
+
+        block_type = active.mcbde.block_type
+        objects = block_registry.get_type_objects(block_type, context.scene)
+        set_block_type(objects, replacement)
+
+        # Neighbours may need to cull more or fewer faces now
+        if scene_properties.face_culling:
+            refresh_face_culling_around(objects)
+
+        self.report({'INFO'}, f"Replaced {len(objects)} blocks of {block_type} with {replacement}")
+        return {'FINISHED'}
+
+
+class ImportCommandButton(Operator, ImportHelper):
+    """
+    Operator for recreating the blocks of existing block display summon
+    commands, from a function file or the clipboard.
+    """
+    bl_idname = "object.import_command_button"
+    bl_label = "Import Command"
+    bl_description = "Create blocks from the block displays summoned by a command or function file"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    filter_glob: StringProperty(
+        default="*.mcfunction;*.txt",
+        options={'HIDDEN'}
+    ) # type: ignore
+    from_clipboard: BoolProperty(
+        name="From Clipboard",
+        description="Import the command in the clipboard instead of a file",
+        default=False,
+        options={'SKIP_SAVE'}
+    ) # type: ignore
+
+    def invoke(self, context, event):
+        if self.from_clipboard:
+            return self.execute(context)
+        return ImportHelper.invoke(self, context, event)
+
+    def execute(self, context):
+        try:
+            if self.from_clipboard:
+                text = context.window_manager.clipboard
+            else:
+                with open(self.filepath, encoding="utf-8") as f:
+                    text = f.read()
+            objects, skipped = import_commands(text, context.collection)
+        except (SnbtError, OSError, UnicodeDecodeError) as e:
+            self.report({'ERROR'}, f"Could not read the command: {e}")
+            return {'CANCELLED'}
+
+        if not objects:
+            self.report({'WARNING'}, "No block displays found")
+            return {'CANCELLED'}
+
+        select_imported_objects(context, objects)
+
+        self.report({'INFO'}, f"Imported {len(objects)} blocks")
+        if skipped:
+            self.report({'WARNING'}, f"Skipped {skipped} blocks of unknown types")
+        return {'FINISHED'}
+
+
+class ImportStructureButton(Operator, ImportHelper):
+    """
+    Operator for recreating the blocks of a structure file or schematic.
+    """
+    bl_idname = "object.import_structure_button"
+    bl_label = "Import Structure"
+    bl_description = "Create blocks from a structure block file or a Sponge schematic"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    filter_glob: StringProperty(
+        default="*.nbt;*.schem;*.schematic",
+        options={'HIDDEN'}
+    ) # type: ignore
+    skip_hidden: BoolProperty(
+        name="Skip Hidden Blocks",
+        description="Leave out blocks enclosed on all sides by opaque full blocks",
+        default=True
+    ) # type: ignore
+
+    def execute(self, context):
+        try:
+            objects, skipped = import_structure(self.filepath, context.collection, self.skip_hidden)
+        except (NbtError, OSError) as e:
+            self.report({'ERROR'}, f"Could not read the structure: {e}")
+            return {'CANCELLED'}
+
+        if not objects:
+            self.report({'WARNING'}, "No blocks found")
+            return {'CANCELLED'}
+
+        select_imported_objects(context, objects)
+
+        self.report({'INFO'}, f"Imported {len(objects)} blocks")
+        if skipped:
+            self.report({'WARNING'}, f"Skipped {skipped} blocks of unknown types")
+        return {'FINISHED'}
+
+
+class VoxelizeButton(Operator):
+    """
+    Operator for filling the selected meshes with blocks matching their colours.
+    """
+    bl_idname = "object.voxelize_button"
+    bl_label = "Voxelize"
+    bl_description = "Fill the selected closed meshes with blocks, picking the block closest in colour to the surface"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        scene_properties = context.scene.mcbde
+        sources = [
+            obj for obj in context.selected_objects
+            if obj.type == 'MESH' and obj.mcbde.block_type in [""]
+        ]
+        if not sources:
+            self.report({'ERROR'}, "Select a mesh which is not a block")
+            return {'CANCELLED'}
+
+        depsgraph = context.evaluated_depsgraph_get()
+        blocks = []
+        for obj in sources:
+            blocks.extend(get_voxel_blocks(
+                obj,
+                depsgraph,
+                scene_properties.voxel_size,
+                scene_properties.voxel_hollow,
+                scene_properties.voxel_block_types
+            ))
+
+        if not blocks:
+            self.report({'WARNING'}, "No voxels found, check that the mesh is closed and the block types match")
+            return {'CANCELLED'}
+
+        objects, _ = create_block_objects(blocks, context.collection)
+
+        for obj in sources:
+            obj.hide_set(True)
+        select_imported_objects(context, objects)
+
+        self.report({'INFO'}, f"Voxelized {len(sources)} meshes into {len(objects)} blocks")
+        return {'FINISHED'}
+
+
+class ConvertToInstancesButton(Operator):
+    """
+    Operator for moving the selected blocks into a single instancer object,
+    which keeps very large builds fast.
+    """
+    bl_idname = "object.convert_to_instances_button"
+    bl_label = "Convert to Instances"
+    bl_description = "Replace the selected blocks with points of one instancer object, adding them to the active instancer if there is one"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        active = context.active_object
+        instancer = active if active and is_instancer(active) else None
+        objects = [obj for obj in context.selected_objects if obj != instancer]
+
+        instancer, converted, skipped = convert_objects_to_instances(objects, context.collection, instancer)
+
+        select_imported_objects(context, [instancer])
+        if skipped:
+            self.report({'WARNING'}, f"Converted {converted} blocks to instances, kept {skipped} blocks whose type is not in the loaded data")
+        else:
+            self.report({'INFO'}, f"Converted {converted} blocks to instances")
+        return {'FINISHED'}
+
+
+class ConvertToObjectsButton(Operator):
+    """
+    Operator for turning the points of the active instancer back into
+    separate block objects, so they can be edited one by one.
+    """
+    bl_idname = "object.convert_to_objects_button"
+    bl_label = "Convert to Objects"
+    bl_description = "Replace the active instancer with one block object for each of its points"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return context.active_object is not None and is_instancer(context.active_object)
+
+    def execute(self, context):
+        objects = convert_instances_to_objects(context.active_object, context.collection)
+
+        if objects:
+            select_imported_objects(context, objects)
+        self.report({'INFO'}, f"Converted {len(objects)} instances to blocks")
+        return {'FINISHED'}
+
+
+class BakeLibraryButton(Operator):
+    """
+    Operator for baking block meshes into the asset library of the loaded
+    game version, so they are linked instead of rebuilt in later sessions.
+    """
+    bl_idname = "object.bake_library_button"
+    bl_label = "Bake Asset Library"
+    bl_description = "Build the meshes of the matching block states and save them to the asset library of this game version"
+
+    def execute(self, context):
+        scene_properties = context.scene.mcbde
+        path = get_library_path()
+
+        # Meshes linked from the library would be baked as links to themselves
+        if any(os.path.normpath(bpy.path.abspath(library.filepath)) == os.path.normpath(path) for library in bpy.data.libraries):
+            self.report({'ERROR'}, "The asset library is linked in this file, bake it from a new file")
+            return {'CANCELLED'}
+
+        patterns = [pattern.strip() for pattern in scene_properties.library_block_types.split(",") if pattern.strip()]
+        collection = bpy.data.collections.new("MCBDE Bake")
+
+        meshes = {}
+        for block_type, *_ in block_definitions.blocks:
+            if not any(fnmatch.fnmatchcase(block_type, pattern) for pattern in patterns):
+                continue
+            blockstate = data_loader.get_data("blockstates", block_type)
+            if blockstate is None:
+                continue
+
+            for properties in get_block_states(build_properties_dict(blockstate), scene_properties.library_max_states):
+                block_state_data = get_block_state_data(block_type, properties)
+                if block_state_data is None:
+                    continue
+                obj = create_block_object(block_type, block_type, block_state_data, collection, use_library=False)
+                meshes[obj.data.name] = obj.data
+
+        path = write_library(list(meshes.values()))
+
+        for obj in list(collection.objects):
+            bpy.data.objects.remove(obj)
+        bpy.data.collections.remove(collection)
+        for mesh in meshes.values():
+            if mesh.users == 0:
+                bpy.data.meshes.remove(mesh)
+
+        self.report({'INFO'}, f"Baked {len(meshes)} block meshes to {path}")
+        return {'FINISHED'}
+
+
+class ProfileReportButton(Operator):
+    """
+    Operator for writing the profiling report to a text
+    """
+    bl_idname = "object.profile_report_button"
+    bl_label = "Show Report"
+    bl_description = "Write the time spent in each stage and the cache hit rates to the MCBDE Profile text"
+
+    def execute(self, context):
+        text = write_report()
+        self.report({'INFO'}, f"Wrote the profiling report to {text.name}")
+        return {'FINISHED'}
+
+
+class ResetProfileButton(Operator):
+    """
+    Operator for clearing the recorded timings
+    """
+    bl_idname = "object.reset_profile_button"
+    bl_label = "Reset"
+    bl_description = "Clear the recorded timings and cache counts"
+
+    def execute(self, context):
+        profiler.reset()
+        return {'FINISHED'}
+
+
 class LoadDataButton(Operator):
     """
     Opeartor for the loading data button
@@ -81,6 +896,23 @@ class LoadDataButton(Operator):
 
 classes = (
     GenerateButton,
+    DeltaUpdateButton,
+    ExportAnimationButton,
+    ExportMacroButton,
+    SyncButton,
+    RefreshFaceCullingButton,
+    ConnectBlocksButton,
+    RandomizeModelsButton,
+    SelectBlockTypeButton,
+    ReplaceBlockTypeButton,
+    ImportCommandButton,
+    ImportStructureButton,
+    VoxelizeButton,
+    ConvertToInstancesButton,
+    ConvertToObjectsButton,
+    BakeLibraryButton,
+    ProfileReportButton,
+    ResetProfileButton,
     LoadDataButton,
 )
 
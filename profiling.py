@@ -0,0 +1,263 @@
+"""
+Timing the slow parts of the add-on.
+
+While profiling is enabled, the functions in the hot paths of block changes,
+import and export are wrapped to record the number of calls and the time
+spent in each stage, and the caches count their hits and misses. When it is
+disabled the original functions are put back, so it costs nothing. Functions
+are replaced in every module of the add-on which imported them by name, so
+calls through those names are timed too.
+
+The next operation can also be run under cProfile, saving a pstats file and
+writing its slowest functions to a text.
+"""
+import cProfile
+import functools
+import io
+import logging
+import pstats
+import sys
+import time
+from types import ModuleType
+import bpy
+
+from .core import models
+from .data_loader import data_loader
+
+# Operators which are timed as a whole
+PROFILED_OPERATORS = [
+    "GenerateButton",
+    "DeltaUpdateButton",
+    "ExportAnimationButton",
+    "ExportMacroButton",
+    "ImportCommandButton",
+    "ImportStructureButton",
+    "VoxelizeButton",
+    "ConnectBlocksButton",
+    "RandomizeModelsButton",
+    "ConvertToInstancesButton",
+    "ConvertToObjectsButton",
+    "BakeLibraryButton",
+]
+
+REPORT_TEXT_NAME = "MCBDE Profile"
+CPROFILE_TEXT_NAME = "MCBDE cProfile"
+
+# The number of functions written to the cProfile text
+CPROFILE_TEXT_FUNCTIONS = 40
+
+logger = logging.getLogger(__name__)
+
+
+class Profiler:
+    """
+    A registry of timed stages and cache counters
+    """
+
+    def __init__(self):
+        self.enabled = False
+        # Stage name to [calls, seconds]
+        self.stages = {}
+        # Cache name to [hits, misses]
+        self.caches = {}
+        # (owner, attribute, original) of every wrapped function
+        self.wrapped = []
+        # The number of operations which are running, so that only the outermost one is profiled
+        self.operation_depth = 0
+
+
+    def get_profiled_functions(self):
+        """
+        Return (owner, attribute, stage, is_operation) for every function to time
+        """
+        # These modules import this one, so they are only imported once needed
+        from . import operators, properties_util
+
+        functions = [
+            (data_loader, "get_data", "get_data", False),
+            (data_loader, "load_image", "load_image", False),
+            (models, "resolve_model", "resolve_model", False),
+            (properties_util, "load_library_mesh", "load_library_mesh", False),
+            (properties_util, "create_materials", "create_materials", False),
+            (properties_util, "get_model_geometry", "get_model_geometry", False),
+            (properties_util, "build_model", "build_model", False),
+            (properties_util, "change_block_visuals", "change_block_visuals", True),
+            (operators, "get_passengers", "get_passengers", False),
+            (operators, "optimize_passengers", "optimize_passengers", False),
+            (operators, "get_commands", "get_commands", False),
+        ]
+        for name in PROFILED_OPERATORS:
+            functions.append((getattr(operators, name), "execute", name, True))
+        return functions
+
+
+    def get_import_sites(self, function):
+        """
+        Return (module, attribute) for every module of the add-on which holds
+        function, either defining it or having imported it by name
+        """
+        sites = []
+        for name, module in list(sys.modules.items()):
+            if name != __package__ and not name.startswith(__package__ + "."):
+                continue
+            for attribute, value in list(vars(module).items()):
+                if value is function:
+                    sites.append((module, attribute))
+        return sites
+
+
+    def wrap(self, owner, function, stage, is_operation):
+        timed = self.wrap_function(function, stage, is_operation)
+        if not isinstance(owner, type):
+            return timed
+
+        # Blender passes operator methods as many arguments as they declare
+        @functools.wraps(function)
+        def execute(self, context):
+            return timed(self, context)
+
+        return execute
+
+
+    def wrap_function(self, function, stage, is_operation):
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            if is_operation and self.operation_depth == 0 and bpy.context.scene.mcbde.profile_next_operation:
+                return self.run_with_cprofile(function, args, kwargs)
+
+            self.operation_depth += is_operation
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.operation_depth -= is_operation
+                self.add_time(stage, time.perf_counter() - start)
+
+        return timed
+
+
+    def run_with_cprofile(self, function, args, kwargs):
+        """
+        Run function under cProfile, save the statistics to the profile path
+        of the scene and write the slowest functions to a text. Operators
+        report where the statistics were saved.
+        """
+        scene_properties = bpy.context.scene.mcbde
+        scene_properties.profile_next_operation = False
+
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(function, *args, **kwargs)
+        finally:
+            path = bpy.path.abspath(scene_properties.profile_path)
+            profile.dump_stats(path)
+            stream = io.StringIO()
+            pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(CPROFILE_TEXT_FUNCTIONS)
+            text = write_text(CPROFILE_TEXT_NAME, stream.getvalue())
+
+            message = f"Saved the profile of {function.__qualname__} to {path} and {text.name}"
+            if args and isinstance(args[0], bpy.types.Operator):
+                args[0].report({'INFO'}, message)
+            else:
+                logger.info(message)
+
+
+    def add_time(self, stage, seconds):
+        stage_time = self.stages.setdefault(stage, [0, 0.0])
+        stage_time[0] += 1
+        stage_time[1] += seconds
+
+
+    def count_cache(self, name, hit):
+        if not self.enabled:
+            return
+        counts = self.caches.setdefault(name, [0, 0])
+        counts[0 if hit else 1] += 1
+
+
+    def enable(self):
+        if self.enabled:
+            return
+        for owner, attribute, stage, is_operation in self.get_profiled_functions():
+            original = getattr(owner, attribute)
+            timed = self.wrap(owner, original, stage, is_operation)
+            sites = self.get_import_sites(original) if isinstance(owner, ModuleType) else [(owner, attribute)]
+            for site_owner, site_attribute in sites:
+                self.wrapped.append((site_owner, site_attribute, original))
+                setattr(site_owner, site_attribute, timed)
+        self.enabled = True
+
+
+    def disable(self):
+        for owner, attribute, original in reversed(self.wrapped):
+            if owner is data_loader:
+                # Methods were only wrapped on the instance
+                delattr(owner, attribute)
+            else:
+                setattr(owner, attribute, original)
+        self.wrapped = []
+        self.operation_depth = 0
+        self.enabled = False
+
+
+    def reset(self):
+        self.stages.clear()
+        self.caches.clear()
+
+
+    def get_slowest_stages(self, count=None):
+        """
+        Return (stage, (calls, seconds)) pairs of the count slowest stages
+        """
+        return sorted(self.stages.items(), key=lambda item: -item[1][1])[:count]
+
+
+    def get_report(self):
+        """
+        Return the report as a list of lines, with the slowest stages first.
+        Stage times include the stages called from them.
+        """
+        lines = [f"{'Stage':28}{'Calls':>10}{'Total ms':>12}{'Mean ms':>10}"]
+        for stage, (calls, seconds) in self.get_slowest_stages():
+            lines.append(f"{stage:28}{calls:>10}{seconds * 1000:>12.1f}{seconds * 1000 / calls:>10.3f}")
+
+        if self.caches:
+            lines.append("")
+            lines.append(f"{'Cache':28}{'Hits':>10}{'Misses':>12}{'Hit rate':>10}")
+            for name, (hits, misses) in sorted(self.caches.items()):
+                lines.append(f"{name:28}{hits:>10}{misses:>12}{hits / (hits + misses):>10.1%}")
+
+        return lines
+
+
+profiler = Profiler()
+
+
+def update_profiling(self, context):
+    if self.profiling:
+        profiler.enable()
+    else:
+        profiler.disable()
+
+
+def write_text(name, body):
+    """
+    Replace the contents of the Blender text called name with body, and return the text
+    """
+    text = bpy.data.texts.get(name)
+    if text is None:
+        text = bpy.data.texts.new(name)
+    text.clear()
+    text.write(body)
+    return text
+
+
+def write_report():
+    """
+    Write the report to a Blender text and return the text
+    """
+    return write_text(REPORT_TEXT_NAME, "\n".join(profiler.get_report()) + "\n")
+
+
+def unregister():
+    profiler.disable()
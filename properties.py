@@ -1,13 +1,21 @@
+import bpy
 from bpy.types import PropertyGroup, PropertyGroup, Scene, Object
 from bpy.props import (
     StringProperty,
     PointerProperty,
     CollectionProperty,
-    EnumProperty
+    EnumProperty,
+    BoolProperty,
+    FloatProperty,
+    IntProperty
 )
 import json
-from . import block_definitions
 from . import properties_util
+from . import live_sync
+from . import profiling
+from . import statistics_util
+from . import connections_util
+from . import block_picker
 from .data_loader import data_loader
 
 
@@ -40,6 +48,9 @@ class McbdeMenuProperties(PropertyGroup):
     Properties for the MCBDE menu.
     """
 
+    def get_block_list(self, context, edit_text):
+        return block_picker.get_block_names(edit_text)
+
     minecraft_location: StringProperty(
         name="Minecraft Location",
         description='The .jar file for the desired Minecraft version. Will be found in ".minecraft/versions/VERSION/VERSION.jar"',
@@ -53,6 +64,251 @@ class McbdeMenuProperties(PropertyGroup):
         maxlen=0,
         options={'HIDDEN', 'SKIP_SAVE'}
     ) # type: ignore
+    compact_output: BoolProperty(
+        name="Compact Output",
+        description="Leave out redundant data and shorten numbers so that more blocks fit in one command",
+        default=False
+    ) # type: ignore
+    compact_tolerance: FloatProperty(
+        name="Tolerance",
+        description="The largest error allowed when shortening numbers in the compact output",
+        default=0.0001,
+        min=0.0,
+        max=0.01,
+        precision=5,
+        step=0.001
+    ) # type: ignore
+    use_decomposed_transformation: BoolProperty(
+        name="Decomposed Transforms",
+        description="Use the translation, rotation and scale form of the transformation where it is shorter",
+        default=True
+    ) # type: ignore
+    merge_blocks: BoolProperty(
+        name="Merge Blocks",
+        description="Merge adjacent identical full blocks into single scaled block displays",
+        default=False
+    ) # type: ignore
+    merge_block_types: StringProperty(
+        name="Mergeable Types",
+        description="Comma separated block types which may be merged, * is a wildcard. Merged blocks stretch their texture, so only use uniform blocks",
+        default="*_concrete"
+    ) # type: ignore
+    cull_hidden_blocks: BoolProperty(
+        name="Cull Hidden Blocks",
+        description="Leave out blocks which are completely surrounded by opaque full blocks",
+        default=False
+    ) # type: ignore
+    remove_duplicates: BoolProperty(
+        name="Remove Duplicates",
+        description="Leave out blocks with the same type and transform as another block",
+        default=False
+    ) # type: ignore
+    chunked_export: BoolProperty(
+        name="Chunked Export",
+        description="Split the blocks into spatial chunks, each with its own root entity and command, so the game can load and cull them separately",
+        default=False
+    ) # type: ignore
+    chunk_size: IntProperty(
+        name="Chunk Size",
+        description="The size of each chunk in blocks",
+        default=16,
+        min=1,
+        max=256
+    ) # type: ignore
+    lod_tiers: BoolProperty(
+        name="Level of Detail",
+        description="Give small blocks a shorter view range, so that players far away render fewer entities",
+        default=False
+    ) # type: ignore
+    lod_tier_ranges: StringProperty(
+        name="Tiers",
+        description="Comma separated size:view_range pairs. Blocks smaller than the size, in blocks, get the view range, where 1 is the normal distance",
+        default="0.25:0.25, 0.6:0.5"
+    ) # type: ignore
+    culling_boxes: BoolProperty(
+        name="Culling Boxes",
+        description="Give the entities a culling box around all blocks of the command, so the game can skip rendering them when they are out of view. Without an entity tag, this moves the root entity to the bottom centre of the blocks",
+        default=False
+    ) # type: ignore
+    entity_tag: StringProperty(
+        name="Entity Tag",
+        description="Tag the generated entities with this, and each passenger with its own tag, so they can be found in game. Needed for animations. Only letters, digits and _ . + - are allowed",
+        default=""
+    ) # type: ignore
+    export_state: StringProperty(
+        name="Export State",
+        description="The passengers of the last generated command, or of the last one delivered to the server, used to generate updates",
+        default="",
+        options={'HIDDEN'}
+    ) # type: ignore
+    datapack_namespace: StringProperty(
+        name="Namespace",
+        description="The namespace of the functions in exported data packs",
+        default="mcbde"
+    ) # type: ignore
+    datapack_directory: StringProperty(
+        name="Data Pack",
+        description="The directory to export animation and macro data packs to, such as a folder in the datapacks folder of a world",
+        default="",
+        subtype='DIR_PATH'
+    ) # type: ignore
+    animation_name: StringProperty(
+        name="Animation Name",
+        description="The name of the animation functions",
+        default="animation"
+    ) # type: ignore
+    block_search: StringProperty(
+        name="Search",
+        description="Only show the blocks matching this in the block picker",
+        default="",
+        options={'TEXTEDIT_UPDATE'}
+    ) # type: ignore
+    block_picker: EnumProperty(
+        name="Block",
+        description="Change the selected blocks to the picked block type",
+        items=block_picker.get_picker_items,
+        update=block_picker.update_block_picker
+    ) # type: ignore
+    replace_block_type: StringProperty(
+        name="Replacement",
+        description="The block type which Replace Type in Scene changes blocks to",
+        default="",
+        search=get_block_list
+    ) # type: ignore
+    macro_function_name: StringProperty(
+        name="Function Name",
+        description="The name of the function which summons the scene in macro data packs",
+        default="build"
+    ) # type: ignore
+    animation_tolerance: FloatProperty(
+        name="Animation Tolerance",
+        description="The largest error allowed when leaving out keyframes which can be interpolated",
+        default=0.001,
+        min=0.0,
+        max=0.1,
+        precision=4,
+        step=0.01
+    ) # type: ignore
+    library_block_types: StringProperty(
+        name="Library Block Types",
+        description="Comma separated patterns of the block types to bake into the asset library",
+        default="*"
+    ) # type: ignore
+    library_max_states: IntProperty(
+        name="Max States",
+        description="Blocks with more property combinations than this only have their default state baked",
+        default=64,
+        min=1
+    ) # type: ignore
+    voxel_size: FloatProperty(
+        name="Voxel Size",
+        description="The size of the blocks a mesh is voxelized into",
+        default=1.0,
+        min=0.01,
+        soft_max=4.0
+    ) # type: ignore
+    voxel_hollow: BoolProperty(
+        name="Hollow",
+        description="Leave out voxels which are enclosed on all sides",
+        default=True
+    ) # type: ignore
+    voxel_block_types: StringProperty(
+        name="Voxel Block Types",
+        description="Comma separated patterns of the block types voxels may become, only opaque full blocks are used",
+        default="*_concrete,*_wool,*_terracotta"
+    ) # type: ignore
+    rcon_host: StringProperty(
+        name="Host",
+        description="The address of the server to send commands to over RCON",
+        default="localhost"
+    ) # type: ignore
+    rcon_port: IntProperty(
+        name="Port",
+        description="The RCON port of the server, set by rcon.port in server.properties",
+        default=25575,
+        min=1,
+        max=65535
+    ) # type: ignore
+    rcon_password: StringProperty(
+        name="Password",
+        description="The RCON password of the server, set by rcon.password in server.properties",
+        default="",
+        subtype='PASSWORD',
+        options={'SKIP_SAVE'}
+    ) # type: ignore
+    rcon_position: StringProperty(
+        name="Position",
+        description="Where new entities are summoned, such as 0 64 0. Commands sent over RCON run at the world spawn otherwise",
+        default=""
+    ) # type: ignore
+    live_sync: BoolProperty(
+        name="Live Sync",
+        description="Send changes to the server automatically as the scene is edited",
+        default=False,
+        options={'SKIP_SAVE'},
+        update=live_sync.update_live_sync
+    ) # type: ignore
+    face_culling: BoolProperty(
+        name="Face Culling",
+        description="Hide the faces of blocks which touch an opaque full block, to speed up the viewport in large builds",
+        default=False,
+        update=properties_util.update_face_culling
+    ) # type: ignore
+    random_model_seed: IntProperty(
+        name="Seed",
+        description="The seed of the random models picked by Randomize Models, the same seed always picks the same models for the same objects",
+        default=0,
+        min=0
+    ) # type: ignore
+    auto_connect: BoolProperty(
+        name="Auto Connect",
+        description="Connect fences, walls, panes and stairs to their neighbours whenever blocks are moved or changed",
+        default=False,
+        update=connections_util.update_auto_connect
+    ) # type: ignore
+    show_statistics: BoolProperty(
+        name="Statistics",
+        description="Estimate the entities, rendered quads and command length of the blocks in the scene",
+        default=False,
+        update=statistics_util.update_statistics
+    ) # type: ignore
+    budget_entities: IntProperty(
+        name="Entities",
+        description="Warn when the scene has more block display entities than this",
+        default=1000,
+        min=1
+    ) # type: ignore
+    budget_quads: IntProperty(
+        name="Quads",
+        description="Warn when the blocks in the scene render more faces than this",
+        default=20000,
+        min=1
+    ) # type: ignore
+    budget_command_length: IntProperty(
+        name="Command Length",
+        description="Warn when the command is estimated to be longer than this. Command blocks hold at most 32500 characters",
+        default=32500,
+        min=1
+    ) # type: ignore
+    profiling: BoolProperty(
+        name="Profiling",
+        description="Time each stage of block changes, import and export, and count cache hits",
+        default=False,
+        options={'SKIP_SAVE'},
+        update=profiling.update_profiling
+    ) # type: ignore
+    profile_next_operation: BoolProperty(
+        name="Profile Next Operation",
+        description="Run the next operation under cProfile and save the statistics to the profile path",
+        default=False,
+        options={'SKIP_SAVE'}
+    ) # type: ignore
+    profile_path: StringProperty(
+        name="Profile Path",
+        description="Where the cProfile statistics are saved, to be read with pstats or snakeviz",
+        default="//mcbde.prof",
+        subtype='FILE_PATH'
+    ) # type: ignore
 
 
 class McbdeBlockData(PropertyGroup):
@@ -61,7 +317,7 @@ class McbdeBlockData(PropertyGroup):
     """
 
     def get_block_list(self, context, edit_text):
-        return [item[0] for item in block_definitions.blocks]
+        return block_picker.get_block_names(edit_text)
     
     def get_variants(self, context, edit_text):
         blockstate = data_loader.get_data("blockstates", self.block_type)
@@ -85,6 +341,13 @@ class McbdeBlockData(PropertyGroup):
         name="Properties",
         type=BlockProperty,
     ) # type: ignore
+    model_choice: IntProperty(
+        name="Model Choice",
+        description="Which of the random models of the block state is shown, see choose_models",
+        default=0,
+        min=0,
+        options={'HIDDEN'}
+    ) # type: ignore
 
 
 classes = (
@@ -103,10 +366,16 @@ def register():
     Object.mcbde = PointerProperty(type=McbdeBlockData)
     Scene.mcbde = PointerProperty(type=McbdeMenuProperties)
 
+    bpy.app.handlers.depsgraph_update_post.append(properties_util.face_culling_depsgraph_handler)
+    bpy.app.handlers.load_post.append(properties_util.face_culling_load_handler)
+
 
 def unregister():
     from bpy.utils import unregister_class
 
+    bpy.app.handlers.load_post.remove(properties_util.face_culling_load_handler)
+    bpy.app.handlers.depsgraph_update_post.remove(properties_util.face_culling_depsgraph_handler)
+
     for cls in reversed(classes):
         unregister_class(cls)
 
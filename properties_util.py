@@ -1,102 +1,38 @@
 import bpy
-from mathutils import Vector, Matrix
-from math import radians
-import logging
+from bpy.app.handlers import persistent
 import bmesh
-import copy
 import json
 
 from .data_loader import data_loader
+from .asset_library import load_library_mesh
+from .profiling import profiler
+from .block_grid import block_grid, get_object_cell, DIRECTION_OFFSETS
+from .core.grid import get_culled_directions
+from .core.random_models import sample_model_choices
+from .block_registry import block_registry
+from .core import models
+from .core.models import prepare_model_textures
+from .core.geometry import get_model_geometry
+from .core.blockstates import build_properties_dict, get_default_properties, get_outer_model_data, choose_models
 
-logger = logging.getLogger(__name__)
 
+def resolve_model(model_data):
+    return models.resolve_model(data_loader, model_data)
 
-def deselect_all_except(obj) -> list:
-    """
-    Deselect all objects except the object obj, or list of objects obj
-
-    Usage:
-    prev = deselect_all_except(obj)
-    Do Stuff
-    reselect(prev)
-
-    Args:
-        obj (Object or list): must be a Blender object or a list of Blender objects
 
-    Returns:
-        A list of previously selected objects for use with reselect()
-    """
-    prev = bpy.context.selected_objects
-    bpy.ops.object.select_all(action='DESELECT')
+def get_block_models(block_type, selected_block_properties):
+    return models.get_block_models(data_loader, block_type, selected_block_properties)
 
-    if isinstance(obj, list):
-        for obj in list:
-            obj.select_set(True)
-    else:
-        obj.select_set(True)
 
-    return prev
+def is_full_cube(block_type, selected_block_properties):
+    return models.is_full_cube(data_loader, block_type, selected_block_properties)
 
 
-def replace_textures(d, textures):
-    """
-    Replace all instances of a # variable in d (#east for example) with the corresponding texture in textures
-    """
-    if isinstance(d, dict):
-        for key, value in d.items():
-            d[key] = replace_textures(value, textures)
-    elif isinstance(d, list):
-        for i, item in enumerate(d):
-            d[i] = replace_textures(item, textures)
-    elif isinstance(d, str) and d.startswith("#") and d[1:] in textures:
-        return textures[d[1:]].replace("minecraft:", "")
-    elif isinstance(d, str) and d.startswith("#") and d[1:] == "texture": # I have no idea why this case exists
-        return textures["particle"].replace("minecraft:", "")
-    return d
-
-def convert_vector_coordinates(minecraft_vector):
-    """
-    Convert a list in the Minecraft format [x, y, z] to a Blender Vector
-    """
-    blender_vector = Vector((0, 0, 0))
-    # Blender X from Minecraft X
-    blender_vector[0] = minecraft_vector[0]/16
-    # Blender Y from Minecraft -Z
-    blender_vector[1] = -minecraft_vector[2]/16
-    # Blender Z from Minecraft Y
-    blender_vector[2] =  minecraft_vector[1]/16
-    return blender_vector
+def is_opaque_full_cube(block_type, selected_block_properties):
+    return models.is_opaque_full_cube(data_loader, block_type, selected_block_properties)
 
 
-def convert_elements_coordinates(elements):
-    """
-    Convert all coordinates in elements from Minecraft to Blender.
-    Note that entries in the vector are floats so will not be perfectly precise.
-    """
-    for element in elements:
-        for coordinate in ["from", "to"]:
-            element[coordinate] = convert_vector_coordinates(element[coordinate])
-
-
-def convert_element_rotation(rotation_dict):
-    """
-    Convert the Minecraft element rotations to rotation matrices that can
-    be directly applied by Blender
-    """
-    if rotation_dict["axis"] == 'x':
-        axis = 'X'
-        angle = radians(rotation_dict["angle"])
-    elif rotation_dict["axis"] == 'z':
-        axis = 'Y'
-        angle = -radians(rotation_dict["angle"])
-    elif rotation_dict["axis"] == 'y':
-        axis = 'Z'
-        angle = radians(rotation_dict["angle"])
-
-    element_rotation_matrix = Matrix.Rotation(angle, 4, axis)
-    cent = convert_vector_coordinates(rotation_dict["origin"])
-
-    return element_rotation_matrix, cent
+get_block_bounds = models.get_block_bounds_getter(data_loader)
 
 
 def create_materials(textures):
@@ -185,101 +121,6 @@ def update_face_material(face, material_index, image_size, bm, uv):
     uv_data.y = (1 - uv[1]/16) / height_ratio
 
 
-def add_to_dict(d, key, value):
-    """
-    Place value in the list under key in the dict,
-    without repeating key or value in dict.
-
-    If the value is none or false, we insert at the beginning
-    so that it will be the default
-    """
-    if key not in d:
-        d[key] = [value]
-    elif value not in d[key]:
-        d[key].append(value)
-
-
-def process_part(d, part):
-    for key, value in part.items():
-        values = value.split('|')
-        for value in values:
-            add_to_dict(d, key, value)
-            
-
-def build_properties_dict(blockstate):
-    """
-    Build a dict that stores the full set of possible block properties
-    for a given blockstate.
-
-    Example return value:
-    {'facing': ['north', 'east', 'west', 'south']}
-    """
-    possible_properties = {}
-
-    if "variants" in blockstate:
-        for variant in blockstate["variants"]:
-            if variant == "":
-                # In this case, there must be exactly one variant, and it is blank
-                return {}
-            for key, value in [key_value.split("=") for key_value in variant.split(",")]:
-                add_to_dict(possible_properties, key, value)
-    
-    elif "multipart" in blockstate:
-        for part in blockstate["multipart"]:
-            if "when" not in part:
-                # In this case, there are no properties in this part (just a model)
-                continue
-            when = part["when"]
-            if "AND" in when:
-                for w in when["AND"]:
-                    process_part(possible_properties, w)
-            elif "OR" in when:
-                for w in when["OR"]:
-                    process_part(possible_properties, w)
-            else:
-                process_part(possible_properties, when)
-        
-        # Ensure that true and false always both exist even if blockstate does not specify both
-        # Also ensure none exists, if blockstate does not specify true and false
-        # Place false and none at the beginning
-        for property in possible_properties:
-            property_list = possible_properties[property]
-            if "true" in property_list and "false" not in property_list:
-                property_list.append("false")
-            elif "false" in property_list and "true" not in property_list:
-                property_list.append("true")
-            elif "true" not in property_list and "false" not in property_list and "none" not in property_list:
-                property_list.append("none")
-                
-    else:
-        print("Not a valid block model!")
-
-    return possible_properties
-
-
-def get_default_properties(block_properties):
-    """
-    Return the default (first) properties in block_properties as a dict.
-    
-    Example return value:
-    {'facing': 'north'}
-    """
-    selected = {}
-
-    for property in block_properties:
-        if "false" in block_properties[property]:
-            selected[property] = "false"
-            if property == "up" and "north" in block_properties and "tall" in block_properties["north"]:
-                # This is a wall, default to true instead
-                selected[property] = "true"
-            continue
-        if "none" in block_properties[property]:
-            selected[property] = "none"
-            continue
-        selected[property] = block_properties[property][0]
-
-    return selected
-
 def get_selected_properties(obj):
     """
     Return the properties which have been selected in obj as a dict
@@ -295,153 +136,23 @@ def get_selected_properties(obj):
     return selected
 
 
-def property_matches(selected_block_properties, when):
-    """
-    Return true if the selected block properties match the condition
-    in when.
-    """
-    for property_name, property_value in when.items():
-        property_values_split = property_value.split('|')
-        if property_name not in selected_block_properties:
-            return False
-        if selected_block_properties[property_name] not in property_values_split:
-            return False
-    return True
-
-
-def get_part_model(part, selected_block_properties):
-    """
-    Return the model in when 
-    """
-    when = part.get("when", None)
-    if when:
-        if "AND" in when:
-            for w in when["AND"]:
-                if not property_matches(selected_block_properties, w):
-                    return None
-            return part["apply"]
-        elif "OR" in when:
-            for w in when["OR"]:
-                if property_matches(selected_block_properties, w):
-                    return(part["apply"])
-        else:
-            if property_matches(selected_block_properties, when):
-                return part["apply"]
-    else:
-        return part["apply"]
-
-
-def get_outer_model_data(blockstate, selected_block_properties):
-    """
-    Return a list of model jsons corresponding to the
-    selected block properties as defined in blockstate.
-
-    This is a list because multipart blocks may have several models.
-    """
-    if "variants" in blockstate:
-        variant_string = ""
-        for property, value in selected_block_properties.items():
-            variant_string = variant_string + property + "=" + value + ","
-        variant_string = variant_string[:-1]
-        for variant in blockstate["variants"]:
-            if variant == variant_string:
-                return [blockstate["variants"][variant]]
-        return []
-    elif "multipart" in blockstate:
-        part_list = []
-        for part in blockstate["multipart"]:
-            part_model = get_part_model(part, selected_block_properties)
-            if part_model: part_list.append(part_model)
-        return part_list
-    
-
-def generate_default_uvs(from_vector, to_vector):
-    """
-    uv format is [x1, y1, x2, y2]
-    """
-    f = Vector((from_vector.x, -from_vector.y, from_vector.z))*16
-    t = Vector((to_vector.x, -to_vector.y, to_vector.z))*16
-
-    face_uvs = {}
-
-    face_uvs["down"] = [f.x, 16-t.y, t.x, 16-f.y]
-    face_uvs["up"] = [f.x, f.y, t.x, t.y]
-    face_uvs["west"] = [f.y, 16-t.z, t.y, 16-f.z]
-    face_uvs["east"] = [16-t.y, 16-t.z, 16-f.y, 16-f.z]
-    face_uvs["south"] = [f.x, 16-t.z, t.x, 16-f.z]
-    face_uvs["north"] = [16-t.x, 16-t.z, 16-f.x, 16-f.z]
-        
-        
-    return face_uvs
-
-
-def build_model(obj, outer_model_data, model_data):
+def build_model(obj, outer_model_data, model_data, culled_faces=frozenset()):
     """
     Add the transformed cubes from the elements of model_data
     to the mesh data in obj.
 
-    TODO:
-    Refactor this out into several sub functions
-
     outer_model_data contains the rotation.
-    """
-    # Identity matrix, no rotation by default
-    model_rotation = Matrix.Rotation(0, 4, 'X')
-
-    # We get the model rotation from the variant data
-    # Note that the order the rotation is applied is relevant,
-    # and that there are no rotations in the Minecraft z direction
-    for key in reversed(list(outer_model_data)):
-        if key == 'x':
-            part_rotation_matrix = Matrix.Rotation(-radians(outer_model_data[key]), 4, 'X')
-        elif key == 'y':
-            part_rotation_matrix = Matrix.Rotation(-radians(outer_model_data[key]), 4, 'Z')
-        else:
-            continue
-        model_rotation = model_rotation @ part_rotation_matrix
-
-    # While this model data has a valid parent, we combine it with its parent to get all data
-    # We do not need gui data from block/block
-    while "parent" in model_data.keys() and model_data["parent"] != "block/block":
-        parent_name = model_data["parent"].split("/")[-1]
-        parent_data = data_loader.get_data("block_models", parent_name)
-        del model_data["parent"]
-
-        for key in parent_data.keys():
-            # Special case for textures where we gather texture data into one dict
-            if key == "textures" and "textures" in model_data:
-                tmp_textures = parent_data["textures"]
-
-                for texture_name in tmp_textures:
-                    texture_value = tmp_textures[texture_name]
-
-                    # If this texture is a reference to another texture, we go find that other texture
-                    if '#' in texture_value:
-                        tmp_textures[texture_name] = model_data["textures"].get(texture_value.strip('#'))
-                    else:
-                        tmp_textures[texture_name] = texture_value
 
-                for texture_name in model_data["textures"]:
-                    if texture_name not in tmp_textures:
-                        tmp_textures[texture_name] = model_data["textures"][texture_name]
-
-                model_data[key] = tmp_textures
-
-            # Otherwise, we just put the parent non-display data into the model data
-            elif key != "display":
-                model_data[key] = parent_data[key]
+    Faces with a cullface pointing in one of the culled_faces directions
+    (after the variant rotation) are left out.
+    """
+    model_data = resolve_model(model_data)
 
     # If there is no model (air) we return
     if "elements" not in model_data.keys():
         return
 
-    # Replacing '#' variables in data with the correct values
-    replace_textures(model_data["elements"], model_data["textures"])
-
-    # Some textures have "minecraft:" in them, others do not, we make this
-    # consistent
-    for texture_name in model_data["textures"]:
-        model_data["textures"][texture_name] = model_data["textures"][texture_name].replace("minecraft:", "")
+    prepare_model_textures(model_data)
 
     # We can now update the materials we need for out object
     materials = create_materials(model_data["textures"])
@@ -449,68 +160,26 @@ def build_model(obj, outer_model_data, model_data):
         if material.name not in [m.name for m in obj.data.materials]:
             obj.data.materials.append(material)
 
-    elements = model_data["elements"]
-
-    # Converting Minecraft coordinates into Blender coordinates
-    convert_elements_coordinates(elements)
-
-    # We now create the model from the list of elements
-    # We need to be in edit mode to add meshes
-    bpy.ops.object.mode_set(mode='EDIT')
-
-    for element in elements:
-        mesh = bpy.context.edit_object.data
-        bm = bmesh.from_edit_mesh(mesh)
-
-        from_vector = element["from"]
-        to_vector = element["to"]
-
-        # This constructs a rectangular prism from "from_vector" to "to_vector"
-        verts = [
-            bm.verts.new(from_vector),
-            bm.verts.new(Vector((from_vector.x, from_vector.y, to_vector.z))),
-            bm.verts.new(Vector((to_vector.x, from_vector.y, from_vector.z))),
-            bm.verts.new(Vector((to_vector.x, from_vector.y, to_vector.z))),
-            bm.verts.new(Vector((from_vector.x, to_vector.y, from_vector.z))),
-            bm.verts.new(Vector((from_vector.x, to_vector.y, to_vector.z))),
-            bm.verts.new(Vector((to_vector.x, to_vector.y, from_vector.z))),
-            bm.verts.new(to_vector),
-        ]
-
-        default_uvs = generate_default_uvs(from_vector, to_vector)
-
-        # Fill in correct faces if they are present
-        face_vertex_mapping = {
-            "down":  (0, 2, 6, 4),
-            "up":    (5, 7, 3, 1),
-            "west":  (0, 4, 5, 1),
-            "east":  (6, 2, 3, 7),
-            "south": (4, 6, 7, 5),
-            "north": (2, 0, 1, 3)
-        }
-
-        for face_name, face_vertices in face_vertex_mapping.items():
-            if face_name in element["faces"]:
-                face = bm.faces.new((verts[i] for i in face_vertices))
-                
-                face_data = element["faces"][face_name]
-                material = obj.data.materials[face_data["texture"]]
-                material_index = materials.index(material)
-                image_size = material.node_tree.nodes.get("Image Texture", None).image.size
-                update_face_material(face, material_index, image_size, bm, face_data.get("uv", default_uvs[face_name]))
-
-        # Element rotation, rotation may be defined for a single element
-        if "rotation" in element:
-            rotation_matrix, cent = convert_element_rotation(element["rotation"])
-            bmesh.ops.rotate(bm, verts=verts, cent=cent, matrix=rotation_matrix)
-            # if element["rotation"]["rescale"]:
-            #     scale_factor = Vector((1.4142, 1.4142, 1))
-            #     bmesh.ops.scale(bm, vec=scale_factor, verts=verts)
-
-        # Variant rotation, rotation defined for the whole block, and applied to all elements
-        bmesh.ops.rotate(bm, verts=verts, cent=(0.5, -0.5, 0.5), matrix=model_rotation)
-
-    bpy.ops.object.mode_set(mode='OBJECT')
+    # We now create the model from the geometry of its elements
+    # The mesh is edited directly through bmesh, so that no mode switching is needed
+    mesh = obj.data
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+
+    for vertices, faces in get_model_geometry(outer_model_data, model_data, culled_faces):
+        verts = [bm.verts.new(vertex) for vertex in vertices]
+
+        for face_vertices, texture, uv in faces:
+            face = bm.faces.new((verts[i] for i in face_vertices))
+
+            material = obj.data.materials[texture]
+            material_index = materials.index(material)
+            image_size = material.node_tree.nodes.get("Image Texture", None).image.size
+            update_face_material(face, material_index, image_size, bm, uv)
+
+    bm.to_mesh(mesh)
+    bm.free()
+    mesh.update()
 
 
 def update_block_properties(obj, selected_block_properties, block_properties=None, update_property=None):
@@ -538,17 +207,10 @@ def update_block_properties(obj, selected_block_properties, block_properties=Non
             tmp_block_prop["value"] = selected_block_properties[property]
 
 
-def change_block_type(self, context):
+def set_block_type(objects, block_type):
     """
-    Called when block type is changed.
-
-    Change the model and data of the selected blocks to have the same
-    model and data as the selected block type in the active block.
+    Change the model and data of objects to the default state of block_type
     """
-    block_type = self["block_type"]
-    selected = context.selected_objects
-    active = context.active_object
-
     blockstate = data_loader.get_data("blockstates", block_type)
     
     block_properties = build_properties_dict(blockstate)
@@ -557,15 +219,36 @@ def change_block_type(self, context):
 
     outer_model_data = get_outer_model_data(blockstate, selected_block_properties)
 
-    # Then we update the block properties and visuals of all selected blocks,
-    # starting with the active object
-    for obj in [active] + [o for o in selected if o != active]:
+    for obj in objects:
         obj.mcbde["block_type"] = block_type
+        obj.mcbde["model_choice"] = 0
 
         update_block_properties(obj, selected_block_properties, block_properties)
 
         change_block_visuals(obj, outer_model_data)
 
+        block_registry.update_object(obj)
+
+
+def change_block_type(self, context):
+    """
+    Called when block type is changed.
+
+    Change the model and data of the selected blocks to have the same
+    model and data as the selected block type in the active block.
+    """
+    block_type = self["block_type"]
+    selected = context.selected_objects
+    active = context.active_object
+
+    # Update the block properties and visuals of all selected blocks,
+    # starting with the active object
+    set_block_type([active] + [o for o in selected if o != active], block_type)
+
+    # Neighbours may need to cull more or fewer faces now
+    if context.scene.mcbde.face_culling:
+        refresh_face_culling_around([active] + [o for o in selected if o != active])
+
     for obj in selected:
         obj.select_set(True)
     context.view_layer.objects.active = active
@@ -592,66 +275,230 @@ def change_block_variant(self, context):
 
         blockstate = data_loader.get_data("blockstates", block_type)
 
-        
         update_block_properties(obj, selected_block_properties, update_property=self.name)
 
         selected_block_properties = get_selected_properties(obj)
 
         outer_model_data = get_outer_model_data(blockstate, selected_block_properties)
 
+        # The model choice picked from the random models of the previous
+        # variant, so blocks with random models draw again from the new ones
+        if obj.mcbde.model_choice and outer_model_data is not None:
+            obj.mcbde["model_choice"] = int(sample_model_choices(outer_model_data, [obj.name], context.scene.mcbde.random_model_seed)[0])
+
+        block_registry.update_object(obj)
+
         if outer_model_data is None:
             continue
 
         change_block_visuals(obj, outer_model_data)
-    
+
+    # Neighbours may need to cull more or fewer faces now
+    if context.scene.mcbde.face_culling:
+        refresh_face_culling_around([active] + [o for o in selected if o != active])
+
     for obj in selected:
         obj.select_set(True)
     context.view_layer.objects.active = active
 
 
-def change_block_visuals(obj, outer_model_data):
-    """
-    
+def change_block_visuals(obj, outer_model_data, culled_faces=None, use_library=True):
     """
-    deselect_all_except(obj)
-    bpy.context.view_layer.objects.active = obj
+    Change the mesh of obj to the model of its block state, reusing an
+    existing mesh of the same block state if there is one.
 
+    Random models are picked by the model choice of obj, see choose_models.
+
+    If use_library is set and the mesh has not been created yet, it is linked
+    from the asset library of the game version if the library has it.
+
+    If culled_faces is not given, the faces to cull are found from the
+    neighbours of obj when face culling is enabled.
+    """
+    if culled_faces is None:
+        culled_faces = get_culled_faces(obj)
 
     variant_name = ""
     for block_property in obj.mcbde.block_properties:
         variant_name = variant_name + block_property.name + "=" + block_property.value + ","
     mesh_name = obj.mcbde.block_type + "-" + variant_name[:-1]
 
+    # Blocks which picked other random models need their own mesh
+    model_choice = obj.mcbde.model_choice
+    if model_choice:
+        mesh_name = mesh_name + "@" + str(model_choice)
+
+    # Meshes with culled faces are only shared with blocks with the same culled faces
+    culled_faces_code = get_culled_faces_code(culled_faces)
+    if culled_faces_code:
+        mesh_name = mesh_name + "#cull-" + culled_faces_code
+    obj["mcbde_culled_faces"] = culled_faces_code
+
     # Check if this model has already been created in the scene and reference it
     # However, we allow the object to refresh its own mesh
-    for m in bpy.data.meshes:
-        if m.name == mesh_name and m.name != obj.data.name:
-            obj.data = m
+    existing_mesh = bpy.data.meshes.get(mesh_name)
+    if existing_mesh is not None and existing_mesh.name != obj.data.name:
+        obj.data = existing_mesh
+        profiler.count_cache("scene meshes", True)
+        return
+    profiler.count_cache("scene meshes", False)
+
+    if obj.data.name == mesh_name and obj.data.library is not None:
+        # Linked library meshes cannot be rebuilt, and are already up to date
+        return
+
+    if use_library and obj.data.name != mesh_name:
+        library_mesh = load_library_mesh(mesh_name)
+        profiler.count_cache("asset library", library_mesh is not None)
+        if library_mesh is not None:
+            obj.data = library_mesh
             return
-        
-    if mesh_name not in [m.name for m in bpy.data.meshes]:
+
+    if existing_mesh is None:
         # If this mesh does not exist, then we will need to create a new mesh
         obj.data = None
         mesh = bpy.data.meshes.new(name=mesh_name)
         obj.data = mesh
     else:
         # If it does exist, we overwrite it
-        bpy.ops.object.mode_set(mode='EDIT')
-        mesh = bpy.context.edit_object.data
-        bm = bmesh.from_edit_mesh(mesh)
-        bmesh.ops.delete(bm, geom=bm.verts, context='VERTS')
-        bmesh.update_edit_mesh(mesh)
-        bpy.ops.object.mode_set(mode='OBJECT')
+        obj.data.clear_geometry()
 
     obj.data.materials.clear()
 
-    for model in outer_model_data:
-        # If there are random variations, take the first one
-        if isinstance(model, list):
-            model = model[0]
-
+    for model in choose_models(outer_model_data, model_choice):
         model_name = model["model"].split('/')[-1]
 
         model_data = data_loader.get_data("block_models", model_name)
 
-        build_model(obj, model, model_data)
\ No newline at end of file
+        build_model(obj, model, model_data, culled_faces)
+
+
+# Cache of whether each block state is an opaque full cube, used for face culling
+opaque_state_cache = {}
+
+
+def is_opaque_block_object(obj):
+    state_key = (obj.mcbde.block_type, tuple(get_selected_properties(obj).items()))
+    profiler.count_cache("opaque states", state_key in opaque_state_cache)
+    if state_key not in opaque_state_cache:
+        opaque_state_cache[state_key] = is_opaque_full_cube(obj.mcbde.block_type, get_selected_properties(obj))
+    return opaque_state_cache[state_key]
+
+
+def get_culled_faces(obj):
+    """
+    Return the set of directions in which obj touches an opaque full block,
+    so that faces with a cullface in that direction are hidden.
+
+    This is always empty if face culling is disabled in the scene.
+    """
+    if not bpy.context.scene.mcbde.face_culling:
+        return frozenset()
+
+    cell = get_object_cell(obj)
+    if cell is None:
+        return frozenset()
+
+    def is_opaque_cell(neighbour_cell):
+        neighbour = block_grid.get_object(neighbour_cell)
+        return neighbour is not None and neighbour != obj and is_opaque_block_object(neighbour)
+
+    return get_culled_directions(cell, is_opaque_cell)
+
+
+def get_culled_faces_code(culled_faces):
+    """
+    Return a short string identifying the set of culled faces, such as "dun"
+    for down, up and north.
+    """
+    return "".join(direction[0] for direction in DIRECTION_OFFSETS if direction in culled_faces)
+
+
+def refresh_face_culling(objects):
+    """
+    Rebuild the meshes of the block objects whose culled faces have changed
+    """
+    for obj in objects:
+        if obj.type != 'MESH' or not obj.mcbde or obj.mcbde.block_type in [""]:
+            continue
+
+        culled_faces = get_culled_faces(obj)
+        if get_culled_faces_code(culled_faces) == obj.get("mcbde_culled_faces", ""):
+            continue
+
+        blockstate = data_loader.get_data("blockstates", obj.mcbde.block_type)
+        if blockstate is None:
+            continue
+        outer_model_data = get_outer_model_data(blockstate, get_selected_properties(obj))
+        if outer_model_data is None:
+            continue
+
+        change_block_visuals(obj, outer_model_data, culled_faces)
+
+
+def refresh_face_culling_around(objects, changed_cells=None):
+    """
+    Update the grid positions of objects, and refresh the face culling of
+    objects and of all blocks next to where they were or are now.
+
+    If the grid was already updated, the old and new cells of the objects
+    are given as changed_cells.
+    """
+    if changed_cells is None:
+        changed_cells = set()
+        for obj in objects:
+            changed_cells |= block_grid.update_object(obj)
+
+    affected = {obj.name: obj for obj in objects}
+    for cell in changed_cells:
+        for neighbour in block_grid.get_neighbours(cell).values():
+            affected[neighbour.name] = neighbour
+
+    refresh_face_culling(affected.values())
+
+
+def update_face_culling(self, context):
+    """
+    Called when face culling is enabled or disabled in the scene.
+    """
+    opaque_state_cache.clear()
+    block_grid.rebuild(context.scene)
+    refresh_face_culling(context.scene.objects)
+
+
+is_updating_face_culling = False
+
+
+@persistent
+def face_culling_depsgraph_handler(scene, depsgraph):
+    """
+    Refresh the face culling around blocks which have been moved
+    """
+    global is_updating_face_culling
+
+    if is_updating_face_culling or not data_loader.is_initialized() or not scene.mcbde.face_culling:
+        return
+
+    moved = []
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Object) and update.is_updated_transform:
+            obj = update.id.original
+            if obj.type == 'MESH' and obj.mcbde and obj.mcbde.block_type not in [""]:
+                moved.append(obj)
+
+    if not moved:
+        return
+
+    is_updating_face_culling = True
+    try:
+        refresh_face_culling_around(moved, block_grid.changed_cells)
+    finally:
+        is_updating_face_culling = False
+
+
+@persistent
+def face_culling_load_handler(*args):
+    opaque_state_cache.clear()
+    block_grid.clear()
+    if bpy.context.scene and bpy.context.scene.mcbde.face_culling:
+        block_grid.rebuild(bpy.context.scene)
@@ -0,0 +1,51 @@
+"""
+Picking random models for blocks whose block state has several weighted
+models, such as stone and grass blocks, so that builds do not look tiled.
+
+The model of each object is drawn from the weights in the blockstate file,
+using a hash of the seed and the object name, so the same seed always picks
+the same models. Objects are grouped by block state, and the models of each
+group are drawn at once.
+
+The game shows the same model for every block display, so this only
+changes how the build looks in Blender.
+"""
+from .data_loader import data_loader
+from .block_registry import is_block_object, get_state_key
+from .core.blockstates import get_outer_model_data, get_model_weights
+from .core.random_models import sample_model_choices
+from .properties_util import get_selected_properties, change_block_visuals
+
+
+def randomize_models(objects, seed):
+    """
+    Pick a random model for every block object in objects, or the first
+    model if seed is None.
+
+    Returns the number of objects which have random models to pick from.
+    """
+    groups = {}
+    for obj in objects:
+        if is_block_object(obj):
+            groups.setdefault((obj.mcbde.block_type, get_state_key(obj)), []).append(obj)
+
+    randomized = 0
+    for (block_type, _), group in groups.items():
+        blockstate = data_loader.get_data("blockstates", block_type)
+        outer_model_data = get_outer_model_data(blockstate, get_selected_properties(group[0]))
+        if not outer_model_data or all(len(weights) == 1 for weights in get_model_weights(outer_model_data)):
+            continue
+
+        if seed is None:
+            choices = [0] * len(group)
+        else:
+            choices = sample_model_choices(outer_model_data, [obj.name for obj in group], seed).tolist()
+
+        # Objects with the same choice share the mesh built for the first of them
+        for obj, choice in zip(group, choices):
+            obj.mcbde["model_choice"] = choice
+            change_block_visuals(obj, outer_model_data)
+        randomized += len(group)
+
+    return randomized
+
@@ -0,0 +1,251 @@
+"""
+A minimal client for the Minecraft RCON protocol, used to send commands
+straight to a running server.
+"""
+import queue
+import socket
+import struct
+import threading
+
+PACKET_TYPE_RESPONSE = 0
+PACKET_TYPE_COMMAND = 2
+PACKET_TYPE_LOGIN = 3
+# Not a real packet type, the server answers it with an error message
+PACKET_TYPE_END = 200
+
+# The vanilla server reads each request with a single read into a 1460 byte buffer, which
+# leaves this much for the command. Requests arriving together in one read drop the connection.
+MAX_COMMAND_LENGTH = 1446
+
+# The vanilla server splits responses into packets with bodies of at most this many bytes
+MAX_RESPONSE_LENGTH = 4096
+
+
+class RconError(Exception):
+    pass
+
+
+class RconClient:
+    """
+    A persistent connection to an RCON server.
+
+    The vanilla server expects exactly one packet in each read of the socket,
+    so only one request is ever in flight: each command is sent on its own,
+    and its whole response is read before the next one is sent.
+    """
+
+    def __init__(self, host, port, password, timeout=5.0, retries=2):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self.retries = retries
+        self.socket = None
+        self.next_request_id = 1
+
+
+    def connect(self):
+        self.close()
+        self.socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        request_id = self.get_request_id()
+        self.socket.sendall(encode_packet(request_id, PACKET_TYPE_LOGIN, self.password))
+        response_id, _, _ = self.read_packet()
+        if response_id == -1:
+            self.close()
+            raise RconError("RCON authentication failed, check the password")
+
+
+    def close(self):
+        if self.socket is not None:
+            try:
+                self.socket.close()
+            except OSError:
+                pass
+            self.socket = None
+
+
+    def is_connected(self):
+        return self.socket is not None
+
+
+    def get_request_id(self):
+        request_id = self.next_request_id
+        # Request ids are signed 32 bit, and -1 means failed authentication
+        self.next_request_id = self.next_request_id % 0x7fffffff + 1
+        return request_id
+
+
+    def read_exactly(self, length):
+        data = bytearray()
+        while len(data) < length:
+            chunk = self.socket.recv(length - len(data))
+            if not chunk:
+                raise ConnectionError("RCON connection closed by the server")
+            data.extend(chunk)
+        return bytes(data)
+
+
+    def read_packet(self):
+        """
+        Read a packet and return its request id, type and body as bytes
+        """
+        (length,) = struct.unpack("<i", self.read_exactly(4))
+        data = self.read_exactly(length)
+        request_id, packet_type = struct.unpack("<ii", data[:8])
+        return request_id, packet_type, data[8:-2]
+
+
+    def send_command(self, command):
+        """
+        Send one command and return its response
+        """
+        request_id = self.get_request_id()
+        self.socket.sendall(encode_packet(request_id, PACKET_TYPE_COMMAND, command))
+
+        response_id, _, body = self.read_packet()
+        while response_id != request_id:
+            response_id, _, body = self.read_packet()
+        response = body
+
+        if len(body) >= MAX_RESPONSE_LENGTH:
+            # The response may go on in more packets with the same id. The server answers
+            # requests in order, so the answer to a request of an unknown type marks its end.
+            # It is only sent now, so that it arrives on its own.
+            end_request_id = self.get_request_id()
+            self.socket.sendall(encode_packet(end_request_id, PACKET_TYPE_END, ""))
+            while True:
+                response_id, _, body = self.read_packet()
+                if response_id == end_request_id:
+                    break
+                if response_id == request_id:
+                    response += body
+
+        return response.decode("utf-8", errors="replace")
+
+
+    def send_commands(self, commands):
+        """
+        Send all of the commands, reconnecting and retrying on connection errors.
+
+        A command which failed is sent again, so it may run twice if the
+        connection dropped after the server received it.
+
+        Returns the list of responses.
+        """
+        commands = [command.removeprefix("/") for command in commands]
+        for command in commands:
+            if len(command.encode("utf-8")) > MAX_COMMAND_LENGTH:
+                raise RconError(f"Command of {len(command.encode('utf-8'))} bytes is longer than the {MAX_COMMAND_LENGTH} bytes RCON allows")
+
+        responses = []
+        for command in commands:
+            for attempt in range(self.retries + 1):
+                try:
+                    if not self.is_connected():
+                        self.connect()
+                    responses.append(self.send_command(command))
+                    break
+                except (OSError, ConnectionError, struct.error) as e:
+                    self.close()
+                    if attempt == self.retries:
+                        raise RconError(f"Could not send commands to {self.host}:{self.port}: {e}") from e
+
+        return responses
+
+
+def encode_packet(request_id, packet_type, body):
+    payload = struct.pack("<ii", request_id, packet_type) + body.encode("utf-8") + b"\x00\x00"
+    return struct.pack("<i", len(payload)) + payload
+
+
+class RconSender:
+    """
+    Sends commands from a background thread, so that Blender does not wait
+    for the server.
+
+    Only one job, a list of commands, is sent at a time, one command after
+    another, so commands wait here rather than on the socket. A new job is
+    refused without waiting while one is being sent, so that the caller can
+    fold later changes into its next job instead of queueing them up.
+    Each job may carry a state under a key, which is kept in states once
+    all of its commands were delivered, and forgotten if sending failed.
+    The results of finished jobs are collected with get_results.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.states = {}
+        # Only changed by send and get_results, on the thread which uses the sender
+        self.is_busy = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+
+    def send(self, commands, key=None, state=None):
+        """
+        Start sending the commands, and return whether they were accepted
+        """
+        if self.is_busy:
+            return False
+        self.is_busy = True
+        self.jobs.put((commands, key, state))
+        return True
+
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+
+            commands, key, state = job
+            try:
+                self.client.send_commands(commands)
+            except RconError as e:
+                # Some of the commands may have run, so the server no longer matches any state
+                self.states.pop(key, None)
+                self.results.put((key, str(e)))
+            else:
+                if key is not None:
+                    self.states[key] = state
+                self.results.put((key, None))
+
+        self.client.close()
+
+
+    def get_results(self):
+        """
+        Return a (key, error) pair for each job finished since the last call,
+        where error is None if all of its commands were delivered
+        """
+        results = []
+        while not self.results.empty():
+            results.append(self.results.get())
+            self.is_busy = False
+        return results
+
+
+    def stop(self):
+        self.jobs.put(None)
+        self.thread.join(timeout=self.client.timeout)
+
+
+# Senders are kept open between syncs, one for each server
+senders = {}
+
+
+def get_sender(host, port, password):
+    key = (host, port, password)
+    if key not in senders or not senders[key].thread.is_alive():
+        senders[key] = RconSender(RconClient(host, port, password))
+    return senders[key]
+
+
+def stop_senders():
+    for sender in senders.values():
+        sender.stop()
+    senders.clear()
@@ -0,0 +1,215 @@
+"""
+Estimating the in game cost of the blocks in a scene.
+
+Every block becomes a block display entity, and the game renders every
+face of its model as a quad, so the entity and quad counts decide how
+expensive a model is for clients.
+
+The block states are counted per object, and after the scene changes only
+the objects which changed, were added or were removed are counted again. The quads and command length
+of each block state are cached, so drawing the statistics is cheap.
+
+The figures are for the blocks as they are in the scene, before the
+optimisations of the export, which can only lower the entity count.
+"""
+import collections
+import bpy
+from bpy.app.handlers import persistent
+
+from .data_loader import data_loader
+from .core.commands import format_passenger, format_command
+from .core.coordinates import ORIGIN_LOCATION
+from .instancing_util import is_instancer, get_instancer_states, get_instance_arrays
+from .block_registry import is_block_object, get_state_key
+from .properties_util import get_block_models
+
+# The transformation used to estimate the length of each passenger
+IDENTITY_TRANSFORMATION = [[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0], [0.0, 0.0, 0.0, 1.0]]
+
+# Cached per block state, for each loaded jar
+state_quads_cache = {}
+state_length_cache = {}
+
+# Scene name to the counts of its block states
+scene_statistics = {}
+
+
+def get_state_quads(block_type, properties):
+    """
+    Return the number of faces in the models of a block state
+    """
+    cache = state_quads_cache.setdefault(data_loader.minecraft_location, {})
+    state_key = (block_type, properties)
+    if state_key not in cache:
+        quads = 0
+        for _, model_data in get_block_models(block_type, dict(properties)):
+            quads += sum(len(element.get("faces", {})) for element in model_data.get("elements", []))
+        cache[state_key] = quads
+    return cache[state_key]
+
+
+def get_state_length(block_type, properties, compact):
+    """
+    Return the estimated length of a passenger of a block state in the
+    command, including the separating comma
+    """
+    state_key = (block_type, properties, compact)
+    if state_key not in state_length_cache:
+        passenger = {"block_type": block_type, "properties": dict(properties), "transformation": IDENTITY_TRANSFORMATION}
+        state_length_cache[state_key] = len(format_passenger(passenger, compact)) + 1
+    return state_length_cache[state_key]
+
+
+def count_object_states(obj):
+    """
+    Return a Counter of the (block_type, properties) of obj, or of the points
+    of an instancer, with properties in the canonical order of the block registry
+    """
+    counts = collections.Counter()
+    if obj is None:
+        return counts
+
+    if is_instancer(obj):
+        states = get_instancer_states(obj)
+        state_indices = get_instance_arrays(obj)[0]
+        for state_index, count in collections.Counter(state_indices.tolist()).items():
+            if 0 <= state_index < len(states):
+                block_type, properties, _ = states[state_index]
+                counts[(block_type, tuple(sorted(dict(properties).items())))] += count
+    elif is_block_object(obj):
+        counts[(obj.mcbde.block_type, get_state_key(obj))] += 1
+    return counts
+
+
+class SceneStatistics:
+    """
+    The block states of the blocks in a scene, counted per object so that
+    only the objects which changed have to be counted again.
+
+    Objects are identified by their session uid, which stays the same when
+    they are renamed.
+    """
+
+    def __init__(self):
+        self.object_counts = {}
+        self.counts = collections.Counter()
+        self.uids = set()
+        # Objects were linked, unlinked or deleted, so the scene has to be compared with uids
+        self.is_membership_changed = True
+
+
+    def set_object_counts(self, uid, counts):
+        for state, count in self.object_counts.pop(uid, {}).items():
+            self.counts[state] -= count
+            # Drop the states no block has any more
+            if self.counts[state] <= 0:
+                del self.counts[state]
+        if counts:
+            self.object_counts[uid] = counts
+            self.counts.update(counts)
+
+
+    def update_object(self, obj):
+        if obj.session_uid in self.uids:
+            self.set_object_counts(obj.session_uid, count_object_states(obj))
+
+
+    def update_membership(self, scene):
+        """
+        Count the objects added to the scene and forget the removed ones
+        """
+        objects = {obj.session_uid: obj for obj in scene.objects}
+        for uid in self.uids - objects.keys():
+            self.set_object_counts(uid, None)
+        for uid in objects.keys() - self.uids:
+            self.set_object_counts(uid, count_object_states(objects[uid]))
+        self.uids = set(objects)
+        self.is_membership_changed = False
+
+
+def compute_statistics(counts, compact):
+    return {
+        "entities": sum(counts.values()),
+        "block_states": len(counts),
+        "quads": sum(count * get_state_quads(block_type, properties) for (block_type, properties), count in counts.items()),
+        "command_length": len(format_command([], ORIGIN_LOCATION, compact)) + sum(
+            count * get_state_length(block_type, properties, compact) for (block_type, properties), count in counts.items()
+        ),
+    }
+
+
+def get_statistics(scene):
+    """
+    Return the statistics of the scene, counting all blocks the first time
+    """
+    statistics = scene_statistics.setdefault(scene.name, SceneStatistics())
+    if statistics.is_membership_changed:
+        statistics.update_membership(scene)
+    return compute_statistics(statistics.counts, scene.mcbde.compact_output)
+
+
+def get_skipped_optimizations(scene_properties):
+    """
+    Return the names of the enabled export optimisations which the
+    statistics do not take into account
+    """
+    optimizations = [
+        ("merge_blocks", "merging"),
+        ("cull_hidden_blocks", "culling"),
+        ("remove_duplicates", "duplicate removal"),
+        ("chunked_export", "chunking"),
+        ("culling_boxes", "culling boxes"),
+    ]
+    return [name for setting, name in optimizations if getattr(scene_properties, setting)]
+
+
+def get_budget_warnings(statistics, scene_properties):
+    """
+    Return a message for every statistic which is over its budget
+    """
+    warnings = []
+    if statistics["entities"] > scene_properties.budget_entities:
+        warnings.append(f"{statistics['entities']} entities is over the budget of {scene_properties.budget_entities}")
+    if statistics["quads"] > scene_properties.budget_quads:
+        warnings.append(f"{statistics['quads']} quads is over the budget of {scene_properties.budget_quads}")
+    if statistics["command_length"] > scene_properties.budget_command_length:
+        warnings.append(f"The command of about {statistics['command_length']} characters is over the budget of {scene_properties.budget_command_length}")
+    return warnings
+
+
+def update_statistics(self, context):
+    scene_statistics.clear()
+
+
+@persistent
+def statistics_depsgraph_handler(scene, depsgraph):
+    """
+    Count the objects which changed in a way other than moving again
+    """
+    if not scene.mcbde.show_statistics or not scene_statistics:
+        return
+
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Object):
+            if update.is_updated_transform and not update.is_updated_geometry:
+                continue
+            for statistics in scene_statistics.values():
+                statistics.update_object(update.id.original)
+        elif isinstance(update.id, (bpy.types.Collection, bpy.types.Scene)):
+            for statistics in scene_statistics.values():
+                statistics.is_membership_changed = True
+
+
+@persistent
+def statistics_load_handler(dummy):
+    scene_statistics.clear()
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(statistics_depsgraph_handler)
+    bpy.app.handlers.load_post.append(statistics_load_handler)
+
+
+def unregister():
+    bpy.app.handlers.load_post.remove(statistics_load_handler)
+    bpy.app.handlers.depsgraph_update_post.remove(statistics_depsgraph_handler)
@@ -0,0 +1,9 @@
+"""
+The tests only cover the modules which do not need Blender, the core package
+and the RCON client, so the add-on directory is put on sys.path to import
+them at the top level.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
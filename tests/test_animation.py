@@ -0,0 +1,15 @@
+from core.animation import build_animation_functions, get_culling_box_command
+
+
+def test_culling_box_command():
+    command = get_culling_box_command("my_model", "2f", "3f")
+    assert command == (
+        "execute as @e[type=minecraft:block_display,tag=my_model] run "
+        "data merge entity @s {width:2f,height:3f}"
+    )
+
+
+def test_setup_commands_run_first():
+    setup_commands = [get_culling_box_command("my_model", "2f", "3f")]
+    functions = build_animation_functions("anim", "ns", {}, [0], 0.01, str, setup_commands)
+    assert functions["anim/start"] == setup_commands
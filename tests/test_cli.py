@@ -0,0 +1,30 @@
+import json
+
+from cli import export_json_file
+
+
+IDENTITY = [[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]]
+
+
+def write_scene(path, settings):
+    passengers = [
+        {"name": name, "block_type": "stone", "properties": {}, "transformation": IDENTITY}
+        for name in ["Cube", "Cube 001"]
+    ]
+    path.write_text(json.dumps({"passengers": passengers, "settings": settings}))
+
+
+def test_export_json_tags_passengers(tmp_path):
+    write_scene(tmp_path / "rig.json", {"entity_tag": "rig"})
+    results = export_json_file(str(tmp_path / "rig.json"), str(tmp_path), "mcbde", False)
+
+    assert results[0]["passengers"] == 2
+    commands = (tmp_path / "rig.mcfunction").read_text()
+    assert 'Tags: ["rig", "rig.Cube"]' in commands
+    assert 'Tags: ["rig", "rig.Cube_001"]' in commands
+
+
+def test_export_json_without_tag(tmp_path):
+    write_scene(tmp_path / "rig.json", {})
+    export_json_file(str(tmp_path / "rig.json"), str(tmp_path), "mcbde", False)
+    assert "Tags" not in (tmp_path / "rig.mcfunction").read_text()
@@ -0,0 +1,148 @@
+import math
+
+import pytest
+
+from core.commands import (
+    format_number, decompose_transformation, compose_transformation,
+    format_compact_passenger, format_verbose_passenger,
+    add_passenger_tags, check_entity_tag,
+)
+
+IDENTITY = [[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]]
+
+
+def rotation_y(angle):
+    c, s = math.cos(angle), math.sin(angle)
+    return [[c, 0, s, 0], [0, 1, 0, 0], [-s, 0, c, 0], [0, 0, 0, 1]]
+
+
+def multiply(a, b):
+    return [[sum(a[row][k] * b[k][column] for k in range(4)) for column in range(4)] for row in range(4)]
+
+
+def scale_matrix(x, y, z):
+    return [[x, 0, 0, 0], [0, y, 0, 0], [0, 0, z, 0], [0, 0, 0, 1]]
+
+
+def assert_matrices_close(a, b):
+    for row_a, row_b in zip(a, b):
+        assert row_a == pytest.approx(row_b, abs=1e-9)
+
+
+@pytest.mark.parametrize("value, tolerance, expected", [
+    (0.0, 0.0001, "0"),
+    (-0.0, 0.0001, "0"),
+    (1.0, 0.0001, "1"),
+    (-1.0, 0.0001, "-1"),
+    (0.50002, 0.0001, ".5"),
+    (-0.25, 0.0001, "-.25"),
+    (0.0625, 0.0001, ".0625"),
+    (0.06251, 0.001, ".063"),
+    # On a tie in length, the value on the model pixel grid wins
+    (0.0624, 0.0002, ".0625"),
+    (0.3333333, 0.0001, ".3333"),
+    (2.9999999, 0.0001, "3"),
+    (1234567.0, 0.0001, "1234567"),
+    (0.1, 0, ".1"),
+])
+def test_format_number(value, tolerance, expected):
+    assert format_number(value, tolerance) == expected
+
+
+@pytest.mark.parametrize("value", [0.123456789, -3.14159265, 1e-9, 12.5])
+@pytest.mark.parametrize("tolerance", [0.01, 0.0001, 0])
+def test_format_number_within_tolerance(value, tolerance):
+    assert abs(float(format_number(value, tolerance)) - value) <= tolerance
+
+
+def test_decompose_identity():
+    assert decompose_transformation(IDENTITY) == {
+        "translation": [0, 0, 0],
+        "left_rotation": [0, 0, 0, 1],
+        "scale": [1, 1, 1],
+        "right_rotation": [0, 0, 0, 1],
+    }
+
+
+def test_decompose_rotation_scale_translation():
+    matrix = multiply(rotation_y(math.pi / 2), scale_matrix(2, 3, 0.5))
+    matrix[0][3], matrix[1][3], matrix[2][3] = 1, -2, 0.5
+
+    decomposed = decompose_transformation(matrix)
+    assert decomposed["translation"] == [1, -2, 0.5]
+    assert decomposed["scale"] == pytest.approx([2, 3, 0.5])
+    assert decomposed["left_rotation"] == pytest.approx([0, math.sqrt(0.5), 0, math.sqrt(0.5)])
+    assert decomposed["right_rotation"] == [0, 0, 0, 1]
+    assert_matrices_close(compose_transformation(decomposed), matrix)
+
+
+@pytest.mark.parametrize("angle", [0.3, math.pi / 2, math.pi, 3 * math.pi / 2, 2.9])
+def test_decompose_round_trip(angle):
+    matrix = multiply(rotation_y(angle), scale_matrix(1, 0.25, 4))
+    decomposed = decompose_transformation(matrix)
+    # The rotation is kept with a positive w
+    assert decomposed["left_rotation"][3] >= 0
+    assert_matrices_close(compose_transformation(decomposed), matrix)
+
+
+def test_decompose_mirrored():
+    matrix = scale_matrix(-1, 1, 1)
+    decomposed = decompose_transformation(matrix)
+    assert decomposed["scale"] == [-1, 1, 1]
+    assert decomposed["left_rotation"] == pytest.approx([0, 0, 0, 1])
+    assert_matrices_close(compose_transformation(decomposed), matrix)
+
+
+def test_decompose_shear():
+    matrix = [[1, 0.5, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]]
+    assert decompose_transformation(matrix) is None
+
+
+def test_decompose_zero_scale():
+    assert decompose_transformation(scale_matrix(1, 0, 1)) is None
+
+
+def test_render_fields():
+    passenger = {
+        "block_type": "stone",
+        "properties": {},
+        "transformation": IDENTITY,
+        "width": 2.50001,
+        "height": 1.0,
+        "view_range": 0.25,
+    }
+    assert format_compact_passenger(passenger, 0.0001, include_id=False) == \
+        "{block_state:{Name:stone},transformation:[1f,0f,0f,0f,0f,1f,0f,0f,0f,0f,1f,0f,0f,0f,0f,1f],width:2.5f,height:1f,view_range:.25f}"
+    assert format_verbose_passenger(passenger, include_id=False).endswith(", width: 2.5f, height: 1.0f, view_range: 0.25f}")
+
+
+def test_passenger_tags():
+    passengers = [{"name": "Cube.001"}, {"name": "Cube 002"}]
+    add_passenger_tags(passengers, "rig")
+    assert [passenger["tags"] for passenger in passengers] == [["rig", "rig.Cube.001"], ["rig", "rig.Cube_002"]]
+
+
+def test_passenger_tag_collisions():
+    passengers = [{"name": "Cube 001"}, {"name": "Cube_001"}, {"name": "Cube#001"}]
+    add_passenger_tags(passengers, "rig")
+    tags = [passenger["tags"][1] for passenger in passengers]
+    assert len(set(tags)) == 3
+    # The name which needed no replacing keeps its plain tag
+    assert tags[1] == "rig.Cube_001"
+    assert all(tag.startswith("rig.Cube_001.") for tag in tags[::2])
+
+    # Tags do not depend on the order of the passengers
+    reordered = passengers[::-1]
+    add_passenger_tags(reordered, "rig")
+    assert [passenger["tags"][1] for passenger in reordered] == tags[::-1]
+
+
+@pytest.mark.parametrize("entity_tag", ["rig", "my_rig.v2", "a+b-c", ""])
+def test_valid_entity_tags(entity_tag):
+    check_entity_tag(entity_tag)
+
+
+@pytest.mark.parametrize("entity_tag", ["my rig", "rig,other", "rig]", 'rig"'])
+def test_invalid_entity_tags(entity_tag):
+    with pytest.raises(ValueError):
+        check_entity_tag(entity_tag)
@@ -0,0 +1,174 @@
+import pytest
+
+from core.connections import get_connected_properties, get_stairs_shape
+
+FENCE = {"north": "false", "east": "false", "south": "false", "west": "false", "waterlogged": "false"}
+WALL = {"north": "none", "east": "none", "south": "none", "west": "none", "up": "true", "waterlogged": "false"}
+
+
+def stairs(facing, half="bottom"):
+    return ("oak_stairs", {"facing": facing, "half": half, "shape": "straight"})
+
+
+def get_neighbour_getter(neighbours):
+    return lambda direction: neighbours.get(direction)
+
+
+def is_opaque_full_cube(block_type, properties):
+    return block_type in ["stone", "oak_planks"]
+
+
+def get_shape(facing, neighbours, half="bottom"):
+    return get_stairs_shape(stairs(facing, half)[1], get_neighbour_getter(neighbours))
+
+
+def test_stairs_alone():
+    assert get_shape("north", {}) == "straight"
+
+
+@pytest.mark.parametrize("facing, front_facing, shape", [
+    ("north", "west", "outer_left"),
+    ("north", "east", "outer_right"),
+    ("east", "north", "outer_left"),
+    ("east", "south", "outer_right"),
+    ("south", "east", "outer_left"),
+    ("west", "south", "outer_left"),
+])
+def test_stairs_outer(facing, front_facing, shape):
+    assert get_shape(facing, {facing: stairs(front_facing)}) == shape
+
+
+@pytest.mark.parametrize("facing, back, back_facing, shape", [
+    ("north", "south", "west", "inner_left"),
+    ("north", "south", "east", "inner_right"),
+    ("east", "west", "north", "inner_left"),
+    ("south", "north", "west", "inner_right"),
+])
+def test_stairs_inner(facing, back, back_facing, shape):
+    assert get_shape(facing, {back: stairs(back_facing)}) == shape
+
+
+def test_stairs_same_axis():
+    assert get_shape("north", {"north": stairs("north"), "south": stairs("south")}) == "straight"
+
+
+def test_stairs_other_half():
+    assert get_shape("north", {"north": stairs("east", "top")}) == "straight"
+    assert get_shape("north", {"north": stairs("east", "top")}, "top") == "outer_right"
+
+
+def test_stairs_not_stairs():
+    assert get_shape("north", {"north": ("stone", {}), "south": ("oak_fence", FENCE)}) == "straight"
+
+
+def test_stairs_outer_blocked_by_parallel_stairs():
+    # The stairs beside would have to bend too, so the outer corner is not taken
+    neighbours = {"north": stairs("east"), "west": stairs("north")}
+    assert get_shape("north", neighbours) == "straight"
+
+
+def test_stairs_outer_before_inner():
+    neighbours = {"north": stairs("east"), "south": stairs("west")}
+    assert get_shape("north", neighbours) == "outer_right"
+
+
+def test_stairs_inner_blocked_by_parallel_stairs():
+    neighbours = {"south": stairs("east"), "east": stairs("north")}
+    assert get_shape("north", neighbours) == "straight"
+
+
+def test_stairs_properties():
+    block_type, properties = stairs("north")
+    connected = get_connected_properties(block_type, properties, get_neighbour_getter({"north": stairs("east")}), is_opaque_full_cube)
+    assert connected == dict(properties, shape="outer_right")
+    assert properties["shape"] == "straight"
+
+
+def test_fence():
+    neighbours = {
+        "north": ("oak_fence", FENCE),
+        "east": ("stone", {}),
+        "south": ("glass", {}),
+        "west": ("oak_fence_gate", {"facing": "north"}),
+    }
+    connected = get_connected_properties("oak_fence", FENCE, get_neighbour_getter(neighbours), is_opaque_full_cube)
+    assert connected == dict(FENCE, north="true", east="true", west="true")
+
+
+def test_fence_gate_in_line():
+    neighbours = {"west": ("oak_fence_gate", {"facing": "east"})}
+    connected = get_connected_properties("oak_fence", FENCE, get_neighbour_getter(neighbours), is_opaque_full_cube)
+    assert connected["west"] == "false"
+
+
+def test_nether_brick_fence():
+    neighbours = {"north": ("oak_fence", FENCE), "south": ("nether_brick_fence", FENCE)}
+    connected = get_connected_properties("nether_brick_fence", FENCE, get_neighbour_getter(neighbours), is_opaque_full_cube)
+    assert connected == dict(FENCE, south="true")
+
+
+def test_pane():
+    neighbours = {"north": ("iron_bars", FENCE), "east": ("cobblestone_wall", WALL), "south": ("oak_fence", FENCE)}
+    connected = get_connected_properties("glass_pane", FENCE, get_neighbour_getter(neighbours), is_opaque_full_cube)
+    assert connected == dict(FENCE, north="true", east="true")
+
+
+def test_straight_wall():
+    neighbours = {"north": ("stone", {}), "south": ("cobblestone_wall", WALL)}
+    connected = get_connected_properties("cobblestone_wall", WALL, get_neighbour_getter(neighbours), is_opaque_full_cube)
+    assert connected == dict(WALL, north="low", south="low", up="false")
+
+
+def test_wall_corner_has_post():
+    neighbours = {"north": ("stone", {}), "east": ("cobblestone_wall", WALL)}
+    connected = get_connected_properties("cobblestone_wall", WALL, get_neighbour_getter(neighbours), is_opaque_full_cube)
+    assert connected == dict(WALL, north="low", east="low", up="true")
+
+
+def test_isolated_wall_has_post():
+    connected = get_connected_properties("cobblestone_wall", WALL, get_neighbour_getter({}), is_opaque_full_cube)
+    assert connected == WALL
+
+
+def test_wall_junctions():
+    neighbours = {direction: ("cobblestone_wall", WALL) for direction in ["north", "east", "south"]}
+    connected = get_connected_properties("cobblestone_wall", WALL, get_neighbour_getter(neighbours), is_opaque_full_cube)
+    assert connected == dict(WALL, north="low", east="low", south="low", up="true")
+
+    # A crossing is straight in both directions, so it has no post
+    neighbours["west"] = ("cobblestone_wall", WALL)
+    connected = get_connected_properties("cobblestone_wall", WALL, get_neighbour_getter(neighbours), is_opaque_full_cube)
+    assert connected == dict(WALL, north="low", east="low", south="low", west="low", up="false")
+
+
+@pytest.mark.parametrize("above, up", [
+    (("torch", {}), "true"),
+    (("oak_sign", {"rotation": "0"}), "true"),
+    (("stone_pressure_plate", {"powered": "false"}), "true"),
+    (("oak_fence", FENCE), "true"),
+    (("stone_slab", {"type": "bottom"}), "true"),
+    (("stone_slab", {"type": "top"}), "false"),
+    (("oak_stairs", {"facing": "north", "half": "top", "shape": "straight"}), "false"),
+    (("oak_hanging_sign", {"rotation": "0"}), "false"),
+])
+def test_straight_wall_post_for_block_above(above, up):
+    neighbours = {"north": ("cobblestone_wall", WALL), "south": ("cobblestone_wall", WALL), "up": above}
+    connected = get_connected_properties("cobblestone_wall", WALL, get_neighbour_getter(neighbours), is_opaque_full_cube)
+    assert connected["up"] == up
+
+
+def test_wall_tall_sides():
+    above_wall = dict(WALL, north="low", up="true")
+    neighbours = {"north": ("stone", {}), "south": ("stone", {}), "up": ("cobblestone_wall", above_wall)}
+    connected = get_connected_properties("cobblestone_wall", WALL, get_neighbour_getter(neighbours), is_opaque_full_cube)
+    # Only the side covered by the wall above is tall, and the post above keeps this post
+    assert connected == dict(WALL, north="tall", south="low", up="true")
+
+    neighbours["up"] = ("stone", {})
+    connected = get_connected_properties("cobblestone_wall", WALL, get_neighbour_getter(neighbours), is_opaque_full_cube)
+    assert connected == dict(WALL, north="tall", south="tall", up="false")
+
+
+def test_other_blocks_unchanged():
+    properties = {"axis": "y"}
+    assert get_connected_properties("oak_log", properties, get_neighbour_getter({"north": ("stone", {})}), is_opaque_full_cube) == properties
@@ -0,0 +1,114 @@
+from core.delta import build_delta_commands, build_resummon_commands, get_export_state
+
+ROOT = "@e[type=minecraft:block_display,tag=rig.root,limit=1]"
+
+
+def make_passenger(name, x=0, block_type="stone", properties=None, **render_fields):
+    return dict({
+        "name": name,
+        "block_type": block_type,
+        "properties": properties or {},
+        "transformation": [[1.0, 0.0, 0.0, float(x)], [0.0, 1.0, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0], [0.0, 0.0, 0.0, 1.0]],
+        "tags": ["rig", f"rig.{name}"],
+    }, **render_fields)
+
+
+def get_selector(name):
+    return f"@e[type=minecraft:block_display,tag=rig.{name},limit=1]"
+
+
+def build_compact(previous_passengers, passengers):
+    previous_state = get_export_state(previous_passengers, compact=True)
+    return build_delta_commands(previous_state, passengers, "rig", compact=True)
+
+
+def test_unchanged():
+    passengers = [make_passenger("a"), make_passenger("b", 1)]
+    commands, state = build_compact(passengers, passengers)
+    assert commands == []
+    assert state == get_export_state(passengers, compact=True)
+
+
+def test_removed():
+    commands, state = build_compact([make_passenger("a"), make_passenger("b", 1)], [make_passenger("a")])
+    assert commands == ["kill @e[type=minecraft:block_display,tag=rig.b]"]
+    assert list(state) == ["rig.a"]
+
+
+def test_added():
+    commands, _ = build_compact([make_passenger("a")], [make_passenger("a"), make_passenger("b", 1)])
+    assert commands == [
+        f"execute at {ROOT} run summon block_display ~ ~ ~ "
+        "{Tags:[rig,rig.b],block_state:{Name:stone},transformation:[1f,0f,0f,1f,0f,1f,0f,0f,0f,0f,1f,0f,0f,0f,0f,1f]}",
+        f"ride {get_selector('b')} mount {ROOT}",
+    ]
+
+
+def test_changed():
+    previous = [make_passenger("a"), make_passenger("b", 1)]
+    passengers = [make_passenger("a", 2), make_passenger("b", 1, "oak_log", {"axis": "x"})]
+    commands, _ = build_compact(previous, passengers)
+    assert commands == [
+        f"data merge entity {get_selector('a')} {{transformation:[1f,0f,0f,2f,0f,1f,0f,0f,0f,0f,1f,0f,0f,0f,0f,1f]}}",
+        f"data merge entity {get_selector('b')} {{block_state:{{Name:oak_log,Properties:{{axis:x}}}}}}",
+    ]
+
+
+def test_changes_below_tolerance():
+    previous = [make_passenger("a", 1)]
+    commands, _ = build_compact(previous, [make_passenger("a", 1.00001)])
+    assert commands == []
+
+
+def test_added_render_fields():
+    passengers = [make_passenger("a", width=4.0, height=2.0, view_range=0.5)]
+    commands, _ = build_compact([], passengers)
+    assert commands[0].endswith(",width:4f,height:2f,view_range:.5f}")
+
+
+def test_changed_render_fields():
+    previous = [make_passenger("a", width=4.0, height=2.0), make_passenger("b", 1, width=4.0, height=2.0)]
+    passengers = [make_passenger("a", width=6.0, height=2.0), make_passenger("b", 1, width=6.0, height=2.0, view_range=0.25)]
+    commands, _ = build_compact(previous, passengers)
+    assert commands == [
+        f"data merge entity {get_selector('a')} {{width:6f}}",
+        f"data merge entity {get_selector('b')} {{width:6f,view_range:.25f}}",
+    ]
+
+
+def test_removed_render_fields():
+    previous = [make_passenger("a", width=4.0, height=2.0, view_range=0.25)]
+    commands, state = build_compact(previous, [make_passenger("a")])
+    assert commands == [f"data merge entity {get_selector('a')} {{width:0f,height:0f,view_range:1f}}"]
+    assert "width" not in state["rig.a"]
+
+
+def test_verbose():
+    previous_state = get_export_state([make_passenger("a")])
+    commands, _ = build_delta_commands(previous_state, [make_passenger("a", 1, view_range=0.5)], "rig")
+    assert commands == [
+        f"data merge entity {get_selector('a')} "
+        "{transformation:[1.0f, 0.0f, 0.0f, 1.0f, 0.0f, 1.0f, 0.0f, 0.0f, 0.0f, 0.0f, 1.0f, 0.0f, 0.0f, 0.0f, 0.0f, 1.0f],view_range:0.5f}"
+    ]
+
+
+def test_states_without_render_fields():
+    # States remembered before render fields were stored only have the block state and transformation
+    previous_state = get_export_state([make_passenger("a")], compact=True)
+    commands, _ = build_delta_commands(previous_state, [make_passenger("a")], "rig", compact=True)
+    assert commands == []
+
+    commands, _ = build_delta_commands(previous_state, [make_passenger("a", width=2.0)], "rig", compact=True)
+    assert commands == [f"data merge entity {get_selector('a')} {{width:2f}}"]
+
+
+def test_resummon():
+    passengers = [make_passenger("a"), make_passenger("b", 1)]
+    commands, state = build_resummon_commands(passengers, (-0.5, 0.5, -0.5), "rig", compact=True)
+    assert commands[:2] == [
+        "kill @e[type=minecraft:block_display,tag=rig]",
+        "summon block_display ~-.5 ~.5 ~-.5 {Tags:[rig,rig.root],Passengers:[]}",
+    ]
+    # The passengers are added one at a time, as if they were new in a delta update
+    assert commands[2:] == build_compact([], passengers)[0]
+    assert state == get_export_state(passengers, compact=True)
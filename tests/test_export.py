@@ -0,0 +1,139 @@
+import itertools
+
+from core.export import merge_boxes, merge_full_blocks, cull_hidden_blocks, add_culling_boxes, get_centred_culling_box, get_root_entities
+
+
+def make_passenger(cell, block_type="stone", properties=None, scale=1):
+    x, y, z = cell
+    return {
+        "name": f"{block_type} {x} {y} {z}",
+        "block_type": block_type,
+        "properties": properties or {},
+        "transformation": [[scale, 0, 0, x], [0, scale, 0, y], [0, 0, scale, z], [0, 0, 0, 1]],
+    }
+
+
+def get_box_cells(start, size):
+    return {
+        (start[0] + i, start[1] + j, start[2] + k)
+        for i in range(size[0]) for j in range(size[1]) for k in range(size[2])
+    }
+
+
+def assert_boxes_cover(boxes, cells):
+    covered = [cell for start, size in boxes for cell in get_box_cells(start, size)]
+    assert len(covered) == len(set(covered)), "boxes overlap"
+    assert set(covered) == set(cells)
+
+
+def is_opaque(block_type, properties):
+    return block_type == "stone"
+
+
+def test_merge_boxes_cube():
+    cells = set(itertools.product(range(3), range(2), range(4)))
+    assert merge_boxes(cells) == [((0, 0, 0), (3, 2, 4))]
+
+
+def test_merge_boxes_single_cells():
+    cells = {(0, 0, 0), (2, 0, 0), (0, 5, 0)}
+    assert sorted(merge_boxes(cells)) == [((0, 0, 0), (1, 1, 1)), ((0, 5, 0), (1, 1, 1)), ((2, 0, 0), (1, 1, 1))]
+
+
+def test_merge_boxes_l_shape():
+    cells = {(x, 0, 0) for x in range(4)} | {(0, 0, z) for z in range(1, 3)}
+    boxes = merge_boxes(cells)
+    assert_boxes_cover(boxes, cells)
+    assert boxes[0] == ((0, 0, 0), (4, 1, 1))
+    assert len(boxes) == 2
+
+
+def test_merge_boxes_irregular():
+    cells = {cell for cell in itertools.product(range(5), range(3), range(4)) if sum(cell) % 3 != 0 or cell[1] == 1}
+    assert_boxes_cover(merge_boxes(cells), cells)
+
+
+def test_merge_full_blocks():
+    passengers = [make_passenger(cell) for cell in itertools.product(range(2), range(2), range(2))]
+    passengers.append(make_passenger((5, 0, 0), "glass"))
+    merged, saved = merge_full_blocks(passengers, lambda block_type, properties: block_type == "stone")
+    assert saved == 7
+    transformations = {passenger["block_type"]: passenger["transformation"] for passenger in merged}
+    assert transformations == {
+        "stone": [[2, 0, 0, 0], [0, 2, 0, 0], [0, 0, 2, 0], [0, 0, 0, 1]],
+        "glass": [[1, 0, 0, 5], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]],
+    }
+
+
+def test_cull_hidden_blocks():
+    passengers = [make_passenger(cell) for cell in itertools.product(range(3), repeat=3)]
+    visible, culled = cull_hidden_blocks(passengers, is_opaque)
+    assert culled == 1
+    assert (1, 1, 1) not in {tuple(passenger["transformation"][row][3] for row in range(3)) for passenger in visible}
+
+
+def test_cull_hidden_blocks_transparent_neighbour():
+    passengers = [make_passenger(cell) for cell in itertools.product(range(3), repeat=3) if cell != (1, 2, 1)]
+    passengers.append(make_passenger((1, 2, 1), "glass"))
+    _, culled = cull_hidden_blocks(passengers, is_opaque)
+    assert culled == 0
+
+
+def test_cull_hidden_blocks_off_grid():
+    passengers = [make_passenger(cell) for cell in itertools.product(range(3), repeat=3) if cell != (1, 1, 1)]
+    passengers.append(make_passenger((1, 1, 1), scale=0.5))
+    _, culled = cull_hidden_blocks(passengers, is_opaque)
+    assert culled == 0
+
+
+def test_cull_hidden_blocks_after_merging():
+    passengers = [make_passenger(cell) for cell in itertools.product(range(3), repeat=3)]
+    merged = [make_passenger((0, 0, 0), scale=3)]
+    # The merged block is not on the grid, and the original blocks only occlude
+    visible, culled = cull_hidden_blocks(merged + [make_passenger((1, 1, 1), "glass")], is_opaque, passengers)
+    assert culled == 1
+    assert visible == merged
+
+
+def test_cull_hidden_blocks_is_opaque_once_per_state():
+    calls = []
+
+    def counting_is_opaque(block_type, properties):
+        calls.append(block_type)
+        return True
+
+    cull_hidden_blocks([make_passenger(cell) for cell in itertools.product(range(3), repeat=3)], counting_is_opaque)
+    assert calls == ["stone"]
+
+
+def get_unit_bounds(block_type, properties):
+    return ((0, 0, 0), (1, 1, 1))
+
+
+def test_add_culling_boxes_moves_origin():
+    passengers = [make_passenger((0, 0, 0)), make_passenger((3, 1, 0))]
+    origin, boxed = add_culling_boxes(passengers, (0, 0, 0), get_unit_bounds)
+    assert origin == (2.0, 0, 0.5)
+    assert [passenger["transformation"][0][3] for passenger in boxed] == [-2.0, 1.0]
+    assert [(passenger["width"], passenger["height"]) for passenger in boxed] == [(4, 2), (4, 2)]
+
+
+def test_add_culling_boxes_keeps_origin():
+    passengers = [make_passenger((0, -1, 0)), make_passenger((3, 1, 0))]
+    origin, boxed = add_culling_boxes(passengers, (0, 0, 0), get_unit_bounds, move_origin=False)
+    assert origin == (0, 0, 0)
+    assert boxed[0]["transformation"] == passengers[0]["transformation"]
+    assert [(passenger["width"], passenger["height"]) for passenger in boxed] == [(8, 2), (8, 2)]
+
+
+def test_centred_culling_box():
+    assert get_centred_culling_box(([-3, -1, 0.5], [1, 2, 2])) == (6, 2)
+    # Nothing above the root needs no height
+    assert get_centred_culling_box(([0, -2, 0], [1, -1, 1])) == (2, 0)
+
+
+def test_tagged_roots_do_not_move():
+    passengers = [make_passenger((0, 0, 0)), make_passenger((3, 1, 0))]
+    [(origin, boxed)] = get_root_entities(passengers, (-0.5, 0.5, -0.5), "rig", get_state_bounds=get_unit_bounds)
+    assert origin == (-0.5, 0.5, -0.5)
+    assert all("width" in passenger for passenger in boxed)
@@ -0,0 +1,116 @@
+import pytest
+
+from core.geometry import get_model_geometry
+from core.grid import GridIndex, get_matrix_cell, get_neighbour_cell, get_culled_directions
+
+
+def make_matrix(x, y, z, scale=1):
+    return [[scale, 0, 0, x], [0, scale, 0, y], [0, 0, scale, z], [0, 0, 0, 1]]
+
+
+def test_matrix_cell():
+    assert get_matrix_cell(make_matrix(1, -2, 3)) == (1, -2, 3)
+    assert get_matrix_cell(make_matrix(1.00001, -2, 2.99999)) == (1, -2, 3)
+
+
+def test_matrix_cell_off_grid():
+    assert get_matrix_cell(make_matrix(0.5, 0, 0)) is None
+    assert get_matrix_cell(make_matrix(0, 0, 0, scale=2)) is None
+    assert get_matrix_cell([[0, -1, 0, 0], [1, 0, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]]) is None
+
+
+def test_neighbour_cell():
+    assert get_neighbour_cell((0, 0, 0), "up") == (0, 0, 1)
+    assert get_neighbour_cell((0, 0, 0), "north") == (0, 1, 0)
+    assert get_neighbour_cell((0, 0, 0), "west") == (-1, 0, 0)
+
+
+def test_move_returns_changed_cells():
+    grid = GridIndex()
+    assert grid.move("a", (0, 0, 0)) == {(0, 0, 0)}
+    assert grid.move("a", (1, 0, 0)) == {(0, 0, 0), (1, 0, 0)}
+    assert grid.get_name((0, 0, 0)) is None
+    assert grid.get_name((1, 0, 0)) == "a"
+    assert grid.get_name_cell("a") == (1, 0, 0)
+
+
+def test_move_out_of_grid():
+    grid = GridIndex()
+    grid.move("a", (0, 0, 0))
+    assert grid.move("a", None) == {(0, 0, 0)}
+    assert grid.cells == {}
+    assert grid.name_cells == {}
+    assert grid.move("a", None) == set()
+
+
+def test_move_away_keeps_block_moved_in():
+    grid = GridIndex()
+    grid.move("a", (0, 0, 0))
+    grid.move("b", (0, 0, 0))
+    # a no longer owns its old cell, so moving it must not remove b
+    grid.move("a", (2, 0, 0))
+    assert grid.get_name((0, 0, 0)) == "b"
+
+
+def test_remove_cell():
+    grid = GridIndex()
+    grid.move("a", (0, 0, 0))
+    grid.remove_cell((0, 0, 0))
+    grid.remove_cell((5, 0, 0))
+    assert grid.get_name((0, 0, 0)) is None
+    assert grid.get_name_cell("a") is None
+
+
+def test_neighbour_names():
+    grid = GridIndex()
+    grid.move("centre", (0, 0, 0))
+    grid.move("above", (0, 0, 1))
+    grid.move("east", (1, 0, 0))
+    grid.move("far", (2, 0, 0))
+    assert grid.get_neighbour_names((0, 0, 0)) == {"up": "above", "east": "east"}
+
+
+def test_culled_directions():
+    opaque_cells = {(0, 0, 1), (0, 1, 0), (5, 5, 5)}
+    assert get_culled_directions((0, 0, 0), opaque_cells.__contains__) == {"up", "north"}
+    assert get_culled_directions((9, 9, 9), opaque_cells.__contains__) == frozenset()
+
+
+CULLED_MODEL = {
+    "elements": [{
+        "from": [0, 0, 0],
+        "to": [16, 16, 16],
+        "faces": {
+            "north": {"texture": "#side", "cullface": "north"},
+            "up": {"texture": "#top", "cullface": "up"},
+            "down": {"texture": "#bottom"},
+        },
+    }],
+}
+
+
+def get_face_textures(outer_model_data, culled_faces):
+    [(_, faces)] = get_model_geometry(outer_model_data, CULLED_MODEL, culled_faces)
+    return sorted(texture for _, texture, _ in faces)
+
+
+def test_cullface():
+    assert get_face_textures({}, frozenset()) == ["#bottom", "#side", "#top"]
+    assert get_face_textures({}, frozenset({"north", "up"})) == ["#bottom"]
+
+
+def test_no_cullface_is_never_culled():
+    assert get_face_textures({}, frozenset({"down", "south"})) == ["#bottom", "#side", "#top"]
+
+
+@pytest.mark.parametrize("outer_model_data, culled_direction", [
+    ({"y": 90}, "east"),
+    ({"y": 180}, "south"),
+    ({"y": 270}, "west"),
+    ({"x": 90}, "down"),
+    ({"x": 90, "y": 90}, "down"),
+])
+def test_cullface_follows_variant_rotation(outer_model_data, culled_direction):
+    # The north face is only culled by the neighbour it points at after rotating
+    assert "#side" in get_face_textures(outer_model_data, frozenset({"north"}))
+    assert "#side" not in get_face_textures(outer_model_data, frozenset({culled_direction}))
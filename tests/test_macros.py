@@ -0,0 +1,126 @@
+import json
+import os
+import re
+
+from core.datapack import write_datapack
+from core.macros import build_macro_functions, format_argument, MACRO_PACK_FORMAT
+from core.snbt import parse_snbt
+
+IDENTITY = [[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]]
+MOVED = [[1, 0, 0, 2], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]]
+
+NEW = "@e[type=block_display,tag=mcbde.new,limit=1]"
+BUILD_ROOT = "@e[type=block_display,tag=mcbde.build_root,limit=1]"
+
+
+def make_passenger(name, block_type, properties, transformation, **render_fields):
+    return {
+        "name": name,
+        "block_type": block_type,
+        "properties": properties,
+        "transformation": transformation,
+        "tags": ["rig", f"rig.{name}"],
+        **render_fields,
+    }
+
+
+PASSENGERS = [
+    make_passenger("a", "oak_log", {"axis": "x"}, IDENTITY),
+    make_passenger("b", "oak_log", {"axis": "x"}, MOVED),
+    make_passenger("c", "stone", {}, IDENTITY, view_range=0.5),
+]
+
+
+def expand_call(functions, call):
+    """
+    Run a macro function call the way the game does, returning the commands
+    of the template with the arguments substituted
+    """
+    match = re.fullmatch(r"function ns:(\S+) (\{.*\})", call)
+    arguments, _ = parse_snbt(match.group(2))
+    return [
+        re.sub(r"\$\((\w+)\)", lambda argument: arguments[argument.group(1)], command[1:])
+        if command.startswith("$") else command
+        for command in functions[match.group(1)]
+    ]
+
+
+def test_compact_functions():
+    functions = build_macro_functions("build", "ns", [((-0.5, 0.5, -0.5), PASSENGERS)], ["rig", "rig.root"], compact=True)
+
+    assert functions["build"] == [
+        "summon block_display ~-.5 ~.5 ~-.5 {Tags:[mcbde.build_root,rig,rig.root]}",
+        f"execute as {BUILD_ROOT} at @s run function ns:build/root_0",
+        f"tag {BUILD_ROOT} remove mcbde.build_root",
+    ]
+    # Passengers with the same block state share a template
+    assert functions["build/block_0"] == [
+        "$summon block_display ~ ~ ~ {Tags:[mcbde.new,$(g)],block_state:{Name:oak_log,Properties:{axis:x}},transformation:$(t)}",
+        f"ride {NEW} mount @s",
+        f"tag {NEW} remove mcbde.new",
+    ]
+    assert functions["build/block_1"][0] == (
+        "$summon block_display ~ ~ ~ {Tags:[mcbde.new,$(g)],block_state:{Name:stone},transformation:$(t),view_range:.5f}"
+    )
+    assert functions["build/root_0"] == [
+        'function ns:build/block_0 {t:"[1f,0f,0f,0f,0f,1f,0f,0f,0f,0f,1f,0f,0f,0f,0f,1f]",g:"rig,rig.a"}',
+        'function ns:build/block_0 {t:"[1f,0f,0f,2f,0f,1f,0f,0f,0f,0f,1f,0f,0f,0f,0f,1f]",g:"rig,rig.b"}',
+        'function ns:build/block_1 {t:"[1f,0f,0f,0f,0f,1f,0f,0f,0f,0f,1f,0f,0f,0f,0f,1f]",g:"rig,rig.c"}',
+    ]
+
+
+def test_substituted_templates():
+    functions = build_macro_functions("build", "ns", [((0, 0, 0), PASSENGERS)], compact=True)
+    calls = functions["build/root_0"]
+    assert expand_call(functions, calls[1])[0] == (
+        "summon block_display ~ ~ ~ {Tags:[mcbde.new,rig,rig.b],block_state:{Name:oak_log,Properties:{axis:x}},"
+        "transformation:[1f,0f,0f,2f,0f,1f,0f,0f,0f,0f,1f,0f,0f,0f,0f,1f]}"
+    )
+
+
+def test_verbose_arguments_are_quoted():
+    functions = build_macro_functions("build", "ns", [((0, 0, 0), PASSENGERS)])
+    call = functions["build/root_0"][0]
+    # The tags contain double quotes, so the argument is single quoted
+    assert call.endswith(""",g:'"rig", "rig.a"'}""")
+    summon = expand_call(functions, call)[0]
+    assert summon.startswith('summon block_display ~ ~ ~ {Tags: ["mcbde.new","rig", "rig.a"], ')
+    assert "transformation: [1f, 0f, 0f, 0f, 0f, 1f, 0f, 0f, 0f, 0f, 1f, 0f, 0f, 0f, 0f, 1f]" in summon
+
+
+def test_untagged_passengers():
+    passenger = {"name": "a", "block_type": "stone", "properties": {}, "transformation": IDENTITY}
+    functions = build_macro_functions("build", "ns", [((0, 0, 0), [passenger])], compact=True)
+    assert functions["build/block_0"][0] == "$summon block_display ~ ~ ~ {Tags:[mcbde.new],block_state:{Name:stone},transformation:$(t)}"
+    assert functions["build/root_0"] == ['function ns:build/block_0 {t:"[1f,0f,0f,0f,0f,1f,0f,0f,0f,0f,1f,0f,0f,0f,0f,1f]"}']
+
+
+def test_several_roots_share_templates():
+    roots = [((0, 0, 0), PASSENGERS[:1]), ((16, 0, 0), PASSENGERS[1:2])]
+    functions = build_macro_functions("build", "ns", roots, compact=True)
+    assert sorted(functions) == ["build", "build/block_0", "build/root_0", "build/root_1"]
+    assert len(functions["build"]) == 6
+    assert functions["build/root_1"][0].startswith("function ns:build/block_0 ")
+
+
+def test_format_argument():
+    assert format_argument("[1f,0f]") == '"[1f,0f]"'
+    assert format_argument('"a", "b"') == """'"a", "b"'"""
+    assert parse_snbt(format_argument("""it's "quoted\""""))[0] == """it's "quoted\""""
+
+
+def test_datapack_layout(tmp_path):
+    functions = build_macro_functions("build", "ns", [((0, 0, 0), PASSENGERS)], compact=True)
+    written = write_datapack(str(tmp_path), "ns", functions, pack_format=MACRO_PACK_FORMAT)
+
+    with open(tmp_path / "pack.mcmeta") as pack_mcmeta_file:
+        assert json.load(pack_mcmeta_file)["pack"]["pack_format"] == MACRO_PACK_FORMAT
+    functions_directory = tmp_path / "data" / "ns" / "functions"
+    assert sorted(os.path.relpath(path, functions_directory) for path in written[1:]) == [
+        "build.mcfunction",
+        os.path.join("build", "block_0.mcfunction"),
+        os.path.join("build", "block_1.mcfunction"),
+        os.path.join("build", "root_0.mcfunction"),
+    ]
+    template = (functions_directory / "build" / "block_0.mcfunction").read_text().splitlines()
+    assert template == functions["build/block_0"]
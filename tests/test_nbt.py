@@ -0,0 +1,118 @@
+import gzip
+import io
+import struct
+
+import pytest
+
+from core.nbt import (
+    NbtReader, NbtError, read_nbt_file, read_varints,
+    TAG_END, TAG_BYTE, TAG_SHORT, TAG_INT, TAG_LONG, TAG_FLOAT, TAG_DOUBLE,
+    TAG_BYTE_ARRAY, TAG_STRING, TAG_LIST, TAG_COMPOUND, TAG_INT_ARRAY, TAG_LONG_ARRAY,
+)
+
+
+def encode_string(value):
+    data = value.encode("utf-8")
+    return struct.pack(">H", len(data)) + data
+
+
+def encode_entry(tag_type, name, payload):
+    return struct.pack(">b", tag_type) + encode_string(name) + payload
+
+
+def encode_compound(*entries):
+    return b"".join(entries) + struct.pack(">b", TAG_END)
+
+
+def encode_root(name, *entries):
+    return encode_entry(TAG_COMPOUND, name, encode_compound(*entries))
+
+
+STRUCTURE_DATA = encode_root(
+    "",
+    encode_entry(TAG_BYTE, "byte", struct.pack(">b", -3)),
+    encode_entry(TAG_SHORT, "short", struct.pack(">h", 300)),
+    encode_entry(TAG_INT, "int", struct.pack(">i", -70000)),
+    encode_entry(TAG_LONG, "long", struct.pack(">q", 1 << 40)),
+    encode_entry(TAG_FLOAT, "float", struct.pack(">f", 0.5)),
+    encode_entry(TAG_DOUBLE, "double", struct.pack(">d", -2.25)),
+    encode_entry(TAG_STRING, "string", encode_string("minecraft:stone")),
+    encode_entry(TAG_BYTE_ARRAY, "bytes", struct.pack(">i", 3) + b"\x01\x02\xff"),
+    encode_entry(TAG_INT_ARRAY, "ints", struct.pack(">i3i", 3, 1, -2, 3)),
+    encode_entry(TAG_LONG_ARRAY, "longs", struct.pack(">i2q", 2, 5, -6)),
+    encode_entry(TAG_LIST, "numbers", struct.pack(">bi3i", TAG_INT, 3, 7, 8, 9)),
+    encode_entry(TAG_LIST, "names", struct.pack(">bi", TAG_STRING, 2) + encode_string("a") + encode_string("b")),
+    encode_entry(TAG_LIST, "empty", struct.pack(">bi", TAG_END, 0)),
+    encode_entry(TAG_LIST, "blocks", struct.pack(">bi", TAG_COMPOUND, 2)
+        + encode_compound(encode_entry(TAG_INT, "state", struct.pack(">i", 0)))
+        + encode_compound(encode_entry(TAG_INT, "state", struct.pack(">i", 1)))),
+    encode_entry(TAG_COMPOUND, "nested", encode_compound(encode_entry(TAG_STRING, "Name", encode_string("air")))),
+)
+
+STRUCTURE_VALUE = {
+    "byte": -3,
+    "short": 300,
+    "int": -70000,
+    "long": 1 << 40,
+    "float": 0.5,
+    "double": -2.25,
+    "string": "minecraft:stone",
+    "bytes": b"\x01\x02\xff",
+    "ints": [1, -2, 3],
+    "longs": [5, -6],
+    "numbers": [7, 8, 9],
+    "names": ["a", "b"],
+    "empty": [],
+    "blocks": [{"state": 0}, {"state": 1}],
+    "nested": {"Name": "air"},
+}
+
+
+def test_read_root():
+    assert NbtReader(io.BytesIO(STRUCTURE_DATA)).read_root() == ("", STRUCTURE_VALUE)
+
+
+def test_read_across_chunks(monkeypatch):
+    # A tiny chunk size makes every value cross the end of the buffer
+    monkeypatch.setattr("core.nbt.READ_CHUNK_SIZE", 3)
+    assert NbtReader(io.BytesIO(STRUCTURE_DATA)).read_root() == ("", STRUCTURE_VALUE)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_read_nbt_file(tmp_path, compress):
+    path = tmp_path / "structure.nbt"
+    path.write_bytes(gzip.compress(STRUCTURE_DATA) if compress else STRUCTURE_DATA)
+    assert read_nbt_file(str(path)) == ("", STRUCTURE_VALUE)
+
+
+def test_root_must_be_compound():
+    with pytest.raises(NbtError):
+        NbtReader(io.BytesIO(encode_entry(TAG_INT, "", struct.pack(">i", 1)))).read_root()
+
+
+def test_truncated_data():
+    with pytest.raises(NbtError):
+        NbtReader(io.BytesIO(STRUCTURE_DATA[:-5])).read_root()
+
+
+def test_truncated_compressed_file(tmp_path):
+    path = tmp_path / "structure.nbt"
+    path.write_bytes(gzip.compress(STRUCTURE_DATA)[:-12])
+    with pytest.raises(NbtError):
+        read_nbt_file(str(path))
+
+
+def test_negative_length():
+    data = encode_root("", encode_entry(TAG_INT_ARRAY, "ints", struct.pack(">i", -1)))
+    with pytest.raises(NbtError):
+        NbtReader(io.BytesIO(data)).read_root()
+
+
+def test_unknown_tag_type():
+    data = encode_root("", encode_entry(13, "unknown", b""))
+    with pytest.raises(NbtError):
+        NbtReader(io.BytesIO(data)).read_root()
+
+
+def test_read_varints():
+    assert read_varints(bytes([0, 1, 0x7f, 0x80, 0x01, 0xac, 0x02])) == [0, 1, 127, 128, 300]
@@ -0,0 +1,119 @@
+import struct
+import zlib
+
+import pytest
+
+from core.png import decode_png, paeth, PngError
+
+# Colour type to the bytes per pixel at 8 bits
+PIXEL_BYTES = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+def make_chunk(chunk_type, data):
+    body = chunk_type + data
+    return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xffffffff)
+
+
+def filter_rows(rows, filter_type, pixel_bytes):
+    """
+    Apply a PNG filter to every row, the way an encoder does
+    """
+    raw = bytearray()
+    previous = bytes(len(rows[0]))
+    for row in rows:
+        filtered = bytearray()
+        for i, value in enumerate(row):
+            left = row[i - pixel_bytes] if i >= pixel_bytes else 0
+            up = previous[i]
+            up_left = previous[i - pixel_bytes] if i >= pixel_bytes else 0
+            predictor = [0, left, up, (left + up) >> 1, paeth(left, up, up_left)][filter_type]
+            filtered.append((value - predictor) & 0xff)
+        raw += bytes([filter_type]) + filtered
+        previous = row
+    return bytes(raw)
+
+
+def make_png(width, height, colour_type, rows, bit_depth=8, filter_type=0, pixel_bytes=None, extra_chunks=b"", interlace=0):
+    header = struct.pack(">IIBBBBB", width, height, bit_depth, colour_type, 0, 0, interlace)
+    raw = filter_rows(rows, filter_type, pixel_bytes or PIXEL_BYTES[colour_type])
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + make_chunk(b"IHDR", header)
+        + extra_chunks
+        + make_chunk(b"IDAT", zlib.compress(raw))
+        + make_chunk(b"IEND", b"")
+    )
+
+
+# A 3x2 RGBA image with varied values, so that every filter changes the data
+RGBA_ROWS = [
+    bytes([10, 20, 30, 255, 200, 100, 50, 128, 0, 255, 7, 0]),
+    bytes([255, 0, 0, 255, 12, 240, 33, 64, 90, 90, 90, 90]),
+]
+
+
+@pytest.mark.parametrize("filter_type", [0, 1, 2, 3, 4])
+def test_filters(filter_type):
+    data = make_png(3, 2, 6, RGBA_ROWS, filter_type=filter_type)
+    assert decode_png(data) == (3, 2, bytearray(b"".join(RGBA_ROWS)))
+
+
+def test_rgb():
+    rows = [bytes([1, 2, 3, 4, 5, 6])]
+    assert decode_png(make_png(2, 1, 2, rows, filter_type=1)) == (2, 1, bytearray([1, 2, 3, 255, 4, 5, 6, 255]))
+
+
+def test_greyscale():
+    rows = [bytes([0, 128, 255])]
+    assert decode_png(make_png(3, 1, 0, rows))[2] == bytearray([0, 0, 0, 255, 128, 128, 128, 255, 255, 255, 255, 255])
+
+
+def test_greyscale_alpha():
+    rows = [bytes([50, 100, 200, 0])]
+    assert decode_png(make_png(2, 1, 4, rows, filter_type=4))[2] == bytearray([50, 50, 50, 100, 200, 200, 200, 0])
+
+
+def test_low_bit_depth_greyscale():
+    # Four 2 bit samples, 0 to 3, scaled to 8 bits
+    rows = [bytes([0b00011011])]
+    assert decode_png(make_png(4, 1, 0, rows, bit_depth=2))[2] == bytearray(
+        [0, 0, 0, 255, 85, 85, 85, 255, 170, 170, 170, 255, 255, 255, 255, 255]
+    )
+
+
+def test_palette_with_transparency():
+    palette = make_chunk(b"PLTE", bytes([255, 0, 0, 0, 255, 0, 0, 0, 255]))
+    transparency = make_chunk(b"tRNS", bytes([0, 128]))
+    # Three 4 bit palette indices, with only the first two in the transparency chunk
+    rows = [bytes([0x01, 0x20])]
+    data = make_png(3, 1, 3, rows, bit_depth=4, extra_chunks=palette + transparency)
+    assert decode_png(data)[2] == bytearray([255, 0, 0, 0, 0, 255, 0, 128, 0, 0, 255, 255])
+
+
+def test_sixteen_bit():
+    rows = [bytes([0x12, 0x34, 0x56, 0x78, 0x9a, 0xbc, 0xde, 0xf0])]
+    data = make_png(1, 1, 6, rows, bit_depth=16, pixel_bytes=8)
+    assert decode_png(data)[2] == bytearray([0x12, 0x56, 0x9a, 0xde])
+
+
+def test_not_png():
+    with pytest.raises(PngError):
+        decode_png(b"GIF89a")
+
+
+def test_interlaced():
+    with pytest.raises(PngError):
+        decode_png(make_png(3, 2, 6, RGBA_ROWS, interlace=1))
+
+
+def test_unknown_filter():
+    header = struct.pack(">IIBBBBB", 3, 2, 8, 6, 0, 0, 0)
+    raw = bytes([5]) + RGBA_ROWS[0] + bytes([0]) + RGBA_ROWS[1]
+    data = b"\x89PNG\r\n\x1a\n" + make_chunk(b"IHDR", header) + make_chunk(b"IDAT", zlib.compress(raw)) + make_chunk(b"IEND", b"")
+    with pytest.raises(PngError):
+        decode_png(data)
+
+
+def test_missing_header():
+    with pytest.raises(PngError):
+        decode_png(b"\x89PNG\r\n\x1a\n" + make_chunk(b"IEND", b""))
@@ -0,0 +1,62 @@
+import collections
+
+import pytest
+
+from core.blockstates import get_model_weights, choose_models
+from core.random_models import sample_model_choices
+
+STONE = [[
+    {"model": "block/stone"},
+    {"model": "block/stone_mirrored"},
+    {"model": "block/stone", "y": 180},
+    {"model": "block/stone_mirrored", "y": 180},
+]]
+
+# A multipart block with a fixed part between two random parts
+MULTIPART = [
+    [{"model": "a0", "weight": 3}, {"model": "a1"}],
+    {"model": "fixed"},
+    [{"model": "b0"}, {"model": "b1"}, {"model": "b2"}],
+]
+
+NAMES = [f"Cube.{index:03}" for index in range(2000)]
+
+
+def test_model_weights():
+    assert get_model_weights(STONE) == [[1, 1, 1, 1]]
+    assert get_model_weights(MULTIPART) == [[3, 1], [1], [1, 1, 1]]
+    assert get_model_weights([{"model": "block/glass"}]) == [[1]]
+
+
+def test_choose_first_models():
+    assert choose_models(MULTIPART) == [{"model": "a0", "weight": 3}, {"model": "fixed"}, {"model": "b0"}]
+
+
+def test_choose_models_mixed_radix():
+    # The first random part is the lowest digit
+    assert [model["model"] for model in choose_models(MULTIPART, 1)] == ["a1", "fixed", "b0"]
+    assert [model["model"] for model in choose_models(MULTIPART, 2)] == ["a0", "fixed", "b1"]
+    assert [model["model"] for model in choose_models(MULTIPART, 5)] == ["a1", "fixed", "b2"]
+
+
+def test_sample_without_random_models():
+    assert sample_model_choices([{"model": "block/glass"}], NAMES[:3], 7).tolist() == [0, 0, 0]
+
+
+def test_sample_is_reproducible():
+    choices = sample_model_choices(STONE, NAMES[:50], 7).tolist()
+    assert sample_model_choices(STONE, NAMES[:50], 7).tolist() == choices
+    # Each name is drawn on its own, so other names do not change its model
+    assert sample_model_choices(STONE, NAMES[10:20], 7).tolist() == choices[10:20]
+    assert sample_model_choices(STONE, NAMES[:50], 8).tolist() != choices
+
+
+def test_sample_follows_weights():
+    choices = sample_model_choices(MULTIPART, NAMES, 1).tolist()
+    assert set(choices) == set(range(6))
+
+    counts = collections.Counter(choice % 2 for choice in choices)
+    assert counts[0] / len(NAMES) == pytest.approx(0.75, abs=0.05)
+    counts = collections.Counter(choice // 2 for choice in choices)
+    for part_index in range(3):
+        assert counts[part_index] / len(NAMES) == pytest.approx(1 / 3, abs=0.05)
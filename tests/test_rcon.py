@@ -0,0 +1,210 @@
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+from rcon import (
+    RconClient, RconError, RconSender, PACKET_TYPE_COMMAND, PACKET_TYPE_LOGIN, MAX_COMMAND_LENGTH, MAX_RESPONSE_LENGTH
+)
+
+# The vanilla server reads each request with one read into a buffer of this size
+READ_BUFFER_LENGTH = 1460
+
+
+class StandInServer:
+    """
+    An RCON server on a local socket which reads requests the way the vanilla
+    server does, with one read for each request, and drops the connection if
+    the read does not hold exactly one packet.
+
+    Every command is answered with "ran " and the command, and "repeat <n> <text>"
+    with text repeated n times, split into packets like long responses from the
+    vanilla server. Commands are held back while hold is cleared, and the
+    connection is dropped after drop_after commands if it is set.
+    """
+
+    def __init__(self, password="secret", drop_after=None):
+        self.password = password
+        self.drop_after = drop_after
+        self.received = []
+        self.connections = []
+        self.hold = threading.Event()
+        self.hold.set()
+        self.socket = socket.create_server(("127.0.0.1", 0))
+        self.port = self.socket.getsockname()[1]
+        threading.Thread(target=self.serve, daemon=True).start()
+
+
+    def serve(self):
+        while True:
+            try:
+                connection, _ = self.socket.accept()
+            except OSError:
+                return
+            self.connections.append(connection)
+            threading.Thread(target=self.handle, args=(connection,), daemon=True).start()
+
+
+    def handle(self, connection):
+        with connection:
+            try:
+                while True:
+                    request = read_request(connection)
+                    if request is None:
+                        return
+                    request_id, packet_type, body = request
+                    if packet_type == PACKET_TYPE_LOGIN:
+                        write_packet(connection, request_id if body == self.password else -1, PACKET_TYPE_COMMAND, "")
+                    elif packet_type == PACKET_TYPE_COMMAND:
+                        self.hold.wait()
+                        self.received.append(body)
+                        if len(self.received) == self.drop_after:
+                            return
+                        response = get_response(body)
+                        for start in range(0, len(response), MAX_RESPONSE_LENGTH):
+                            write_packet(connection, request_id, 0, response[start:start + MAX_RESPONSE_LENGTH])
+                    else:
+                        write_packet(connection, request_id, 0, f"Unknown request {packet_type:x}")
+            except (OSError, struct.error):
+                pass
+
+
+    def close(self):
+        self.hold.set()
+        # Shutting down also wakes the threads waiting on the sockets, which closing alone does not
+        for connection in [self.socket] + self.connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.socket.close()
+
+
+def read_request(connection):
+    """
+    Read one request with a single read, returning None if the read does not
+    hold exactly one packet
+    """
+    data = connection.recv(READ_BUFFER_LENGTH)
+    if len(data) < 14:
+        return None
+    length, request_id, packet_type = struct.unpack("<iii", data[:12])
+    if length != len(data) - 4:
+        return None
+    return request_id, packet_type, data[12:-2].decode("utf-8")
+
+
+def get_response(command):
+    if command.startswith("repeat "):
+        _, count, text = command.split(" ", 2)
+        return text * int(count)
+    return "ran " + command
+
+
+def write_packet(connection, request_id, packet_type, body):
+    payload = struct.pack("<ii", request_id, packet_type) + body.encode("utf-8") + b"\x00\x00"
+    connection.sendall(struct.pack("<i", len(payload)) + payload)
+
+
+@pytest.fixture
+def server():
+    server = StandInServer()
+    yield server
+    server.close()
+
+
+def make_client(server, password="secret"):
+    return RconClient("127.0.0.1", server.port, password, timeout=2.0, retries=1)
+
+
+def wait_for_results(sender):
+    for _ in range(200):
+        results = sender.get_results()
+        if results:
+            return results
+        time.sleep(0.01)
+    raise AssertionError("the sender did not finish")
+
+
+def test_send_commands(server):
+    client = make_client(server)
+    commands = [f"/say {i}" for i in range(7)]
+    responses = client.send_commands(commands)
+    client.close()
+    assert server.received == [command.removeprefix("/") for command in commands]
+    assert responses == ["ran " + command for command in server.received]
+
+
+@pytest.mark.parametrize("length", [MAX_RESPONSE_LENGTH - 1, MAX_RESPONSE_LENGTH, MAX_RESPONSE_LENGTH * 2 + 5])
+def test_long_responses(server, length):
+    client = make_client(server)
+    responses = client.send_commands([f"repeat {length} a", "say after"])
+    client.close()
+    # The connection is never dropped, so every command is only received once
+    assert server.received == [f"repeat {length} a", "say after"]
+    assert responses == ["a" * length, "ran say after"]
+
+
+def test_wrong_password(server):
+    with pytest.raises(RconError, match="password"):
+        make_client(server, "wrong").send_commands(["say hi"])
+
+
+def test_command_too_long(server):
+    client = make_client(server)
+    with pytest.raises(RconError, match=str(MAX_COMMAND_LENGTH)) as error:
+        client.send_commands(["say " + "a" * MAX_COMMAND_LENGTH])
+    assert "chunk" not in str(error.value)
+    assert server.received == []
+
+
+def test_retry_after_dropped_connection():
+    server = StandInServer(drop_after=2)
+    client = make_client(server)
+    client.send_commands(["say 1", "say 2", "say 3"])
+    client.close()
+    server.close()
+    # Only the command which failed is sent again
+    assert server.received == ["say 1", "say 2", "say 2", "say 3"]
+
+
+def test_sender_keeps_state_once_delivered(server):
+    sender = RconSender(make_client(server))
+    assert sender.send(["say 1", "say 2"], "rig", {"rig.a": 1})
+    assert wait_for_results(sender) == [("rig", None)]
+    assert sender.states == {"rig": {"rig.a": 1}}
+    assert not sender.is_busy
+    sender.stop()
+    assert server.received == ["say 1", "say 2"]
+
+
+def test_sender_refuses_jobs_while_busy(server):
+    server.hold.clear()
+    sender = RconSender(make_client(server))
+    assert sender.send(["say 1"], "rig", {"rig.a": 1})
+    assert not sender.send(["say 2"], "rig", {"rig.a": 2})
+    # The state is only kept once the server has answered
+    assert sender.states == {}
+    server.hold.set()
+    assert wait_for_results(sender) == [("rig", None)]
+    assert sender.send(["say 3"], "rig", {"rig.a": 3})
+    wait_for_results(sender)
+    sender.stop()
+    assert server.received == ["say 1", "say 3"]
+    assert sender.states == {"rig": {"rig.a": 3}}
+
+
+def test_sender_forgets_state_on_failure(server):
+    sender = RconSender(make_client(server))
+    sender.send(["say 1"], "rig", {"rig.a": 1})
+    wait_for_results(sender)
+    server.close()
+
+    sender.send(["say 2"], "rig", {"rig.a": 2})
+    [(key, error)] = wait_for_results(sender)
+    sender.stop()
+    assert key == "rig"
+    assert "Could not send commands" in error
+    assert sender.states == {}
@@ -0,0 +1,67 @@
+from core.registry import INSTANCER, RegistryIndex
+
+OAK_X = ("oak_log", (("axis", "x"),))
+OAK_Y = ("oak_log", (("axis", "y"),))
+STONE = ("stone", ())
+
+
+def make_index(keys):
+    index = RegistryIndex()
+    for name, key in keys.items():
+        index.set_key(name, key)
+    return index
+
+
+def test_lookups():
+    keys = {"a": OAK_X, "b": OAK_Y, "c": STONE, "rig": INSTANCER}
+    index = make_index(keys)
+    assert index.get_names(keys.get) == ["a", "b", "c", "rig"]
+    assert sorted(index.get_type_names("oak_log", keys.get)) == ["a", "b"]
+    assert index.get_state_names(*OAK_Y, keys.get) == ["b"]
+    assert index.get_type_names("dirt", keys.get) == []
+
+
+def test_changed_behind_the_index():
+    keys = {"a": OAK_X, "b": STONE}
+    index = make_index(keys)
+    # The properties of a change without the index being told
+    keys["a"] = OAK_Y
+
+    # Changed blocks are still found, and moved to their new state
+    assert index.get_names(keys.get) == ["a", "b"]
+    assert index.objects["a"] == OAK_Y
+    assert index.get_state_names(*OAK_X, keys.get) == []
+    assert index.get_state_names(*OAK_Y, keys.get) == ["a"]
+
+
+def test_changed_type_behind_the_index():
+    keys = {"a": OAK_X}
+    index = make_index(keys)
+    keys["a"] = STONE
+    assert index.get_type_names("oak_log", keys.get) == []
+    assert index.get_type_names("stone", keys.get) == ["a"]
+
+
+def test_stale_state_still_in_type():
+    keys = {"a": OAK_X}
+    index = make_index(keys)
+    keys["a"] = OAK_Y
+    # The block is still an oak log, so it is returned from its old bucket
+    assert index.get_type_names("oak_log", keys.get) == ["a"]
+
+
+def test_deleted_and_no_longer_blocks():
+    keys = {"a": OAK_X, "b": STONE, "c": STONE}
+    index = make_index(keys)
+    del keys["a"]
+    keys["b"] = None
+    assert index.get_names(keys.get) == ["c"]
+    assert index.get_type_names("stone", keys.get) == ["c"]
+    assert "a" not in index.objects and "b" not in index.objects
+    assert index.states[STONE] == {"c"}
+
+
+def test_order_kept_on_change():
+    index = make_index({"a": OAK_X, "b": STONE})
+    index.set_key("a", OAK_Y)
+    assert list(index.objects) == ["a", "b"]
@@ -0,0 +1,53 @@
+from core.search import BlockSearchIndex
+
+BLOCKS = [
+    ("stone", "Stone"),
+    ("stone_bricks", "Stone Bricks"),
+    ("cobblestone", "Cobblestone"),
+    ("smooth_stone", "Smooth Stone"),
+    ("oak_planks", "Oak Planks"),
+    ("redstone_block", "Block of Redstone"),
+]
+
+
+def test_ranking():
+    index = BlockSearchIndex(BLOCKS)
+    # Exact, then prefix, then word prefix, then substring matches, shorter first
+    assert index.search("stone") == ["stone", "stone_bricks", "smooth_stone", "cobblestone", "redstone_block"]
+
+
+def test_several_words():
+    index = BlockSearchIndex(BLOCKS)
+    assert index.search("stone bri") == ["stone_bricks"]
+    assert index.search("Smooth  STONE") == ["smooth_stone"]
+
+
+def test_name_words():
+    index = BlockSearchIndex(BLOCKS)
+    # "of" only appears in the name
+    assert index.search("block of")[0] == "redstone_block"
+
+
+def test_fuzzy_fallback():
+    index = BlockSearchIndex(BLOCKS)
+    # The letters appear in order in the identifier, but start no word
+    assert index.search("opl") == ["oak_planks"]
+    assert index.search("stbr") == ["stone_bricks"]
+
+
+def test_no_matches():
+    assert BlockSearchIndex(BLOCKS).search("dirt") == []
+
+
+def test_empty_text():
+    index = BlockSearchIndex(BLOCKS)
+    assert index.search("") == [identifier for identifier, _ in BLOCKS]
+    assert index.search("  ", limit=2) == ["stone", "stone_bricks"]
+
+
+def test_limit_and_cache():
+    index = BlockSearchIndex(BLOCKS)
+    assert index.search("stone", limit=2) == ["stone", "stone_bricks"]
+    # The cached results are not cut by the limit of an earlier search
+    assert len(index.search("stone")) == 5
+    assert index.search(" Stone ") == index.search("stone")
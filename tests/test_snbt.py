@@ -0,0 +1,93 @@
+import pytest
+
+from core.snbt import parse_snbt, parse_summon_commands, SnbtError
+
+
+def test_parse_compound():
+    text = '{Name:"minecraft:stone", Count: 3b, Height: 1.5f, Big: 2L} trailing'
+    value, position = parse_snbt(text)
+    assert value == {"Name": "minecraft:stone", "Count": 3, "Height": 1.5, "Big": 2}
+    assert text[position:] == " trailing"
+
+
+def test_parse_strings():
+    value, _ = parse_snbt("""{a:'it\\'s', b:"say \\"hi\\"", c:unquoted_value, d:true}""")
+    assert value == {"a": "it's", "b": 'say "hi"', "c": "unquoted_value", "d": "true"}
+
+
+def test_parse_numbers():
+    value, _ = parse_snbt("[1, -2, .5, 3.0, 1e2, 4d, 5s]")
+    assert value == [1, -2, 0.5, 3.0, 100.0, 4.0, 5]
+    assert isinstance(value[0], int)
+    assert isinstance(value[2], float)
+
+
+def test_parse_float_list():
+    value, _ = parse_snbt("[1f, 0f, -.5f, 2.25f]")
+    assert value == [1.0, 0.0, -0.5, 2.25]
+
+
+def test_parse_long_mixed_list():
+    # A float list which fails to match at the end must not backtrack exponentially
+    text = "[" + ",".join(["1234f"] * 5000) + ",1]"
+    value, _ = parse_snbt(text)
+    assert value == [1234.0] * 5000 + [1]
+
+
+def test_parse_nested():
+    value, _ = parse_snbt("{Passengers:[{id:block_display,Tags:[a,b]},{}],Empty:[],Nested:{a:{b:{}}}}")
+    assert value == {
+        "Passengers": [{"id": "block_display", "Tags": ["a", "b"]}, {}],
+        "Empty": [],
+        "Nested": {"a": {"b": {}}},
+    }
+
+
+def test_parse_typed_arrays():
+    value, _ = parse_snbt("{Bytes:[B;1b,2b], Ints:[I; 1, 2, 3], Longs:[L;]}")
+    assert value == {"Bytes": [1, 2], "Ints": [1, 2, 3], "Longs": []}
+
+
+def test_parse_whitespace():
+    value, _ = parse_snbt(" {\n  a : [ 1 , 2 ] ,\n  b : { }\n} ")
+    assert value == {"a": [1, 2], "b": {}}
+
+
+def test_parse_from_position():
+    text = "summon block_display ~ ~ ~ {a:1}"
+    value, position = parse_snbt(text, text.index("{"))
+    assert value == {"a": 1}
+    assert position == len(text)
+
+
+def test_parse_deeply_nested():
+    depth = 5000
+    value, _ = parse_snbt("[" * depth + "1" + "]" * depth)
+    for _ in range(depth):
+        value = value[0]
+    assert value == 1
+
+
+@pytest.mark.parametrize("text", [
+    "{a:1",
+    "{a 1}",
+    "{a:1 b:2}",
+    "[1,2",
+    "",
+    "{a:\"unterminated}",
+])
+def test_parse_errors(text):
+    with pytest.raises(SnbtError):
+        parse_snbt(text)
+
+
+def test_parse_summon_commands():
+    text = (
+        "/summon block_display ~-0.5 ~0.5 ~-0.5 {Passengers:[{block_state:{Name:stone}}]}\n"
+        "say hello\n"
+        "summon minecraft:block_display 1 2 3\n"
+    )
+    assert parse_summon_commands(text) == [
+        (("~-0.5", "~0.5", "~-0.5"), {"Passengers": [{"block_state": {"Name": "stone"}}]}),
+        (("1", "2", "3"), {}),
+    ]
@@ -0,0 +1,343 @@
+"""
+Turning meshes into blocks.
+
+The mesh is filled into a voxel grid by casting one ray along z through
+every column of voxels, and counting the crossings below each voxel. Each
+voxel is then given the block whose textures are closest in average colour
+to the mesh surface nearest to it.
+"""
+import fnmatch
+import numpy as np
+from mathutils import Matrix
+from mathutils.kdtree import KDTree
+
+from . import block_definitions
+from .data_loader import data_loader
+from .profiling import profiler
+from .core.blockstates import build_properties_dict, get_default_properties
+from .core.models import replace_textures
+from .properties_util import get_block_models, is_opaque_full_cube
+
+# Rays are moved off the column centres by a tiny amount, so they do not run exactly along the
+# shared edges of triangles in meshes which are aligned with the grid, which would count twice
+RAY_JITTER = (1.2345e-4, 2.3456e-4)
+
+# Material colours are rounded to this many steps per channel before looking up the nearest block
+COLOUR_STEPS = 64
+
+DEFAULT_COLOUR = (0.8, 0.8, 0.8)
+
+# Average colours of textures, and KD-trees of block colours, by Minecraft location
+texture_colour_cache = {}
+block_palette_cache = {}
+
+
+def linear_to_srgb(colour):
+    colour = np.clip(np.asarray(colour, dtype=np.float64), 0, 1)
+    return np.where(colour <= 0.0031308, colour * 12.92, 1.055 * colour ** (1 / 2.4) - 0.055)
+
+
+def get_image_pixels(image):
+    """
+    Return the pixels of image as a (height, width, 4) array
+    """
+    width, height = image.size
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    return pixels.reshape(height, width, 4)
+
+
+def get_texture_colour(texture_name):
+    """
+    Return the average colour of the visible pixels of a block texture, or None
+    """
+    cache = texture_colour_cache.setdefault(data_loader.minecraft_location, {})
+    profiler.count_cache("texture colours", texture_name in cache)
+    if texture_name not in cache:
+        image = data_loader.load_image(texture_name)
+        colour = None
+        if image is not None and image.size[0] and image.size[1]:
+            pixels = get_image_pixels(image).reshape(-1, 4)
+            alpha = pixels[:, 3]
+            if alpha.sum() > 0:
+                colour = tuple((pixels[:, :3] * alpha[:, None]).sum(axis=0) / alpha.sum())
+        cache[texture_name] = colour
+    return cache[texture_name]
+
+
+def get_block_colour(block_type, selected_block_properties):
+    """
+    Return the average colour of all faces of a full cube block, or None
+    """
+    colours = []
+    for _, model_data in get_block_models(block_type, selected_block_properties):
+        textures = {name: texture.replace("minecraft:", "") for name, texture in model_data.get("textures", {}).items()}
+        elements = replace_textures(model_data.get("elements", []), textures)
+        for element in elements:
+            for face in element.get("faces", {}).values():
+                colour = get_texture_colour(face["texture"])
+                if colour is not None:
+                    colours.append(colour)
+
+    if not colours:
+        return None
+    return tuple(np.mean(colours, axis=0))
+
+
+def get_block_palette(block_type_patterns):
+    """
+    Return the list of (block_type, properties) of the opaque full cubes
+    whose types match one of the comma separated block_type_patterns, and a
+    KD-tree of their average colours, which are indices into the list.
+    """
+    key = (data_loader.minecraft_location, block_type_patterns)
+    if key in block_palette_cache:
+        return block_palette_cache[key]
+
+    patterns = [pattern.strip() for pattern in block_type_patterns.split(",") if pattern.strip()]
+
+    palette = []
+    colours = []
+    for block_type, *_ in block_definitions.blocks:
+        if not any(fnmatch.fnmatchcase(block_type, pattern) for pattern in patterns):
+            continue
+        blockstate = data_loader.get_data("blockstates", block_type)
+        if blockstate is None:
+            continue
+        properties = get_default_properties(build_properties_dict(blockstate))
+        if not is_opaque_full_cube(block_type, properties):
+            continue
+        colour = get_block_colour(block_type, properties)
+        if colour is None:
+            continue
+        palette.append((block_type, properties))
+        colours.append(colour)
+
+    tree = KDTree(len(colours))
+    for index, colour in enumerate(colours):
+        tree.insert(colour, index)
+    tree.balance()
+
+    block_palette_cache[key] = (palette, tree)
+    return palette, tree
+
+
+def get_material_sampler(material):
+    """
+    Return the colour of material, and the pixels of its base colour image
+    texture if it has one, in sRGB
+    """
+    if material is None:
+        return DEFAULT_COLOUR, None
+
+    if material.use_nodes and material.node_tree:
+        for node in material.node_tree.nodes:
+            if node.type != 'BSDF_PRINCIPLED':
+                continue
+            base_colour = node.inputs["Base Color"]
+            if base_colour.is_linked:
+                from_node = base_colour.links[0].from_node
+                if from_node.type == 'TEX_IMAGE' and from_node.image and from_node.image.size[0]:
+                    return DEFAULT_COLOUR, get_image_pixels(from_node.image)
+                return DEFAULT_COLOUR, None
+            return tuple(linear_to_srgb(base_colour.default_value[:3])), None
+
+    return tuple(linear_to_srgb(material.diffuse_color[:3])), None
+
+
+def get_mesh_triangles(obj, depsgraph):
+    """
+    Return the world space corners of the triangles of the evaluated mesh of
+    obj as an (n, 3, 3) array, their material indices, and their uvs as an
+    (n, 3, 2) array, or None if the mesh has no uvs
+    """
+    evaluated = obj.evaluated_get(depsgraph)
+    mesh = evaluated.to_mesh()
+    try:
+        mesh.calc_loop_triangles()
+        triangle_count = len(mesh.loop_triangles)
+
+        vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", vertices)
+        triangle_vertices = np.empty(triangle_count * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", triangle_vertices)
+        material_indices = np.empty(triangle_count, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("material_index", material_indices)
+
+        uvs = None
+        if mesh.uv_layers.active:
+            triangle_loops = np.empty(triangle_count * 3, dtype=np.int32)
+            mesh.loop_triangles.foreach_get("loops", triangle_loops)
+            loop_uvs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+            mesh.uv_layers.active.data.foreach_get("uv", loop_uvs)
+            uvs = loop_uvs.reshape(-1, 2)[triangle_loops].reshape(-1, 3, 2).astype(np.float64)
+    finally:
+        evaluated.to_mesh_clear()
+
+    matrix = np.array(obj.matrix_world, dtype=np.float64)
+    vertices = vertices.reshape(-1, 3).astype(np.float64) @ matrix[:3, :3].T + matrix[:3, 3]
+    return vertices[triangle_vertices].reshape(-1, 3, 3), material_indices, uvs
+
+
+def cast_column_rays(triangles, origin, voxel_size, shape):
+    """
+    Cast a ray along z through every column of the voxel grid, and return
+    the column index, z and barycentric coordinates of every hit, and the
+    index of the triangle which was hit.
+
+    Columns are only tested against the triangles whose bounding box they
+    pass through, all at once.
+    """
+    columns_x, columns_y, _ = shape
+    corners = triangles[:, :, :2]
+
+    # The range of columns whose ray passes through the bounding box of each triangle
+    lower = np.ceil((corners.min(axis=1) - origin[:2]) / voxel_size - 0.5).astype(np.int64)
+    upper = np.floor((corners.max(axis=1) - origin[:2]) / voxel_size - 0.5).astype(np.int64)
+    lower = np.maximum(lower, 0)
+    upper = np.minimum(upper, [columns_x - 1, columns_y - 1])
+    counts_x = np.maximum(upper[:, 0] - lower[:, 0] + 1, 0)
+    counts_y = np.maximum(upper[:, 1] - lower[:, 1] + 1, 0)
+    counts = counts_x * counts_y
+
+    # One (triangle, column) pair for each column in the bounding box of each triangle
+    triangle_indices = np.repeat(np.arange(len(triangles)), counts)
+    local_indices = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    column_x = lower[triangle_indices, 0] + local_indices % counts_x[triangle_indices]
+    column_y = lower[triangle_indices, 1] + local_indices // counts_x[triangle_indices]
+
+    ray_x = origin[0] + (column_x + 0.5 + RAY_JITTER[0]) * voxel_size
+    ray_y = origin[1] + (column_y + 0.5 + RAY_JITTER[1]) * voxel_size
+
+    a = triangles[triangle_indices, 0]
+    b = triangles[triangle_indices, 1]
+    c = triangles[triangle_indices, 2]
+    ab = b - a
+    ac = c - a
+    denominator = ab[:, 0] * ac[:, 1] - ac[:, 0] * ab[:, 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        w1 = ((ray_x - a[:, 0]) * ac[:, 1] - ac[:, 0] * (ray_y - a[:, 1])) / denominator
+        w2 = (ab[:, 0] * (ray_y - a[:, 1]) - (ray_x - a[:, 0]) * ab[:, 1]) / denominator
+    w0 = 1 - w1 - w2
+    is_hit = (denominator != 0) & (w0 >= 0) & (w1 >= 0) & (w2 >= 0)
+
+    weights = np.stack([w0, w1, w2], axis=1)[is_hit]
+    hit_triangles = triangle_indices[is_hit]
+    hit_z = np.einsum("ij,ij->i", weights, triangles[hit_triangles, :, 2])
+    hit_columns = column_x[is_hit] * columns_y + column_y[is_hit]
+
+    return hit_columns, hit_z, weights, hit_triangles
+
+
+def get_hit_colours(weights, hit_triangles, material_indices, uvs, samplers):
+    """
+    Return the sRGB surface colour at each hit
+    """
+    colours = np.empty((len(hit_triangles), 3), dtype=np.float64)
+    hit_materials = material_indices[hit_triangles]
+
+    for material_index in np.unique(hit_materials):
+        colour, pixels = samplers[material_index] if material_index < len(samplers) else (DEFAULT_COLOUR, None)
+        selection = hit_materials == material_index
+
+        if pixels is None or uvs is None:
+            colours[selection] = colour
+            continue
+
+        hit_uvs = np.einsum("ij,ijk->ik", weights[selection], uvs[hit_triangles[selection]])
+        height, width, _ = pixels.shape
+        pixel_x = (np.mod(hit_uvs[:, 0], 1) * width).astype(np.int64).clip(0, width - 1)
+        pixel_y = (np.mod(hit_uvs[:, 1], 1) * height).astype(np.int64).clip(0, height - 1)
+        colours[selection] = pixels[pixel_y, pixel_x, :3]
+
+    return colours
+
+
+def voxelize(triangles, material_indices, uvs, samplers, voxel_size, hollow=True):
+    """
+    Fill the closed mesh made of triangles into a grid of voxels of voxel_size,
+    aligned with the block grid.
+
+    Returns the minimum corner of every filled voxel as an (n, 3) array, and
+    the sRGB colour of the surface nearest to each voxel along z.
+
+    If hollow is set, voxels enclosed on all six sides are left out.
+    """
+    if len(triangles) == 0:
+        return np.empty((0, 3)), np.empty((0, 3))
+
+    points = triangles.reshape(-1, 3)
+    origin = np.floor(points.min(axis=0) / voxel_size) * voxel_size
+    shape = np.maximum(np.ceil((points.max(axis=0) - origin) / voxel_size).astype(np.int64), 1)
+    columns_x, columns_y, columns_z = shape
+
+    hit_columns, hit_z, weights, hit_triangles = cast_column_rays(triangles, origin, voxel_size, shape)
+    hit_colours = get_hit_colours(weights, hit_triangles, material_indices, uvs, samplers)
+
+    # Hits are sorted by column and then z, so that a single sorted key finds the hits below any point
+    column_height = (columns_z + 2) * voxel_size
+    hit_keys = hit_columns * column_height + (hit_z - origin[2])
+    order = np.argsort(hit_keys)
+    hit_keys = hit_keys[order]
+    hit_z = hit_z[order]
+    hit_colours = hit_colours[order]
+
+    column_indices = np.arange(columns_x * columns_y)
+    voxel_z = (np.arange(columns_z) + 0.5) * voxel_size
+    column_starts = np.searchsorted(hit_keys, column_indices * column_height)
+    column_ends = np.searchsorted(hit_keys, (column_indices + 1) * column_height)
+    voxel_positions = np.searchsorted(hit_keys, (column_indices[:, None] * column_height + voxel_z[None, :]).ravel())
+    voxel_positions = voxel_positions.reshape(columns_x, columns_y, columns_z)
+
+    # A point is inside a closed mesh if the ray below it crosses the surface an odd number of times
+    hits_below = voxel_positions - column_starts.reshape(columns_x, columns_y, 1)
+    inside = hits_below % 2 == 1
+
+    if hollow:
+        padded = np.pad(inside, 1)
+        enclosed = padded[:-2, 1:-1, 1:-1] & padded[2:, 1:-1, 1:-1] \
+            & padded[1:-1, :-2, 1:-1] & padded[1:-1, 2:, 1:-1] \
+            & padded[1:-1, 1:-1, :-2] & padded[1:-1, 1:-1, 2:]
+        inside &= ~enclosed
+
+    voxel_x, voxel_y, voxel_k = np.nonzero(inside)
+    corners = origin + np.stack([voxel_x, voxel_y, voxel_k], axis=1) * voxel_size
+
+    # The colour of each voxel is taken from the nearer of the hits just below and just above it
+    positions = voxel_positions[voxel_x, voxel_y, voxel_k]
+    starts = column_starts.reshape(columns_x, columns_y)[voxel_x, voxel_y]
+    ends = column_ends.reshape(columns_x, columns_y)[voxel_x, voxel_y]
+    below = np.maximum(positions - 1, starts)
+    above = np.minimum(positions, ends - 1)
+    centre_z = origin[2] + voxel_z[voxel_k]
+    nearest = np.where(np.abs(hit_z[below] - centre_z) <= np.abs(hit_z[above] - centre_z), below, above)
+
+    return corners, hit_colours[nearest]
+
+
+def get_voxel_blocks(obj, depsgraph, voxel_size, hollow, block_type_patterns):
+    """
+    Voxelize obj and return the blocks filling it as
+    (block_type, properties, blender_matrix) tuples, ready to be created.
+    """
+    palette, tree = get_block_palette(block_type_patterns)
+    if not palette:
+        return []
+
+    triangles, material_indices, uvs = get_mesh_triangles(obj, depsgraph)
+    samplers = [get_material_sampler(slot.material) for slot in obj.material_slots]
+    corners, colours = voxelize(triangles, material_indices, uvs, samplers, voxel_size, hollow)
+
+    # Many voxels share a colour, so each rounded colour is only looked up once
+    rounded = np.round(colours * COLOUR_STEPS).astype(np.int64)
+    unique_colours, colour_indices = np.unique(rounded, axis=0, return_inverse=True)
+    block_indices = [tree.find(colour / COLOUR_STEPS)[1] for colour in unique_colours]
+
+    blocks = []
+    scale = Matrix.Diagonal((voxel_size, voxel_size, voxel_size, 1))
+    for corner, colour_index in zip(corners, colour_indices.ravel()):
+        block_type, properties = palette[block_indices[colour_index]]
+        # A block at the object origin fills [0, 1] x [-1, 0] x [0, 1]
+        matrix = Matrix.Translation((corner[0], corner[1] + voxel_size, corner[2])) @ scale
+        blocks.append((block_type, properties, matrix))
+    return blocks